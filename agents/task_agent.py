@@ -1,20 +1,48 @@
 from utils.nlp import extract_task_and_time
-from db.database import save_task
+from utils.profiles import get_parse_context
+from db.database import save_task, get_task_by_idempotency_key
+from utils.tracing import traced
+from datetime import datetime
 import sqlite3
 
-def process_message(user: str, text: str) -> str:
+
+# Replies to failures that a retry of the same delivery may not hit again
+DATABASE_ERROR_REPLY = "❌ Database error: Could not save task. Please try again."
+UNEXPECTED_ERROR_PREFIX = "❌ Unexpected error: "
+
+
+def is_retryable_reply(reply: str) -> bool:
+    """Whether a reply reports a transient failure, so a retried delivery must be processed again."""
+    return reply == DATABASE_ERROR_REPLY or reply.startswith(UNEXPECTED_ERROR_PREFIX)
+
+
+def _saved_reply(task_id: int, task: str, time: datetime) -> str:
+    time_str = time.strftime('%B %d at %I:%M %p')
+    return f"✅ Saved task #{task_id}: '{task}' for {time_str}"
+
+
+@traced("agent.process_message")
+def process_message(user: str, text: str, idempotency_key: str = None) -> str:
     """
     Process a user message and create a task.
     
     Args:
         user: Username or identifier
         text: Natural language task description with time
+        idempotency_key: Identifies the delivery (optional); a redelivery
+            of an already saved message gets the original reply without
+            being parsed or saved again
         
     Returns:
         Success or error message string
     """
-    # Extract task information
-    data = extract_task_and_time(text)
+    if idempotency_key:
+        existing = get_task_by_idempotency_key(idempotency_key, user)
+        if existing:
+            return _saved_reply(existing["id"], existing["task"], datetime.fromisoformat(existing["time"]))
+    
+    # Extract task information using the user's cached parse context
+    data = extract_task_and_time(text, context=get_parse_context(user))
 
     # Validate time was detected
     if not data["time"]:
@@ -26,12 +54,11 @@ def process_message(user: str, text: str) -> str:
 
     # Save to database with error handling
     try:
-        task_id = save_task(user, data["task"], data["time"])
-        time_str = data["time"].strftime('%B %d at %I:%M %p')
-        return f"✅ Saved task #{task_id}: '{data['task']}' for {time_str}"
+        task_id = save_task(user, data["task"], data["time"], idempotency_key=idempotency_key)
+        return _saved_reply(task_id, data["task"], data["time"])
     except ValueError as e:
         return f"❌ Invalid input: {e}"
     except sqlite3.Error as e:
-        return f"❌ Database error: Could not save task. Please try again."
+        return DATABASE_ERROR_REPLY
     except Exception as e:
-        return f"❌ Unexpected error: {e}"
+        return f"{UNEXPECTED_ERROR_PREFIX}{e}"
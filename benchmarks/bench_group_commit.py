@@ -0,0 +1,115 @@
+"""
+Task inserts under concurrent webhook traffic.
+
+Simulates concurrent webhook clients, each saving tasks back to back from
+its own thread (as requests do in the server's threadpool), and reports
+inserts/sec and per-insert latency with one commit per insert and with
+group commit at both durability settings.
+
+Usage:
+    python -m benchmarks.bench_group_commit --clients 100 --inserts 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import db.database
+from benchmarks.bench_nlp import RESULTS_DIR, percentile
+
+# (label, group commit window in ms, synchronous mode)
+MODES = [
+    ("per_request", 0, "full"),
+    ("group_full", None, "full"),
+    ("group_normal", None, "normal"),
+]
+
+
+def _run_mode(clients: int, inserts: int, window_ms: float, sync: str) -> Dict[str, Any]:
+    db.database.DB_NAME = os.path.join(tempfile.mkdtemp(), "bench_group_commit.db")
+    db.database.init_db()
+    db.database.GROUP_COMMIT_WINDOW_MS = window_ms
+    db.database.GROUP_COMMIT_SYNC = sync
+    writer = db.database.task_writer
+    writer.window = window_ms / 1000
+    batches = writer.batches
+
+    per_client = inserts // clients
+    start = threading.Barrier(clients)
+
+    def client(n: int) -> List[float]:
+        samples = []
+        start.wait()
+        for i in range(per_client):
+            began = time.perf_counter()
+            db.database.save_task(f"user-{n}", f"task {i}", datetime(2025, 11, 3, 9, 0))
+            samples.append(time.perf_counter() - began)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        samples = [s for result in pool.map(client, range(clients)) for s in result]
+    elapsed = time.perf_counter() - started
+    writer.close()
+
+    return {
+        "window_ms": window_ms,
+        "synchronous": sync,
+        "inserts": len(samples),
+        "inserts_per_second": len(samples) / elapsed,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "commits": writer.batches - batches if window_ms > 0 else len(samples),
+    }
+
+
+def run_benchmark(clients: int = 100, inserts: int = 5000, window_ms: float = 2) -> Dict[str, Any]:
+    modes = {}
+    for label, mode_window, sync in MODES:
+        modes[label] = _run_mode(clients, inserts, window_ms if mode_window is None else mode_window, sync)
+
+    return {
+        "benchmark": "group_commit",
+        "timestamp": datetime.now().isoformat(),
+        "clients": clients,
+        "modes": modes,
+        "speedup": {
+            label: result["inserts_per_second"] / modes["per_request"]["inserts_per_second"]
+            for label, result in modes.items()
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark task inserts with and without group commit")
+    parser.add_argument("--clients", type=int, default=100, help="Concurrent webhook clients")
+    parser.add_argument("--inserts", type=int, default=5000, help="Tasks saved per mode, across all clients")
+    parser.add_argument("--window-ms", type=float, default=2, help="Group commit window")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/group-commit-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.clients, args.inserts, args.window_ms)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"group-commit-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for label, result in results["modes"].items():
+        print(f"{label:>13}: {result['inserts_per_second']:8.0f} inserts/s  "
+              f"p50 {result['p50_ms']:6.1f}ms  p99 {result['p99_ms']:7.1f}ms  "
+              f"{result['commits']} commits  (x{results['speedup'][label]:.1f})")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Cost of metrics instrumentation.
+
+Measures a single histogram observation, the overhead the timing decorator
+adds to a call, and the overhead of the metrics middleware around a
+trivial ASGI app, then relates them to the latency of a cached GET /tasks
+request (one middleware pass and two timed queries).
+
+Usage:
+    python -m benchmarks.bench_metrics --iterations 200000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_nlp import RESULTS_DIR, percentile
+from utils.metrics import Histogram, MetricsMiddleware
+
+
+def _per_call_ns(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+async def _trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _noop_send(message):
+    pass
+
+
+def _asgi_ns(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/tasks"}
+
+    async def run():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await app(dict(scope), None, _noop_send)
+        return (time.perf_counter() - started) / iterations * 1e9
+
+    return asyncio.run(run())
+
+
+def _request_latency_us(requests: int) -> float:
+    """p50 latency of a cached GET /tasks through the full app."""
+    import db.database
+    from fastapi.testclient import TestClient
+    from server import app
+
+    db.database.DB_NAME = os.path.join(tempfile.mkdtemp(), "bench_metrics.db")
+    db.database.init_db()
+    for i in range(20):
+        db.database.save_task("bench", f"task {i}", datetime(2025, 11, 3, 9, i))
+
+    client = TestClient(app)
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get("/tasks?user=bench")
+        samples.append(time.perf_counter() - started)
+    return percentile(samples, 50) * 1e6
+
+
+def run_benchmark(iterations: int = 200000, requests: int = 500) -> Dict[str, Any]:
+    histogram = Histogram("bench_seconds", "Benchmark histogram.")
+
+    def noop():
+        return None
+
+    timed_noop = histogram.time()(noop)
+
+    observe_ns = _per_call_ns(lambda: histogram.observe(0.003), iterations)
+    call_ns = _per_call_ns(noop, iterations)
+    timed_ns = _per_call_ns(timed_noop, iterations)
+    decorator_ns = max(timed_ns - call_ns, 0.0)
+
+    asgi_iterations = max(iterations // 10, 1)
+    middleware_ns = max(
+        _asgi_ns(MetricsMiddleware(_trivial_app), asgi_iterations) - _asgi_ns(_trivial_app, asgi_iterations),
+        0.0
+    )
+
+    request_us = _request_latency_us(requests)
+    per_request_ns = middleware_ns + 2 * decorator_ns
+
+    return {
+        "benchmark": "metrics",
+        "timestamp": datetime.now().isoformat(),
+        "iterations": iterations,
+        "observe_ns": observe_ns,
+        "decorator_overhead_ns": decorator_ns,
+        "middleware_overhead_ns": middleware_ns,
+        "tasks_request_p50_us": request_us,
+        "overhead_percent": per_request_ns / (request_us * 1000) * 100,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark metrics instrumentation overhead")
+    parser.add_argument("--iterations", type=int, default=200000, help="Timed calls per measurement")
+    parser.add_argument("--requests", type=int, default=500, help="GET /tasks requests to time")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/metrics-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.iterations, args.requests)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"metrics-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"observe(): {results['observe_ns']:.0f}ns")
+    print(f"Timing decorator: +{results['decorator_overhead_ns']:.0f}ns per call")
+    print(f"Middleware: +{results['middleware_overhead_ns']:.0f}ns per request")
+    print(f"GET /tasks p50: {results['tasks_request_p50_us']:.0f}us "
+          f"-> instrumentation {results['overhead_percent']:.2f}%")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+NLP throughput and accuracy benchmark for `extract_task_and_time`.
+
+Runs the frozen reminder corpus through the parser with a fixed clock and
+reports parses/sec, p50/p99 latency, cold-start cost and accuracy against
+the expected (task, time) pairs. Results are written as JSON so runs can be
+compared over time.
+
+Usage:
+    python -m benchmarks.bench_nlp
+    python -m benchmarks.bench_nlp --limit 200 --output results.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.nlp_corpus import CORPUS_VERSION, load_corpus
+
+ROOT_DIR = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Cold start is measured in a fresh interpreter: import cost + first parse
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+from utils.nlp import extract_task_and_time
+imported = time.perf_counter()
+extract_task_and_time("remind me at 5pm to study")
+done = time.perf_counter()
+print(imported - start, done - imported)
+"""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure_cold_start() -> Dict[str, float]:
+    """Measure import and first-parse time in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout.split()
+    import_s, first_parse_s = (float(v) for v in output[-2:])
+    return {
+        "import_ms": import_s * 1000,
+        "first_parse_ms": first_parse_s * 1000,
+        "total_ms": (import_s + first_parse_s) * 1000,
+    }
+
+
+def run_benchmark(limit: Optional[int] = None, cold_start: bool = True) -> Dict[str, Any]:
+    """
+    Parse the corpus and collect timing and accuracy statistics.
+
+    Args:
+        limit: Only use the first `limit` cases (optional)
+        cold_start: Also measure cold-start cost in a subprocess
+
+    Returns:
+        Machine-readable result dict
+    """
+    from utils.nlp import extract_task_and_time
+
+    corpus = load_corpus()
+    cases = corpus["cases"][:limit] if limit else corpus["cases"]
+    relative_base = corpus["relative_base"]
+
+    # Warm up so the steady-state numbers exclude lazy initialization
+    extract_task_and_time(cases[0]["text"], relative_base=relative_base)
+
+    latencies = []
+    time_hits = task_hits = both_hits = 0
+    failures = []
+
+    started = time.perf_counter()
+    for case in cases:
+        t0 = time.perf_counter()
+        result = extract_task_and_time(case["text"], relative_base=relative_base)
+        latencies.append(time.perf_counter() - t0)
+
+        parsed_time = result["time"].isoformat() if result["time"] else None
+        time_ok = parsed_time == case["time"]
+        task_ok = result["task"] == case["task"]
+        time_hits += time_ok
+        task_hits += task_ok
+        both_hits += time_ok and task_ok
+        if not (time_ok and task_ok) and len(failures) < 20:
+            failures.append({
+                "text": case["text"],
+                "expected": {"task": case["task"], "time": case["time"]},
+                "got": {"task": result["task"], "time": parsed_time},
+            })
+    elapsed = time.perf_counter() - started
+
+    count = len(cases)
+    results = {
+        "benchmark": "nlp",
+        "timestamp": datetime.now().isoformat(),
+        "environment": _environment(),
+        "corpus": {"version": corpus["version"], "cases": count},
+        "throughput": {
+            "parses_per_sec": count / elapsed if elapsed else 0.0,
+            "total_s": elapsed,
+        },
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "accuracy": {
+            "time": time_hits / count,
+            "task": task_hits / count,
+            "both": both_hits / count,
+        },
+        "sample_failures": failures,
+    }
+    if cold_start:
+        results["cold_start"] = measure_cold_start()
+    return results
+
+
+def _environment() -> Dict[str, Any]:
+    """Versions that affect the numbers, recorded alongside each run."""
+    try:
+        import dateparser
+        dateparser_version = dateparser.__version__
+    except Exception:
+        dateparser_version = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dateparser": dateparser_version,
+        "commit": commit,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark extract_task_and_time")
+    parser.add_argument("--limit", type=int, help="Only parse the first N corpus cases")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/nlp-<timestamp>.json)")
+    parser.add_argument("--no-cold-start", action="store_true", help="Skip the cold-start subprocess")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(limit=args.limit, cold_start=not args.no_cold_start)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"nlp-v{CORPUS_VERSION}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Corpus v{results['corpus']['version']}: {results['corpus']['cases']} messages")
+    print(f"Throughput: {results['throughput']['parses_per_sec']:.1f} parses/sec")
+    print(f"Latency: p50={results['latency_ms']['p50']:.2f}ms p99={results['latency_ms']['p99']:.2f}ms")
+    if "cold_start" in results:
+        print(f"Cold start: {results['cold_start']['total_ms']:.0f}ms")
+    accuracy = results["accuracy"]
+    print(f"Accuracy: time={accuracy['time']:.1%} task={accuracy['task']:.1%} both={accuracy['both']:.1%}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Microbenchmark for the task cleanup stage of `extract_task_and_time`.
+
+Date phrases are located once per corpus message with `search_dates`, then
+only the cleanup step is timed: the previous multi-pass `re.sub` pipeline
+against the current single-pass `_clean_task`. Outputs of the two are also
+compared so any behavioural drift is visible.
+
+Usage:
+    python -m benchmarks.bench_nlp_cleanup --limit 300 --repeat 20
+"""
+import argparse
+import json
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_nlp import RESULTS_DIR, percentile
+from benchmarks.nlp_corpus import load_corpus
+
+
+def legacy_clean_task(text: str, matched_texts: List[str]) -> str:
+    """The cleanup pipeline as it was before precompiled single-pass stripping."""
+    cleaned = text
+    for mt in matched_texts:
+        try:
+            cleaned = re.sub(re.escape(mt), "", cleaned, flags=re.IGNORECASE)
+        except re.error:
+            cleaned = cleaned.replace(mt, "")
+
+    keyword_patterns = [r"\bremind me to\b", r"\bremind me\b", r"\bto\b",
+                        r"\bat\b", r"\bin\b", r"\bon\b",
+                        r"\btomorrow\b", r"\btoday\b"]
+    for pat in keyword_patterns:
+        cleaned = re.sub(pat, "", cleaned, flags=re.IGNORECASE)
+
+    cleaned = re.sub(r"[,:;\-]+", " ", cleaned)
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    cleaned = cleaned.strip(" -:;,.!? \n\r\t")
+    return cleaned.lower()
+
+
+def _time_per_message(func, inputs, repeat: int) -> List[float]:
+    """Per-message mean time (seconds) for each repetition over all inputs."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text, matched in inputs:
+            func(text, matched)
+        samples.append((time.perf_counter() - start) / len(inputs))
+    return samples
+
+
+def run_benchmark(limit: int = 300, repeat: int = 20) -> Dict[str, Any]:
+    from dateparser.search import search_dates
+    from utils.nlp import _clean_task
+
+    corpus = load_corpus()
+    settings = {"PREFER_DATES_FROM": "future", "RELATIVE_BASE": corpus["relative_base"]}
+
+    inputs = []
+    for case in corpus["cases"][:limit]:
+        results = search_dates(case["text"], settings=settings) or []
+        inputs.append((case["text"], [m[0] for m in results if m and m[0]]))
+
+    mismatches = [
+        {"text": text, "matched": matched,
+         "legacy": legacy_clean_task(text, matched), "current": _clean_task(text, matched)}
+        for text, matched in inputs
+        if legacy_clean_task(text, matched) != _clean_task(text, matched)
+    ]
+
+    legacy = _time_per_message(legacy_clean_task, inputs, repeat)
+    current = _time_per_message(_clean_task, inputs, repeat)
+
+    legacy_us = percentile(legacy, 50) * 1e6
+    current_us = percentile(current, 50) * 1e6
+    return {
+        "benchmark": "nlp_cleanup",
+        "timestamp": datetime.now().isoformat(),
+        "corpus": {"version": corpus["version"], "cases": len(inputs)},
+        "repeat": repeat,
+        "per_message_us": {"legacy": legacy_us, "current": current_us},
+        "speedup": legacy_us / current_us if current_us else 0.0,
+        "mismatches": len(mismatches),
+        "sample_mismatches": mismatches[:20],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the task cleanup stage")
+    parser.add_argument("--limit", type=int, default=300, help="Corpus messages to use")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed passes over the messages")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/nlp-cleanup-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(limit=args.limit, repeat=args.repeat)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"nlp-cleanup-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    per_message = results["per_message_us"]
+    print(f"Legacy cleanup:  {per_message['legacy']:.2f}us/message")
+    print(f"Current cleanup: {per_message['current']:.2f}us/message")
+    print(f"Speedup: {results['speedup']:.2f}x, output mismatches: {results['mismatches']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
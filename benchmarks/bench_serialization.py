@@ -0,0 +1,114 @@
+"""
+Serialization cost of task listings and WebSocket frames.
+
+Compares the previous path (FastAPI's `jsonable_encoder` followed by the
+stdlib-based JSONResponse, and `json.dumps` for WebSocket frames) with the
+pluggable serializer in `utils.serialization`, for every available backend.
+Costs are reported per 1,000 tasks.
+
+Usage:
+    python -m benchmarks.bench_serialization --tasks 1000 --repeat 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.bench_nlp import RESULTS_DIR, percentile
+from utils.serialization import SERIALIZERS
+
+
+def make_tasks(count: int) -> List[dict]:
+    """Task dicts shaped like `get_all_tasks` rows."""
+    start = datetime(2025, 11, 3, 9, 0)
+    return [
+        {
+            "id": i + 1,
+            "user": f"user-{i % 50}",
+            "task": f"call the dentist about appointment {i} 📞",
+            "time": (start + timedelta(minutes=15 * i)).isoformat(),
+            "status": "pending" if i % 3 else "done",
+            "sent": i % 2,
+        }
+        for i in range(count)
+    ]
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _summary(samples: List[float], tasks: int) -> Dict[str, float]:
+    scale = 1000 / tasks * 1e6  # microseconds per 1,000 tasks
+    return {
+        "p50_us_per_1k": percentile(samples, 50) * scale,
+        "p99_us_per_1k": percentile(samples, 99) * scale,
+    }
+
+
+def run_benchmark(tasks: int = 1000, repeat: int = 200) -> Dict[str, Any]:
+    rows = make_tasks(tasks)
+    payload = {"tasks": rows, "count": len(rows), "seq": 12345}
+    frame = {"type": "task_list", "tasks": rows, "count": len(rows), "seq": 12345}
+    baseline_response = JSONResponse(content=None)
+
+    results: Dict[str, Any] = {
+        "benchmark": "serialization",
+        "timestamp": datetime.now().isoformat(),
+        "tasks": tasks,
+        "repeat": repeat,
+        "response": {
+            "baseline": _summary(
+                _time(lambda: baseline_response.render(jsonable_encoder(payload)), repeat), tasks
+            ),
+        },
+        "websocket": {
+            "baseline": _summary(_time(lambda: json.dumps(frame), repeat), tasks),
+        },
+        "bytes": {"baseline": len(baseline_response.render(payload))},
+    }
+    for name, dumps in SERIALIZERS.items():
+        results["response"][name] = _summary(_time(lambda: dumps(payload), repeat), tasks)
+        results["websocket"][name] = _summary(
+            _time(lambda: dumps(frame).decode("utf-8"), repeat), tasks
+        )
+        results["bytes"][name] = len(dumps(payload))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark task serialization")
+    parser.add_argument("--tasks", type=int, default=1000, help="Tasks per payload")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed runs per serializer")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/serialization-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.tasks, args.repeat)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"serialization-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['tasks']} tasks x {results['repeat']} runs (microseconds per 1,000 tasks)")
+    for kind in ("response", "websocket"):
+        for name, stats in results[kind].items():
+            print(f"{kind:>9} {name:>8}: p50={stats['p50_us_per_1k']:.0f}us p99={stats['p99_us_per_1k']:.0f}us")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
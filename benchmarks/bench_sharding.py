@@ -0,0 +1,104 @@
+"""
+Task write throughput as the number of shards grows.
+
+Concurrent clients, each writing as its own user, save tasks back to back
+(one commit per task, as without group commit) against 1, 2, 4 and 8
+shards. With one shard every commit waits for the single SQLite writer
+lock; with more, users in different shards commit in parallel.
+
+Usage:
+    python -m benchmarks.bench_sharding --clients 64 --shards 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import db.database
+from benchmarks.bench_nlp import RESULTS_DIR, percentile
+
+
+def _run_shards(shards: int, clients: int, inserts: int) -> Dict[str, Any]:
+    db.database.DB_NAME = os.path.join(tempfile.mkdtemp(), "bench_sharding.db")
+    db.database.DB_SHARDS = shards
+    db.database.GROUP_COMMIT_WINDOW_MS = 0
+    db.database.init_db()
+
+    per_client = inserts // clients
+    start = threading.Barrier(clients)
+
+    def client(n: int) -> List[float]:
+        samples = []
+        start.wait()
+        for i in range(per_client):
+            began = time.perf_counter()
+            db.database.save_task(f"user-{n}", f"task {i}", datetime(2025, 11, 3, 9, 0))
+            samples.append(time.perf_counter() - began)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        samples = [s for result in pool.map(client, range(clients)) for s in result]
+    elapsed = time.perf_counter() - started
+
+    due_started = time.perf_counter()
+    db.database.get_due_tasks()
+    due_ms = (time.perf_counter() - due_started) * 1000
+
+    return {
+        "shards": shards,
+        "inserts": len(samples),
+        "inserts_per_second": len(samples) / elapsed,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "due_tasks_merge_ms": due_ms,
+    }
+
+
+def run_benchmark(shard_counts: List[int], clients: int = 64, inserts: int = 4000) -> Dict[str, Any]:
+    runs = [_run_shards(shards, clients, inserts) for shards in shard_counts]
+    baseline = runs[0]["inserts_per_second"]
+    for run in runs:
+        run["speedup"] = run["inserts_per_second"] / baseline
+    return {
+        "benchmark": "sharding",
+        "timestamp": datetime.now().isoformat(),
+        "clients": clients,
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark task write throughput per shard count")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts to compare")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent clients, one user each")
+    parser.add_argument("--inserts", type=int, default=4000, help="Tasks saved per run, across all clients")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/sharding-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.shards, args.clients, args.inserts)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"sharding-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for run in results["runs"]:
+        print(f"{run['shards']:>2} shard(s): {run['inserts_per_second']:8.0f} inserts/s  "
+              f"p50 {run['p50_ms']:6.1f}ms  p99 {run['p99_ms']:7.1f}ms  "
+              f"due-task merge {run['due_tasks_merge_ms']:.1f}ms  (x{run['speedup']:.2f})")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Load test for the WebSocket connection registry.
+
+Simulates thousands of connected sockets (no network) and measures how long
+a broadcast and a targeted per-user send take to reach every recipient.
+A share of the sockets can be made slow to show they are evicted instead
+of delaying everyone else.
+
+Usage:
+    python -m benchmarks.bench_websocket --sockets 10000 --users 2500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_nlp import RESULTS_DIR, percentile
+from utils.connections import ConnectionManager
+
+
+class SimulatedSocket:
+    """Socket that records delivery times; slow ones never finish sending."""
+
+    def __init__(self, slow: bool = False):
+        self.slow = slow
+        self.received = 0
+        self.waiter: Optional[asyncio.Future] = None
+        self.expected = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.slow:
+            await asyncio.Event().wait()
+        self.received += 1
+        if self.waiter is not None and self.received >= self.expected and not self.waiter.done():
+            self.waiter.set_result(time.perf_counter())
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+    def expect(self, count: int) -> asyncio.Future:
+        self.expected = self.received + count
+        self.waiter = asyncio.get_running_loop().create_future()
+        return self.waiter
+
+
+async def _run(sockets: int, users: int, slow: int, rounds: int, queue_size: int) -> Dict[str, Any]:
+    # Per-connection log lines would dominate the registry timings
+    logging.getLogger("utils.logger").setLevel(logging.ERROR)
+
+    manager = ConnectionManager(queue_size=queue_size)
+    all_sockets: List[SimulatedSocket] = []
+    by_user: Dict[str, List[SimulatedSocket]] = {}
+
+    started = time.perf_counter()
+    for i in range(sockets):
+        socket = SimulatedSocket(slow=i < slow)
+        user_id = f"user-{i % users}"
+        await manager.connect(socket, user_id)
+        all_sockets.append(socket)
+        by_user.setdefault(user_id, []).append(socket)
+    connect_s = time.perf_counter() - started
+
+    fast_sockets = [s for s in all_sockets if not s.slow]
+
+    # Broadcast: time until every fast socket has the message
+    broadcast_latencies = []
+    for i in range(rounds):
+        waiters = [s.expect(1) for s in fast_sockets]
+        sent_at = time.perf_counter()
+        await manager.broadcast(json.dumps({"type": "broadcast", "round": i}))
+        done = await asyncio.gather(*waiters)
+        broadcast_latencies.append(max(done) - sent_at)
+
+    # Targeted: time until all sockets of one user have the message
+    targeted_latencies = []
+    user_ids = [u for u, socks in by_user.items() if not any(s.slow for s in socks)]
+    for i in range(min(rounds * 50, len(user_ids))):
+        user_id = user_ids[i]
+        waiters = [s.expect(1) for s in by_user[user_id]]
+        sent_at = time.perf_counter()
+        await manager.send_to_user(user_id, json.dumps({"type": "reminder", "n": i}))
+        done = await asyncio.gather(*waiters)
+        targeted_latencies.append(max(done) - sent_at)
+
+    # Disconnect everything: O(1) per socket
+    started = time.perf_counter()
+    for socket in all_sockets:
+        manager.disconnect(socket)
+    disconnect_s = time.perf_counter() - started
+
+    return {
+        "benchmark": "websocket",
+        "timestamp": datetime.now().isoformat(),
+        "sockets": sockets,
+        "users": users,
+        "slow_sockets": slow,
+        "queue_size": queue_size,
+        "connect_us_per_socket": connect_s / sockets * 1e6,
+        "disconnect_us_per_socket": disconnect_s / sockets * 1e6,
+        "broadcast_ms": {
+            "p50": percentile(broadcast_latencies, 50) * 1000,
+            "p99": percentile(broadcast_latencies, 99) * 1000,
+        },
+        "targeted_ms": {
+            "p50": percentile(targeted_latencies, 50) * 1000,
+            "p99": percentile(targeted_latencies, 99) * 1000,
+        },
+        "evicted": manager.evicted,
+    }
+
+
+def run_benchmark(sockets: int = 10000, users: int = 2500, slow: int = 100,
+                  rounds: int = 20, queue_size: int = 8) -> Dict[str, Any]:
+    return asyncio.run(_run(sockets, users, slow, rounds, queue_size))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test the WebSocket registry")
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=2500)
+    parser.add_argument("--slow", type=int, default=100, help="Sockets that never finish a send")
+    parser.add_argument("--rounds", type=int, default=20, help="Broadcast rounds")
+    parser.add_argument("--queue-size", type=int, default=8, help="Per-socket outbound queue size")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/websocket-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sockets, args.users, args.slow, args.rounds, args.queue_size)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"websocket-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['sockets']} sockets / {results['users']} users ({results['slow_sockets']} slow)")
+    print(f"Connect: {results['connect_us_per_socket']:.1f}us/socket, "
+          f"disconnect: {results['disconnect_us_per_socket']:.1f}us/socket")
+    print(f"Broadcast: p50={results['broadcast_ms']['p50']:.1f}ms p99={results['broadcast_ms']['p99']:.1f}ms")
+    print(f"Targeted:  p50={results['targeted_ms']['p50']:.3f}ms p99={results['targeted_ms']['p99']:.3f}ms")
+    print(f"Evicted slow consumers: {results['evicted']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Reminder message corpus for the NLP benchmark.
+
+The corpus is generated deterministically from templates and frozen to
+`benchmarks/data/nlp_corpus_v<VERSION>.json`. Benchmarks always read the
+frozen file, so results stay comparable across runs even if the templates
+below change. Bump CORPUS_VERSION and regenerate when the corpus itself
+should change:
+
+    python -m benchmarks.nlp_corpus
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+CORPUS_VERSION = 1
+
+# Frozen clock all expected times are computed against (a Monday morning)
+RELATIVE_BASE = datetime(2025, 11, 3, 9, 0)
+
+DATA_DIR = Path(__file__).parent / "data"
+
+TASKS = [
+    "call mom", "buy milk", "study for the exam", "water the plants",
+    "submit the report", "pay rent", "feed the cat", "go jogging",
+    "cook dinner", "renew passport", "book dentist appointment",
+    "send the invoice", "pick up the kids", "take out the trash",
+    "review pull request", "prepare slides", "call the bank",
+    "check emails", "walk the dog", "pay the electricity bill",
+    "stretch", "drink water", "order groceries", "backup laptop",
+    "read chapter five", "clean the kitchen", "email the landlord",
+    "practice guitar", "update resume", "charge phone",
+]
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+]
+
+
+def _hour_label(hour: int) -> str:
+    """Format a 24h hour as '5pm' / '11am'."""
+    suffix = "am" if hour < 12 else "pm"
+    display = hour % 12 or 12
+    return f"{display}{suffix}"
+
+
+def _time_expression(rng: random.Random):
+    """Pick a time expression and the datetime it should resolve to."""
+    base = RELATIVE_BASE
+    kind = rng.choice([
+        "at_pm", "tomorrow_at", "today_at", "in_minutes",
+        "in_hours", "in_days", "at_24h", "on_date",
+    ])
+
+    if kind == "at_pm":
+        hour = rng.randint(13, 22)
+        return f"at {_hour_label(hour)}", base.replace(hour=hour)
+    if kind == "tomorrow_at":
+        hour = rng.randint(7, 21)
+        expected = (base + timedelta(days=1)).replace(hour=hour)
+        return f"tomorrow at {_hour_label(hour)}", expected
+    if kind == "today_at":
+        hour = rng.randint(13, 22)
+        return f"today at {_hour_label(hour)}", base.replace(hour=hour)
+    if kind == "in_minutes":
+        minutes = rng.choice([5, 10, 15, 20, 30, 45])
+        return f"in {minutes} minutes", base + timedelta(minutes=minutes)
+    if kind == "in_hours":
+        hours = rng.randint(2, 8)
+        return f"in {hours} hours", base + timedelta(hours=hours)
+    if kind == "in_days":
+        days = rng.randint(2, 6)
+        return f"in {days} days", base + timedelta(days=days)
+    if kind == "at_24h":
+        hour = rng.randint(10, 23)
+        minute = rng.choice([0, 15, 30, 45])
+        return f"at {hour:02d}:{minute:02d}", base.replace(hour=hour, minute=minute)
+
+    # on_date: a later day this year, at an afternoon hour
+    month = rng.randint(base.month + 1, 12)
+    day = rng.randint(1, 28)
+    hour = rng.randint(13, 20)
+    expected = datetime(base.year, month, day, hour)
+    return f"on {MONTHS[month - 1]} {day} at {_hour_label(hour)}", expected
+
+
+TEMPLATES = [
+    "remind me {time} to {task}",
+    "remind me to {task} {time}",
+    "{time} {task}",
+    "{task} {time}",
+    "Remind me {time} to {task}",
+    "{task}, {time}",
+]
+
+
+def generate_corpus(size: int = 2400, seed: int = CORPUS_VERSION) -> List[Dict[str, Any]]:
+    """
+    Generate `size` reminder messages with their expected parse.
+
+    Returns:
+        List of dicts with keys "text", "task" and "time" (ISO format)
+    """
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(size):
+        task = rng.choice(TASKS)
+        time_text, expected = _time_expression(rng)
+        text = rng.choice(TEMPLATES).format(time=time_text, task=task)
+        cases.append({"text": text, "task": task, "time": expected.isoformat()})
+    return cases
+
+
+def corpus_path(version: int = CORPUS_VERSION) -> Path:
+    return DATA_DIR / f"nlp_corpus_v{version}.json"
+
+
+def load_corpus(version: int = CORPUS_VERSION) -> Dict[str, Any]:
+    """
+    Load a frozen corpus file.
+
+    Returns:
+        Dict with "version", "relative_base" (datetime) and "cases"
+    """
+    with open(corpus_path(version), "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    corpus["relative_base"] = datetime.fromisoformat(corpus["relative_base"])
+    return corpus
+
+
+def write_corpus(version: int = CORPUS_VERSION) -> Path:
+    """Freeze the generated corpus to disk, one case per line for readable diffs."""
+    DATA_DIR.mkdir(exist_ok=True)
+    path = corpus_path(version)
+    cases = generate_corpus()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        f.write(f'  "version": {version},\n')
+        f.write(f'  "relative_base": "{RELATIVE_BASE.isoformat()}",\n')
+        f.write('  "cases": [\n')
+        f.write(",\n".join("    " + json.dumps(case) for case in cases))
+        f.write("\n  ]\n}\n")
+    return path
+
+
+if __name__ == "__main__":
+    print(f"Wrote {write_corpus()}")
@@ -0,0 +1,202 @@
+"""
+Write-through, per-user cache of recent tasks.
+
+Holds each active user's most recent tasks (ordered like `get_all_tasks`:
+newest time first) so repeated dashboard reads are served from memory.
+Every write in `db.database` updates the cached entry after it commits,
+instead of invalidating it, so entries stay warm for active users. Users
+are evicted least-recently-used once TASK_CACHE_USERS is exceeded.
+
+Writes made by other processes (more workers, the CLI import) never reach
+this cache, so each entry remembers the user's change seq it is current
+to: a read is only served from memory if the database's seq still
+matches, and a write-through only applies on top of the seq just before
+it.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Users kept in memory (0 disables the cache)
+TASK_CACHE_USERS = int(os.getenv("TASK_CACHE_USERS", "1000"))
+# Most recent tasks kept per user
+TASK_CACHE_PER_USER = int(os.getenv("TASK_CACHE_PER_USER", "200"))
+
+
+class _Entry:
+    """One user's cached tasks, newest first."""
+
+    __slots__ = ("tasks", "complete", "seq")
+
+    def __init__(self, tasks: List[dict], complete: bool, seq: int):
+        self.tasks = tasks
+        # True when `tasks` holds every task the user has
+        self.complete = complete
+        # The user's change seq these tasks are current to
+        self.seq = seq
+
+
+class TaskCache:
+    def __init__(self, max_users: int = TASK_CACHE_USERS, per_user: int = TASK_CACHE_PER_USER):
+        self.max_users = max_users
+        self.per_user = per_user
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every write so a read racing a write is not cached
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_users > 0 and self.per_user > 0
+
+    def get(self, user: str, status: Optional[str], limit: int, seq: int,
+            copy: bool = True) -> Optional[List[dict]]:
+        """
+        Serve a per-user task listing from memory, if the entry is current
+        to the user's change seq `seq`.
+
+        Writes replace cached dicts rather than mutating them, so with
+        copy=False the returned dicts stay valid as long as nobody
+        modifies them.
+
+        Returns:
+            The cached task dicts (copies unless copy=False), or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user)
+            if entry is not None and entry.seq != seq:
+                # Changed behind our back
+                del self._entries[user]
+                entry = None
+            if entry is not None:
+                if status is None and (entry.complete or limit <= len(entry.tasks)):
+                    tasks = entry.tasks[:limit]
+                elif status is not None and entry.complete:
+                    tasks = [t for t in entry.tasks if t["status"] == status][:limit]
+                else:
+                    tasks = None
+                if tasks is not None:
+                    self._entries.move_to_end(user)
+                    self.hits += 1
+                    return [dict(t) for t in tasks] if copy else tasks
+            self.misses += 1
+            return None
+
+    def version(self) -> int:
+        """Token to pass to `fill` after reading from the database."""
+        with self._lock:
+            return self._version
+
+    def fill(self, user: str, tasks: List[dict], limit: int, version: int, seq: int) -> None:
+        """Cache the result of an unfiltered per-user read, made after seeing change seq `seq`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            complete = len(tasks) < limit
+            if len(tasks) > self.per_user:
+                tasks = tasks[:self.per_user]
+                complete = False
+            self._entries[user] = _Entry([dict(t) for t in tasks], complete, seq)
+            self._entries.move_to_end(user)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def _advance(self, user: str, seq: int, previous_seq: int) -> Optional[_Entry]:
+        """
+        Move a user's entry on to the change `seq` written through.
+
+        The entry is dropped instead if it wasn't current to `previous_seq`,
+        the user's seq before that change: it missed a write.
+        """
+        entry = self._entries.get(user)
+        if entry is None:
+            return None
+        if entry.seq != previous_seq:
+            del self._entries[user]
+            return None
+        entry.seq = seq
+        return entry
+
+    def put_task(self, task: dict, seq: int, previous_seq: int) -> None:
+        """Write-through for an inserted or updated task row, recorded as change `seq`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._version += 1
+            entry = self._advance(task["user"], seq, previous_seq)
+            if entry is None:
+                return
+
+            tasks = [t for t in entry.tasks if t["id"] != task["id"]]
+            # Keep newest-first order; ties keep the existing rows first
+            index = len(tasks)
+            for i, existing in enumerate(tasks):
+                if existing["time"] < task["time"]:
+                    index = i
+                    break
+            if index == len(tasks) and not entry.complete:
+                # Older than everything cached: the uncached tail may hold
+                # rows that sort before it, so leave it out
+                entry.tasks = tasks
+                return
+            tasks.insert(index, dict(task))
+            if len(tasks) > self.per_user:
+                tasks.pop()
+                entry.complete = False
+            entry.tasks = tasks
+
+    def remove_task(self, user: str, task_id: int, seq: int, previous_seq: int) -> None:
+        """Write-through for a deleted task, recorded as change `seq`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._version += 1
+            entry = self._advance(user, seq, previous_seq)
+            if entry is not None:
+                entry.tasks = [t for t in entry.tasks if t["id"] != task_id]
+
+    def invalidate(self, user: str) -> None:
+        """Forget a user, e.g. after a write made by another process."""
+        with self._lock:
+            self._version += 1
+            self._entries.pop(user, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        """Hit ratio and approximate memory use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            tasks = sum(len(e.tasks) for e in self._entries.values())
+            memory = sys.getsizeof(self._entries) + sum(
+                sys.getsizeof(e.tasks) + sum(
+                    sys.getsizeof(t) + sum(sys.getsizeof(v) for v in t.values())
+                    for t in e.tasks
+                )
+                for e in self._entries.values()
+            )
+            return {
+                "enabled": self.enabled,
+                "users": len(self._entries),
+                "max_users": self.max_users,
+                "tasks": tasks,
+                "per_user": self.per_user,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "approx_memory_bytes": memory,
+            }
+
+
+task_cache = TaskCache()
@@ -1,17 +1,50 @@
+import heapq
 import sqlite3
 import os
+import time as _time
+import zlib
 from datetime import datetime
 from contextlib import contextmanager
-from typing import Optional, List, Tuple
+from typing import Callable, Dict, Iterator, Optional, List, Tuple
+from db.cache import task_cache
+from db.group_commit import GROUP_COMMIT_SYNC, GROUP_COMMIT_WINDOW_MS, SYNC_MODES, GroupCommitQueue
+from utils.metrics import timed_query
+from utils.tracing import traced_query
 
 # Use absolute path for database
 DB_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_NAME = os.path.join(DB_DIR, "tasks.db")
 
+# Rows fetched per round trip when streaming large result sets
+EXPORT_CHUNK_SIZE = 1000
+
+# Database files users' tasks are spread over (1: everything in DB_NAME).
+# Changing it needs a rebalance: python -m db.rebalance
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
+# Task IDs and change seqs of shard i start above i << SHARD_ID_BITS, so
+# an ID alone says which shard holds the task
+SHARD_ID_BITS = 40
+
+
+class PartialSaveError(sqlite3.Error):
+    """Raised by save_tasks_bulk when some of its tasks could not be saved."""
+
+    def __init__(self, saved: int, failed: int, error: sqlite3.Error):
+        super().__init__(f"{failed} task(s) not saved ({saved} saved): {error}")
+        self.saved = saved
+        self.failed = failed
+
+
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DB_NAME)
+def get_db_connection(check_same_thread: bool = True, path: Optional[str] = None):
+    """
+    Context manager for database connections.
+    
+    Pass check_same_thread=False for connections that are used across
+    threads, e.g. by a streaming response iterated in a thread pool.
+    `path` opens a task shard (see shard_path) instead of the main database.
+    """
+    conn = sqlite3.connect(path or DB_NAME, check_same_thread=check_same_thread)
     try:
         yield conn
     except Exception as e:
@@ -20,10 +53,224 @@ def get_db_connection():
     finally:
         conn.close()
 
-def init_db() -> None:
-    """Initialize the database schema."""
-    with get_db_connection() as conn:
+def shard_path(index: int) -> str:
+    """
+    File of task shard `index`.
+    
+    Shard 0 is the main database (DB_NAME), which also keeps the tables
+    that aren't sharded (profiles, delivery stats); shard i > 0 sits next
+    to it, e.g. db/tasks.shard1.db.
+    """
+    if index == 0:
+        return DB_NAME
+    root, ext = os.path.splitext(DB_NAME)
+    return f"{root}.shard{index}{ext}"
+
+
+def shard_paths() -> List[str]:
+    return [shard_path(index) for index in range(DB_SHARDS)]
+
+
+def shard_for_user(user: str, shards: Optional[int] = None) -> int:
+    """Shard holding a user's tasks: a hash that is stable across processes and restarts."""
+    return zlib.crc32(user.encode("utf-8")) % (shards or DB_SHARDS)
+
+
+def _user_db(user: str) -> str:
+    return shard_path(shard_for_user(user)) if DB_SHARDS > 1 else DB_NAME
+
+
+def _user_dbs(user: Optional[str]) -> List[str]:
+    """Shards to read for a query: the user's own, or all of them."""
+    return [_user_db(user)] if user else shard_paths()
+
+
+def _task_db(task_id: int) -> str:
+    index = int(task_id) >> SHARD_ID_BITS
+    return shard_path(index) if 0 < index < DB_SHARDS else DB_NAME
+
+
+def _due_time(task: Tuple) -> str:
+    return task[3]
+
+
+# A task change: (user, task_id, op, seq)
+TaskChange = Tuple[str, int, str, int]
+
+# Called with the list of committed changes after every write
+_change_listeners: List[Callable[[List[TaskChange]], None]] = []
+
+
+def add_change_listener(listener: Callable[[List[TaskChange]], None]) -> None:
+    """Register a callback for committed task changes (e.g. to publish events)."""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def _notify_changes(changes: List[TaskChange]) -> None:
+    changes = [c for c in changes if c]
+    if not changes:
+        return
+    for listener in _change_listeners:
+        try:
+            listener(changes)
+        except Exception:
+            # Listeners must never fail a write that has already committed
+            pass
+
+
+def _record_change(cursor, task_id: int, op: str, user: Optional[str] = None) -> Optional[TaskChange]:
+    """
+    Append a row to the change feed inside the caller's transaction.
+    
+    When `user` is not known it is read from the task row, so this must run
+    before a delete.
+    """
+    changed_at = datetime.now().isoformat()
+    if user is not None:
+        cursor.execute(
+            "INSERT INTO task_changes (user, task_id, op, changed_at) VALUES (?, ?, ?, ?)",
+            (user, task_id, op, changed_at)
+        )
+    else:
+        cursor.execute(
+            """
+            INSERT INTO task_changes (user, task_id, op, changed_at)
+            SELECT user, id, ?, ? FROM tasks WHERE id = ?
+            """,
+            (op, changed_at, task_id)
+        )
+        if cursor.rowcount == 0:
+            return None
+        cursor.execute("SELECT user FROM task_changes WHERE seq = ?", (cursor.lastrowid,))
+        user = cursor.fetchone()[0]
+    return (user, task_id, op, cursor.lastrowid)
+
+
+def _previous_seq(cursor, change: TaskChange) -> int:
+    """
+    The user's change seq before `change`, inside the caller's transaction.
+    
+    Lets the task cache tell whether its entry had seen every earlier
+    write, including ones made by other processes.
+    """
+    cursor.execute(
+        "SELECT MAX(seq) FROM task_changes WHERE user = ? AND seq < ?",
+        (change[0], change[3])
+    )
+    return cursor.fetchone()[0] or 0
+
+
+def _fetch_task(cursor, task_id: int) -> Optional[dict]:
+    """Read one task row as a dict (used to keep the task cache in sync)."""
+    cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def _insert_task(cursor, user: str, task: str, time_str: str,
+                 idempotency_key: Optional[str] = None) -> Optional[Tuple[int, TaskChange, dict, int]]:
+    """
+    Insert a task and its change-feed row inside the caller's transaction.
+    
+    Returns:
+        (task_id, change, row, previous seq), or None if a task was already saved under
+        `idempotency_key`; the caller then has to undo the insert
+    """
+    cursor.execute(
+        "INSERT INTO tasks (user, task, time) VALUES (?, ?, ?)",
+        (user, task, time_str)
+    )
+    task_id = cursor.lastrowid
+    if idempotency_key is not None:
+        cursor.execute(
+            "INSERT INTO idempotency_keys (key, task_id, created_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO NOTHING",
+            (idempotency_key, task_id, datetime.now().isoformat())
+        )
+        if cursor.rowcount == 0:
+            return None
+    change = _record_change(cursor, task_id, "created", user)
+    return task_id, change, _fetch_task(cursor, task_id), _previous_seq(cursor, change)
+
+
+def _saved_task_id(cursor, idempotency_key: str) -> int:
+    cursor.execute("SELECT task_id FROM idempotency_keys WHERE key = ?", (idempotency_key,))
+    return cursor.fetchone()[0]
+
+
+def _save_task_batch(items: List[Tuple[str, str, str, Optional[str]]]) -> List[object]:
+    """
+    Insert a batch of (user, task, time_str, idempotency_key), in one
+    transaction per shard.
+    
+    Each insert runs in its own savepoint, so one failing row is reported
+    to its caller without taking the rest of the batch down with it.
+    """
+    results: List[object] = [None] * len(items)
+    by_shard: Dict[str, List[int]] = {}
+    for position, item in enumerate(items):
+        by_shard.setdefault(_user_db(item[0]), []).append(position)
+    
+    changes = []
+    saved = []
+    for path, positions in by_shard.items():
+        shard_changes = []
+        shard_saved = []
+        try:
+            with get_db_connection(path=path) as conn:
+                conn.execute(f"PRAGMA synchronous={SYNC_MODES[GROUP_COMMIT_SYNC]}")
+                cursor = conn.cursor()
+                # Take the write lock up front: no other writer between the
+                # idempotency check and the commit
+                cursor.execute("BEGIN IMMEDIATE")
+                for position in positions:
+                    user, task, time_str, idempotency_key = items[position]
+                    cursor.execute("SAVEPOINT save_task")
+                    try:
+                        inserted = _insert_task(cursor, user, task, time_str, idempotency_key)
+                        if inserted is None:
+                            # A concurrent or earlier delivery already saved it
+                            cursor.execute("ROLLBACK TO save_task")
+                            results[position] = _saved_task_id(cursor, idempotency_key)
+                        else:
+                            task_id, change, row, previous = inserted
+                            results[position] = task_id
+                            shard_changes.append(change)
+                            shard_saved.append((row, change[3], previous))
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO save_task")
+                        results[position] = e
+                    cursor.execute("RELEASE save_task")
+                conn.commit()
+        except sqlite3.Error as e:
+            # Only this shard's callers fail; other shards have committed
+            for position in positions:
+                results[position] = e
+            continue
+        changes.extend(shard_changes)
+        saved.extend(shard_saved)
+    
+    for row, seq, previous in saved:
+        task_cache.put_task(row, seq, previous)
+    _notify_changes(changes)
+    return results
+
+
+# Writer thread batching concurrent save_task calls (GROUP_COMMIT_WINDOW_MS > 0)
+task_writer = GroupCommitQueue(_save_task_batch, name="task-writer")
+
+
+def _init_shard(index: int) -> None:
+    """Create the task tables of one shard."""
+    with get_db_connection(path=shard_path(index)) as conn:
         cursor = conn.cursor()
+        
+        # WAL lets long-running reads (e.g. exports) proceed alongside writers
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS tasks(
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,9 +289,118 @@ def init_db() -> None:
             # Column already exists
             pass
         
+        # Per-user task listings (get_all_tasks) read newest-first by user
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_user_time ON tasks(user, time)"
+        )
+        # Due tasks a dispatcher is delivering; a claim keeps other
+        # dispatcher processes off the task until it expires
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_claims(
+                task_id INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        
+        # Due-reminder lookups only ever look at pending, unsent tasks
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(time) "
+            "WHERE sent = 0 AND status = 'pending'"
+        )
+        
+        # Per-user change feed: one row per insert/update/snooze/delete/sent,
+        # with a sequence number that only ever increases
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_changes(
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL,
+                task_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                changed_at DATETIME NOT NULL
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_changes_user_seq ON task_changes(user, seq)"
+        )
+        # Rows past CHANGE_FEED_RETENTION_SECONDS are pruned by age
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_changes_changed_at ON task_changes(changed_at)"
+        )
+        # Highest seq pruned from each user's feed: cursors from before it
+        # have missed changes and must reload
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_changes_pruned(
+                user TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )
+        """)
+        
+        # Idempotency keys of webhook deliveries: the primary key makes a
+        # retried delivery unable to insert its task twice
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys(
+                key TEXT PRIMARY KEY,
+                task_id INTEGER NOT NULL,
+                created_at DATETIME NOT NULL
+            )
+        """)
+        # Keys past IDEMPOTENCY_TTL_SECONDS are pruned by age
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at)"
+        )
+        
+        # Start this shard's IDs in its own range (shard 0 starts at 1 as before)
+        if index > 0:
+            for table in ("tasks", "task_changes"):
+                cursor.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? WHERE NOT EXISTS "
+                    "(SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+                    (table, index << SHARD_ID_BITS, table)
+                )
+        
         conn.commit()
 
-def save_task(user: str, task: str, time: datetime) -> int:
+
+def init_db(shards: Optional[int] = None) -> None:
+    """Initialize the database schema, including every task shard (DB_SHARDS unless given)."""
+    for index in range(shards or DB_SHARDS):
+        _init_shard(index)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Per-user parsing preferences (timezone, languages, date order)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_profiles(
+                user TEXT PRIMARY KEY,
+                timezone TEXT,
+                languages TEXT,
+                date_order TEXT,
+                updated_at DATETIME NOT NULL
+            )
+        """)
+        
+        # One compact row per reminder delivery attempt (epoch seconds),
+        # written in batches by the scheduler
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS delivery_stats(
+                task_id INTEGER NOT NULL,
+                due_at REAL NOT NULL,
+                claimed_at REAL NOT NULL,
+                sent_at REAL NOT NULL,
+                ok INTEGER NOT NULL
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_delivery_stats_sent_at ON delivery_stats(sent_at)"
+        )
+        
+        conn.commit()
+
+@timed_query
+@traced_query
+def save_task(user: str, task: str, time: datetime, idempotency_key: Optional[str] = None) -> int:
     """
     Save a new task to the database.
     
@@ -52,9 +408,12 @@ def save_task(user: str, task: str, time: datetime) -> int:
         user: Username or identifier
         task: Task description
         time: Scheduled/created datetime
+        idempotency_key: Key of the delivery that created the task (optional).
+            If a task was already saved under this key, nothing is inserted
+            and that task's ID is returned.
     
     Returns:
-        The ID of the newly created task
+        The ID of the newly created (or previously saved) task
     
     Raises:
         ValueError: If parameters are invalid
@@ -65,64 +424,244 @@ def save_task(user: str, task: str, time: datetime) -> int:
     
     time_str = time.isoformat() if isinstance(time, datetime) else str(time)
     
-    with get_db_connection() as conn:
+    if GROUP_COMMIT_WINDOW_MS > 0:
+        # Committed together with other requests' inserts
+        return task_writer.submit(user, task, time_str, idempotency_key)
+    
+    with get_db_connection(path=_user_db(user)) as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO tasks (user, task, time) VALUES (?, ?, ?)",
-            (user, task, time_str)
-        )
+        inserted = _insert_task(cursor, user, task, time_str, idempotency_key)
+        if inserted is None:
+            # A concurrent or earlier delivery already saved it
+            conn.rollback()
+            return _saved_task_id(cursor, idempotency_key)
+        task_id, change, row, previous = inserted
         conn.commit()
-        return cursor.lastrowid
+    
+    task_cache.put_task(row, change[3], previous)
+    _notify_changes([change])
+    return task_id
+
+@timed_query
+@traced_query
+def save_tasks_bulk(tasks: List[Tuple[str, str, datetime]]) -> int:
+    """
+    Save many tasks in a single transaction (one per shard when sharded).
+    
+    Each shard's transaction commits on its own, so when one fails the
+    tasks bound for the other shards are still saved.
+    
+    Args:
+        tasks: List of (user, task, time) tuples
+    
+    Returns:
+        Number of tasks inserted
+    
+    Raises:
+        ValueError: If any user or task is empty
+        PartialSaveError: If any shard's transaction fails; carries how
+            many tasks were saved and how many were not
+    """
+    rows = []
+    for user, task, time in tasks:
+        if not user or not task:
+            raise ValueError("User and task cannot be empty")
+        time_str = time.isoformat() if isinstance(time, datetime) else str(time)
+        rows.append((user, task, time_str))
+    
+    if not rows:
+        return 0
+    
+    by_shard: Dict[str, List[Tuple[str, str, str]]] = {}
+    for row in rows:
+        by_shard.setdefault(_user_db(row[0]), []).append(row)
+    
+    changes = []
+    saved = []
+    failed = 0
+    error: Optional[sqlite3.Error] = None
+    for path, shard_rows in by_shard.items():
+        shard_changes = []
+        shard_saved = []
+        try:
+            with get_db_connection(path=path) as conn:
+                cursor = conn.cursor()
+                for row in shard_rows:
+                    cursor.execute("INSERT INTO tasks (user, task, time) VALUES (?, ?, ?)", row)
+                    task_id = cursor.lastrowid
+                    change = _record_change(cursor, task_id, "created", row[0])
+                    shard_changes.append(change)
+                    task = _fetch_task(cursor, task_id)
+                    shard_saved.append((task, change[3], _previous_seq(cursor, change)))
+                conn.commit()
+        except sqlite3.Error as e:
+            failed += len(shard_rows)
+            error = error or e
+            continue
+        changes.extend(shard_changes)
+        saved.extend(shard_saved)
+    
+    for task, seq, previous in saved:
+        task_cache.put_task(task, seq, previous)
+    _notify_changes(changes)
+    if error is not None:
+        raise PartialSaveError(len(saved), failed, error)
+    return len(rows)
 
+@timed_query
+@traced_query
 def get_tasks(user: Optional[str] = None, status: Optional[str] = None) -> List[Tuple]:
     """Retrieve tasks, optionally filtered by user and/or status."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        query = "SELECT * FROM tasks WHERE 1=1"
-        params = []
-        
-        if user:
-            query += " AND user = ?"
-            params.append(user)
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        
-        cursor.execute(query, params)
-        return cursor.fetchall()
+    query = "SELECT * FROM tasks WHERE 1=1"
+    params = []
+    
+    if user:
+        query += " AND user = ?"
+        params.append(user)
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+    
+    tasks = []
+    for path in _user_dbs(user):
+        with get_db_connection(path=path) as conn:
+            tasks.extend(conn.execute(query, params).fetchall())
+    return tasks
 
+@timed_query
+@traced_query
 def update_task_status(task_id: int, status: str) -> bool:
     """Update the status of a task."""
-    with get_db_connection() as conn:
+    with get_db_connection(path=_task_db(task_id)) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE tasks SET status = ? WHERE id = ?",
             (status, task_id)
         )
+        if cursor.rowcount == 0:
+            return False
+        change = _record_change(cursor, task_id, "updated")
+        row = _fetch_task(cursor, task_id)
+        previous = _previous_seq(cursor, change)
         conn.commit()
-        return cursor.rowcount > 0
+    
+    task_cache.put_task(row, change[3], previous)
+    _notify_changes([change])
+    return True
 
 
+@timed_query
+@traced_query
 def get_due_tasks() -> List[Tuple]:
     """
     Get all tasks that are due (time <= now) and haven't been sent yet.
     
     Returns:
-        List of tuples: (id, user, task, time, status, sent)
+        List of tuples: (id, user, task, time, status, sent), earliest first
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        now = datetime.now().isoformat()
-        cursor.execute("""
-            SELECT * FROM tasks 
-            WHERE time <= ? 
-            AND sent = 0 
-            AND status = 'pending'
-            ORDER BY time ASC
-        """, (now,))
-        return cursor.fetchall()
+    now = datetime.now().isoformat()
+    per_shard = []
+    for path in shard_paths():
+        with get_db_connection(path=path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM tasks 
+                WHERE time <= ? 
+                AND sent = 0 
+                AND status = 'pending'
+                ORDER BY time ASC
+            """, (now,))
+            per_shard.append(cursor.fetchall())
+    # Each shard's list is already in due order
+    return list(heapq.merge(*per_shard, key=_due_time))
 
 
+@timed_query
+@traced_query
+def claim_due_tasks(owner: str, lease_seconds: float) -> List[Tuple]:
+    """
+    Claim the due, unsent tasks nobody else holds a live claim on.
+    
+    Claiming is one write transaction per shard, so dispatchers running in
+    several processes never get the same task. A claim lapses after
+    `lease_seconds` (e.g. if its dispatcher died mid-delivery) or when
+    released.
+    
+    Args:
+        owner: Identifies the claiming dispatcher
+        lease_seconds: How long the claim holds
+        
+    Returns:
+        List of tuples: (id, user, task, time, status, sent), as get_due_tasks
+    """
+    per_shard = []
+    for path in shard_paths():
+        with get_db_connection(path=path) as conn:
+            cursor = conn.cursor()
+            now = _time.time()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("DELETE FROM task_claims WHERE expires_at <= ?", (now,))
+            cursor.execute("""
+                SELECT t.* FROM tasks t
+                WHERE t.time <= ? 
+                AND t.sent = 0 
+                AND t.status = 'pending'
+                AND t.id NOT IN (SELECT task_id FROM task_claims)
+                ORDER BY t.time ASC
+            """, (datetime.now().isoformat(),))
+            tasks = cursor.fetchall()
+            cursor.executemany(
+                "INSERT INTO task_claims (task_id, owner, expires_at) VALUES (?, ?, ?)",
+                [(task[0], owner, now + lease_seconds) for task in tasks]
+            )
+            conn.commit()
+        per_shard.append(tasks)
+    return list(heapq.merge(*per_shard, key=_due_time))
+
+
+@timed_query
+@traced_query
+def release_task_claim(task_id: int, retry_after: float = 0) -> None:
+    """
+    Let the task be claimed again `retry_after` seconds from now, e.g.
+    after a failed delivery.
+    """
+    with get_db_connection(path=_task_db(task_id)) as conn:
+        conn.execute(
+            "UPDATE task_claims SET expires_at = ? WHERE task_id = ?",
+            (_time.time() + retry_after, task_id)
+        )
+        conn.commit()
+
+
+@timed_query
+@traced_query
+def get_next_due_time() -> Optional[datetime]:
+    """
+    Get the due time of the earliest pending task that hasn't been sent
+    and isn't claimed by a dispatcher.
+    
+    Returns:
+        The due time, or None if no reminder is waiting
+    """
+    earliest = None
+    for path in shard_paths():
+        with get_db_connection(path=path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT MIN(time) FROM tasks 
+                WHERE sent = 0 
+                AND status = 'pending'
+                AND id NOT IN (SELECT task_id FROM task_claims WHERE expires_at > ?)
+            """, (_time.time(),))
+            row = cursor.fetchone()
+        if row and row[0] and (earliest is None or row[0] < earliest):
+            earliest = row[0]
+    return datetime.fromisoformat(earliest) if earliest else None
+
+
+@timed_query
+@traced_query
 def mark_task_sent(task_id: int) -> bool:
     """
     Mark a task as sent (reminder delivered).
@@ -133,17 +672,29 @@ def mark_task_sent(task_id: int) -> bool:
     Returns:
         True if task was updated, False otherwise
     """
-    with get_db_connection() as conn:
+    with get_db_connection(path=_task_db(task_id)) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE tasks SET sent = 1, status = 'sent' WHERE id = ?",
             (task_id,)
         )
+        if cursor.rowcount == 0:
+            return False
+        cursor.execute("DELETE FROM task_claims WHERE task_id = ?", (task_id,))
+        change = _record_change(cursor, task_id, "sent")
+        row = _fetch_task(cursor, task_id)
+        previous = _previous_seq(cursor, change)
         conn.commit()
-        return cursor.rowcount > 0
+    
+    task_cache.put_task(row, change[3], previous)
+    _notify_changes([change])
+    return True
 
 
-def get_all_tasks(user: Optional[str] = None, status: Optional[str] = None, limit: int = 100) -> List[dict]:
+@timed_query
+@traced_query
+def get_all_tasks(user: Optional[str] = None, status: Optional[str] = None, limit: int = 100,
+                  shared: bool = False) -> List[dict]:
     """
     Get all tasks with optional filtering.
     
@@ -151,34 +702,105 @@ def get_all_tasks(user: Optional[str] = None, status: Optional[str] = None, limi
         user: Filter by username (optional)
         status: Filter by status (optional)
         limit: Maximum number of results
+        shared: Return cached task dicts without copying them; the caller
+            must not modify them (e.g. when they are only serialized)
         
     Returns:
         List of task dictionaries with all fields
     """
-    with get_db_connection() as conn:
-        conn.row_factory = sqlite3.Row  # Enable column access by name
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM tasks WHERE 1=1"
-        params = []
-        
-        if user:
-            query += " AND user = ?"
-            params.append(user)
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        
-        query += " ORDER BY time DESC LIMIT ?"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+    # Per-user listings are served from the write-through cache when possible
+    seq = None
+    if user and task_cache.enabled:
+        # Checked on every hit: an entry that missed a write (e.g. one made
+        # by another process) no longer matches the user's change seq
+        seq = get_change_seq(user)
+        cached = task_cache.get(user, status, limit, seq, copy=not shared)
+        if cached is not None:
+            return cached
+    cache_version = task_cache.version()
+    
+    query = "SELECT * FROM tasks WHERE 1=1"
+    params = []
+    
+    if user:
+        query += " AND user = ?"
+        params.append(user)
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+    
+    query += " ORDER BY time DESC LIMIT ?"
+    params.append(limit)
+    
+    per_shard = []
+    for path in _user_dbs(user):
+        with get_db_connection(path=path) as conn:
+            conn.row_factory = sqlite3.Row  # Enable column access by name
+            # Convert rows to dictionaries
+            per_shard.append([dict(row) for row in conn.execute(query, params)])
+    
+    if len(per_shard) == 1:
+        tasks = per_shard[0]
+    else:
+        # Newest first across shards: merge each shard's top `limit`
+        merged = heapq.merge(*per_shard, key=lambda task: task["time"], reverse=True)
+        tasks = [task for task, _ in zip(merged, range(limit))]
+    
+    if seq is not None and status is None:
+        task_cache.fill(user, tasks, limit, cache_version, seq)
+    return tasks
+
+
+def iter_task_chunks(user: Optional[str] = None, status: Optional[str] = None,
+                     chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Tuple[List[str], List[Tuple]]]:
+    """
+    Stream tasks from a single cursor (per shard) in fixed-size chunks.
+    
+    Only one chunk is held in memory at a time, regardless of how many
+    tasks match. Tasks are returned in id order; shards hold ascending ID
+    ranges, so reading them one after the other keeps that order.
+    
+    Args:
+        user: Filter by username (optional)
+        status: Filter by status (optional)
+        chunk_size: Rows fetched per chunk
         
-        # Convert rows to dictionaries
-        return [dict(row) for row in rows]
+    Yields:
+        (columns, rows) tuples, where rows is a list of row tuples; if
+        nothing matches, a single (columns, []) so the columns are known
+    """
+    query = "SELECT * FROM tasks WHERE 1=1"
+    params = []
+    
+    if user:
+        query += " AND user = ?"
+        params.append(user)
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+    
+    query += " ORDER BY id"
+    
+    found = False
+    for path in _user_dbs(user):
+        with get_db_connection(check_same_thread=False, path=path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            columns = [col[0] for col in cursor.description]
+            
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                found = True
+                yield columns, rows
+    
+    if not found:
+        yield columns, []
 
 
+@timed_query
+@traced_query
 def delete_task(task_id: int) -> bool:
     """
     Delete a task by ID.
@@ -189,13 +811,22 @@ def delete_task(task_id: int) -> bool:
     Returns:
         True if task was deleted, False if not found
     """
-    with get_db_connection() as conn:
+    with get_db_connection(path=_task_db(task_id)) as conn:
         cursor = conn.cursor()
+        change = _record_change(cursor, task_id, "deleted")
+        if change is None:
+            return False
         cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        previous = _previous_seq(cursor, change)
         conn.commit()
-        return cursor.rowcount > 0
+    
+    task_cache.remove_task(change[0], task_id, change[3], previous)
+    _notify_changes([change])
+    return True
 
 
+@timed_query
+@traced_query
 def update_task(task_id: int, task_text: Optional[str] = None, 
                 time: Optional[datetime] = None, status: Optional[str] = None) -> bool:
     """
@@ -210,7 +841,7 @@ def update_task(task_id: int, task_text: Optional[str] = None,
     Returns:
         True if task was updated, False if not found
     """
-    with get_db_connection() as conn:
+    with get_db_connection(path=_task_db(task_id)) as conn:
         cursor = conn.cursor()
         
         updates = []
@@ -234,10 +865,20 @@ def update_task(task_id: int, task_text: Optional[str] = None,
         query = f"UPDATE tasks SET {', '.join(updates)} WHERE id = ?"
         
         cursor.execute(query, params)
+        if cursor.rowcount == 0:
+            return False
+        change = _record_change(cursor, task_id, "updated")
+        row = _fetch_task(cursor, task_id)
+        previous = _previous_seq(cursor, change)
         conn.commit()
-        return cursor.rowcount > 0
+    
+    task_cache.put_task(row, change[3], previous)
+    _notify_changes([change])
+    return True
 
 
+@timed_query
+@traced_query
 def snooze_task(task_id: int, minutes: int) -> bool:
     """
     Snooze a task by adding minutes to its scheduled time.
@@ -251,7 +892,7 @@ def snooze_task(task_id: int, minutes: int) -> bool:
     """
     from datetime import timedelta
     
-    with get_db_connection() as conn:
+    with get_db_connection(path=_task_db(task_id)) as conn:
         cursor = conn.cursor()
         
         # Get current task time
@@ -272,5 +913,304 @@ def snooze_task(task_id: int, minutes: int) -> bool:
             "UPDATE tasks SET time = ?, sent = 0, status = 'pending' WHERE id = ?",
             (new_time.isoformat(), task_id)
         )
+        if cursor.rowcount == 0:
+            return False
+        change = _record_change(cursor, task_id, "snoozed")
+        row = _fetch_task(cursor, task_id)
+        previous = _previous_seq(cursor, change)
+        conn.commit()
+    
+    task_cache.put_task(row, change[3], previous)
+    _notify_changes([change])
+    return True
+
+
+@timed_query
+@traced_query
+def get_change_seq(user: Optional[str] = None) -> int:
+    """
+    Get the latest change sequence number, for one user or overall.
+    
+    Returns:
+        For a user, the highest seq recorded (their change feed cursor);
+        overall, the number of changes made in any shard, which moves on
+        with every write whichever shard it lands in. 0 if nothing has
+        changed yet.
+    """
+    if user:
+        with get_db_connection(path=_user_db(user)) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(seq) FROM task_changes WHERE user = ?", (user,))
+            return cursor.fetchone()[0] or 0
+    
+    # Shard i's seqs start above i << SHARD_ID_BITS: add up each shard's
+    # own count rather than take the maximum, which the highest shard
+    # would always win
+    version = 0
+    for index, path in enumerate(shard_paths()):
+        with get_db_connection(path=path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'task_changes'")
+            row = cursor.fetchone()
+        if row:
+            version += row[0] - (index << SHARD_ID_BITS)
+    return version
+
+
+@timed_query
+@traced_query
+def get_changes_since(user: str, since: int, limit: int = 500) -> Tuple[Optional[List[dict]], int]:
+    """
+    Get a user's task changes after sequence number `since`.
+    
+    Several changes to the same task collapse into one entry carrying the
+    task's current row (or None once it has been deleted).
+    
+    Args:
+        user: Username or identifier
+        since: Last sequence number the client has seen
+        limit: Maximum changes to read; beyond this a full reload is cheaper
+        
+    Returns:
+        (changes, seq): changes is a list of dicts with seq, op, task_id and
+        task, or None if more than `limit` changes are pending (or `since`
+        is from another shard's feed, after a rebalance moved the user, or
+        from before changes that have been pruned);
+        seq is the sequence number to resume from next time
+    """
+    with get_db_connection(path=_user_db(user)) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT c.seq, c.op, c.task_id, t.id, t.user, t.task, t.time, t.status, t.sent
+            FROM task_changes c LEFT JOIN tasks t ON t.id = c.task_id
+            WHERE c.user = ? AND c.seq > ?
+            ORDER BY c.seq
+            LIMIT ?
+            """,
+            (user, since, limit + 1)
+        )
+        rows = cursor.fetchall()
+        cursor.execute("SELECT seq FROM task_changes_pruned WHERE user = ?", (user,))
+        pruned = cursor.fetchone()
+        if pruned and since < pruned[0]:
+            return None, since
+        home = shard_for_user(user) if DB_SHARDS > 1 else 0
+        if not rows and since >> SHARD_ID_BITS != home:
+            cursor.execute("SELECT MAX(seq) FROM task_changes WHERE user = ?", (user,))
+            if since > (cursor.fetchone()[0] or 0):
+                return None, since
+    
+    if len(rows) > limit:
+        return None, since
+    
+    latest = {}
+    for row in rows:
+        task = None
+        if row["id"] is not None:
+            task = {key: row[key] for key in ("id", "user", "task", "time", "status", "sent")}
+        latest.pop(row["task_id"], None)
+        latest[row["task_id"]] = {
+            "seq": row["seq"],
+            "op": row["op"],
+            "task_id": row["task_id"],
+            "task": task,
+        }
+    
+    seq = rows[-1]["seq"] if rows else since
+    return list(latest.values()), seq
+
+
+@timed_query
+@traced_query
+def get_task_by_idempotency_key(key: str, user: Optional[str] = None) -> Optional[dict]:
+    """
+    Get the task saved by a webhook delivery with this idempotency key.
+    
+    Args:
+        key: Idempotency key of the delivery
+        user: Sender of the delivery (optional); only their shard is searched
+    
+    Returns:
+        The task dictionary, or None if the key is unknown or its task
+        has since been deleted
+    """
+    for path in _user_dbs(user):
+        with get_db_connection(path=path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT tasks.* FROM idempotency_keys "
+                "JOIN tasks ON tasks.id = idempotency_keys.task_id WHERE key = ?",
+                (key,)
+            )
+            row = cursor.fetchone()
+        if row:
+            return dict(row)
+    return None
+
+
+@timed_query
+@traced_query
+def prune_idempotency_keys(older_than: datetime) -> int:
+    """
+    Delete idempotency keys recorded before `older_than`, in every shard.
+    
+    A delivery retried after that is treated as a new message, as the
+    in-memory store does once a response expires.
+    
+    Returns:
+        Number of keys deleted
+    """
+    deleted = 0
+    for path in shard_paths():
+        with get_db_connection(path=path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (older_than.isoformat(),))
+            deleted += cursor.rowcount
+            conn.commit()
+    return deleted
+
+
+@timed_query
+@traced_query
+def prune_task_changes(older_than: datetime) -> int:
+    """
+    Delete change-feed rows recorded before `older_than`, in every shard.
+    
+    Each user's latest change is kept, so their change seq (and the ETags
+    built from it) never goes back. Clients following the feed from
+    before a pruned change get a full reload instead.
+    
+    Returns:
+        Number of changes deleted
+    """
+    cutoff = older_than.isoformat()
+    stale = """
+        FROM task_changes WHERE changed_at < ?
+        AND seq < (SELECT MAX(seq) FROM task_changes latest WHERE latest.user = task_changes.user)
+    """
+    deleted = 0
+    for path in shard_paths():
+        with get_db_connection(path=path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                f"INSERT INTO task_changes_pruned (user, seq) SELECT user, MAX(seq) {stale} GROUP BY user "
+                "ON CONFLICT(user) DO UPDATE SET seq = MAX(seq, excluded.seq)",
+                (cutoff,)
+            )
+            cursor.execute(f"DELETE {stale}", (cutoff,))
+            deleted += cursor.rowcount
+            conn.commit()
+    return deleted
+
+
+@timed_query
+@traced_query
+def save_delivery_stats(rows: List[Tuple[int, float, float, float, bool]],
+                        prune_before: Optional[float] = None) -> int:
+    """
+    Save a batch of delivery records in one transaction.
+    
+    Args:
+        rows: (task_id, due_at, claimed_at, sent_at, ok) tuples, times in epoch seconds
+        prune_before: Also delete records sent before this time (optional)
+    
+    Returns:
+        Number of records saved
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO delivery_stats (task_id, due_at, claimed_at, sent_at, ok) VALUES (?, ?, ?, ?, ?)",
+            [(task_id, due, claimed, sent, int(ok)) for task_id, due, claimed, sent, ok in rows]
+        )
+        if prune_before is not None:
+            cursor.execute("DELETE FROM delivery_stats WHERE sent_at < ?", (prune_before,))
+        conn.commit()
+    return len(rows)
+
+
+@timed_query
+@traced_query
+def get_delivery_stats(since: float, until: Optional[float] = None) -> List[Tuple]:
+    """
+    Get delivery records sent within a time range.
+    
+    Args:
+        since: Start of the range, epoch seconds
+        until: End of the range, epoch seconds (default: no limit)
+    
+    Returns:
+        List of tuples: (due_at, claimed_at, sent_at, ok), oldest first
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT due_at, claimed_at, sent_at, ok FROM delivery_stats "
+            "WHERE sent_at >= ? AND sent_at < ? ORDER BY sent_at",
+            (since, until if until is not None else float("inf"))
+        )
+        return cursor.fetchall()
+
+
+@timed_query
+@traced_query
+def get_user_profile(user: str) -> Optional[dict]:
+    """
+    Get a user's parsing profile.
+    
+    Args:
+        user: Username or identifier
+        
+    Returns:
+        Dict with timezone, languages (list) and date_order, or None if the
+        user has no profile
+    """
+    with get_db_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM user_profiles WHERE user = ?", (user,))
+        row = cursor.fetchone()
+        
+        if not row:
+            return None
+        
+        profile = dict(row)
+        profile["languages"] = profile["languages"].split(",") if profile["languages"] else []
+        return profile
+
+
+@timed_query
+@traced_query
+def save_user_profile(user: str, timezone: Optional[str] = None,
+                      languages: Optional[List[str]] = None,
+                      date_order: Optional[str] = None) -> None:
+    """
+    Create or replace a user's parsing profile.
+    
+    Args:
+        user: Username or identifier
+        timezone: IANA timezone name, e.g. "Africa/Nairobi" (optional)
+        languages: Preferred language codes, e.g. ["en"] (optional)
+        date_order: Date order for ambiguous dates, e.g. "DMY" (optional)
+    
+    Raises:
+        ValueError: If user is empty
+    """
+    if not user:
+        raise ValueError("User cannot be empty")
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO user_profiles (user, timezone, languages, date_order, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (user, timezone, ",".join(languages) if languages else None,
+             date_order, datetime.now().isoformat())
+        )
         conn.commit()
-        return cursor.rowcount > 0
@@ -0,0 +1,120 @@
+"""
+Group commit for concurrent writes.
+
+Every `save_task` normally runs its own transaction, and with SQLite's
+single writer the commits (each with its own fsync) of concurrent webhook
+requests queue up behind each other. With GROUP_COMMIT_WINDOW_MS set,
+writes are instead handed to one writer thread that collects whatever
+arrives within the window and commits it in a single transaction. Callers
+block until that commit, so each still gets its own result (the task ID)
+before responding, and nothing is acknowledged that isn't committed.
+
+GROUP_COMMIT_SYNC picks what a commit waits for: "full" (the default, as
+for every other write) syncs the WAL to disk on each commit; "normal"
+syncs only at checkpoints, so a committed batch survives the process
+crashing but not the machine losing power.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+from utils.logger import log
+
+# Milliseconds inserts are collected for one commit (0: each save commits on its own)
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "0"))
+# Most writes committed in one transaction
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "500"))
+# Durability of a group commit: "full" or "normal" (SQLite's synchronous setting)
+GROUP_COMMIT_SYNC = os.getenv("GROUP_COMMIT_SYNC", "full").lower()
+
+SYNC_MODES = {"full": "FULL", "normal": "NORMAL"}
+if GROUP_COMMIT_SYNC not in SYNC_MODES:
+    log(f"Unknown GROUP_COMMIT_SYNC={GROUP_COMMIT_SYNC!r}, using 'full'", "warning")
+    GROUP_COMMIT_SYNC = "full"
+
+
+class GroupCommitQueue:
+    """
+    Funnels writes from many threads into batches for one writer thread.
+
+    `commit_batch` receives the queued items in order and returns one
+    result per item; a result that is an exception is raised to that
+    item's caller only. If `commit_batch` itself raises, every caller in
+    the batch gets the error.
+    """
+
+    def __init__(self, commit_batch: Callable[[List[tuple]], Sequence[object]],
+                 window_ms: float = GROUP_COMMIT_WINDOW_MS,
+                 max_batch: int = GROUP_COMMIT_MAX_BATCH, name: str = "group-commit"):
+        self.commit_batch = commit_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.name = name
+        self.batches = 0
+        self.committed = 0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, *item) -> object:
+        """
+        Queue one write and wait for the commit that includes it.
+
+        Returns:
+            This item's result from `commit_batch`
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.put((item, future))
+        return future.result()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Commit what is queued and stop the writer thread (the next submit starts a new one)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._commit(batch)
+
+    def _commit(self, batch: List[tuple]) -> None:
+        try:
+            results = self.commit_batch([item for item, _ in batch])
+        except Exception as e:
+            log(f"Group commit of {len(batch)} write(s) failed: {e}", "error")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.committed += len(batch)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,161 @@
+"""
+Move users' tasks to their shard after DB_SHARDS changes.
+
+Each user's tasks live in shard `shard_for_user(user)`, so changing the
+number of shards (including going from the single tasks.db to several)
+leaves most users in the wrong file until they are moved:
+
+    python -m db.rebalance --shards 4 --dry-run
+    python -m db.rebalance --shards 4
+
+then start the app with DB_SHARDS=4. Run it with the app stopped and a
+copy of db/ kept: each user is moved in a single transaction, but SQLite
+in WAL mode doesn't make a transaction across two files atomic, so a
+crash mid-move can leave that user's tasks in both.
+
+A moved task gets a new ID in its new shard's range (IDs say which shard
+holds a task). Its idempotency keys go along, claims are dropped (the
+dispatcher claims it again), and the user's change feed is replaced by a
+deleted/created pair per task, so open pages swap the old IDs for the
+new ones, or reload, when they reconnect.
+"""
+import argparse
+import glob
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from db import database
+from db.cache import task_cache
+from utils.logger import log
+
+
+def existing_shards() -> List[int]:
+    """Indexes of the shard files on disk (0, the main database, always)."""
+    root, ext = os.path.splitext(database.DB_NAME)
+    pattern = re.compile(re.escape(root) + r"\.shard(\d+)" + re.escape(ext) + "$")
+    found = {0}
+    for path in glob.glob(f"{glob.escape(root)}.shard*{ext}"):
+        match = pattern.match(path)
+        if match:
+            found.add(int(match.group(1)))
+    return sorted(found)
+
+
+def plan(shards: int) -> List[Tuple[str, int, int]]:
+    """
+    Users that are not in their shard for a given shard count.
+
+    Returns:
+        (user, current shard, target shard) tuples
+    """
+    moves = []
+    for source in existing_shards():
+        with database.get_db_connection(path=database.shard_path(source)) as conn:
+            users = [row[0] for row in conn.execute("SELECT DISTINCT user FROM tasks ORDER BY user")]
+        for user in users:
+            target = database.shard_for_user(user, shards)
+            if target != source:
+                moves.append((user, source, target))
+    return moves
+
+
+def move_user(user: str, source: int, target: int) -> int:
+    """
+    Move one user's tasks from shard `source` to shard `target`.
+
+    Returns:
+        Number of tasks moved
+    """
+    now = datetime.now().isoformat()
+    with database.get_db_connection(path=database.shard_path(source)) as conn:
+        conn.execute("ATTACH DATABASE ? AS dst", (database.shard_path(target),))
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "SELECT id, task, time, status, sent FROM main.tasks WHERE user = ? ORDER BY id",
+            (user,)
+        )
+        rows = cursor.fetchall()
+        for old_id, task, time_str, status, sent in rows:
+            cursor.execute(
+                "INSERT INTO dst.tasks (user, task, time, status, sent) VALUES (?, ?, ?, ?, ?)",
+                (user, task, time_str, status, sent)
+            )
+            new_id = cursor.lastrowid
+            cursor.execute(
+                "INSERT INTO dst.idempotency_keys (key, task_id, created_at) "
+                "SELECT key, ?, created_at FROM main.idempotency_keys WHERE task_id = ?",
+                (new_id, old_id)
+            )
+            cursor.executemany(
+                "INSERT INTO dst.task_changes (user, task_id, op, changed_at) VALUES (?, ?, ?, ?)",
+                [(user, old_id, "deleted", now), (user, new_id, "created", now)]
+            )
+        for table in ("idempotency_keys", "task_claims"):
+            cursor.execute(
+                f"DELETE FROM main.{table} WHERE task_id IN (SELECT id FROM main.tasks WHERE user = ?)",
+                (user,)
+            )
+        cursor.execute("DELETE FROM main.tasks WHERE user = ?", (user,))
+        for table in ("task_changes", "task_changes_pruned"):
+            cursor.execute(f"DELETE FROM main.{table} WHERE user = ?", (user,))
+        conn.commit()
+        conn.execute("DETACH DATABASE dst")
+    task_cache.invalidate(user)
+    return len(rows)
+
+
+def rebalance(shards: int, dry_run: bool = False) -> Dict[str, object]:
+    """
+    Move every user to their shard for `shards` shards.
+
+    The running process keeps routing by DB_SHARDS; only the files change.
+
+    Returns:
+        Summary with users and tasks moved per "source->target" pair,
+        and the shard files left empty (beyond `shards`) that may be deleted
+    """
+    if shards < 1:
+        raise ValueError("shards must be at least 1")
+    if not dry_run:
+        database.init_db(shards)
+
+    users: Counter = Counter()
+    tasks: Counter = Counter()
+    for user, source, target in plan(shards):
+        pair = f"{source}->{target}"
+        users[pair] += 1
+        if not dry_run:
+            tasks[pair] += move_user(user, source, target)
+
+    unused = [database.shard_path(index) for index in existing_shards() if index >= shards]
+    return {"users": dict(users), "tasks": dict(tasks), "unused_files": unused}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Move users' tasks to their shard for a new shard count")
+    parser.add_argument("--shards", type=int, default=database.DB_SHARDS,
+                        help="Shard count to rebalance for (default: DB_SHARDS)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which users would move")
+    args = parser.parse_args(argv)
+
+    summary = rebalance(args.shards, args.dry_run)
+
+    verb = "would move" if args.dry_run else "moved"
+    if not summary["users"]:
+        print(f"Every user is already in their shard for {args.shards} shard(s)")
+    for pair, count in sorted(summary["users"].items()):
+        moved = "" if args.dry_run else f" ({summary['tasks'][pair]} tasks)"
+        print(f"shard {pair}: {verb} {count} user(s){moved}")
+    for path in summary["unused_files"]:
+        print(f"{path} is no longer used and can be deleted")
+    if not args.dry_run:
+        log(f"Rebalanced tasks across {args.shards} shard(s)", "info")
+        print(f"Start the app with DB_SHARDS={args.shards}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,20 @@
 from agents.task_agent import process_message
-from db.database import init_db
+from db.database import PartialSaveError, init_db, save_tasks_bulk
+from utils.export import EXPORT_FORMATS, iter_export
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Tuple
+import argparse
+import os
 import sys
+import time
 
-def main():
+# Number of lines parsed and inserted together when importing
+DEFAULT_BATCH_SIZE = 500
+
+
+def run_interactive(user: str):
     """Run the task reminder agent in interactive mode."""
-    # Get username from command line or use default
-    user = sys.argv[1] if len(sys.argv) > 1 else "local-user"
-    
-    # Initialize database
-    try:
-        init_db()
-    except Exception as e:
-        print(f"❌ Failed to initialize database: {e}")
-        return
-    
     # Welcome message
     print(f"Task Reminder Agent — User: {user}")
     print("Type 'exit' to quit, 'help' for commands\n")
@@ -22,27 +23,27 @@ def main():
         try:
             # Get user input
             msg = input("You: ").strip()
-            
+
             # Handle empty input
             if not msg:
                 continue
-            
+
             # Handle exit command
             if msg.lower() in ["exit", "quit", "q"]:
                 print("👋 Goodbye!")
                 break
-            
+
             # Handle help command
             if msg.lower() == "help":
                 print("Commands:")
                 print("  • Type a task with time: 'remind me at 5pm to study'")
                 print("  • exit/quit/q - Exit the program")
                 continue
-            
+
             # Process message
             reply = process_message(user, msg)
             print("Agent:", reply)
-            
+
         except KeyboardInterrupt:
             print("\n\n👋 Interrupted. Goodbye!")
             break
@@ -50,5 +51,191 @@ def main():
             print(f"❌ Error: {e}")
             print("Please try again or type 'exit' to quit.")
 
+
+def read_messages(lines: Iterable[str], default_user: str) -> Iterator[Tuple[int, str, str]]:
+    """
+    Turn raw import lines into (line_no, user, message) items.
+
+    Each line is either a message for `default_user` or `user<TAB>message`.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        user, sep, message = line.partition("\t")
+        if sep and user.strip() and message.strip():
+            yield line_no, user.strip(), message.strip()
+        else:
+            yield line_no, default_user, line
+
+
+def parse_message(item: Tuple[int, str, str]) -> Tuple[int, str, Optional[str], object, Optional[str]]:
+    """
+    Parse one import item. Runs inside worker processes.
+
+    Returns:
+        (line_no, user, task, time, error) — task and time are None on error
+    """
+    from utils.nlp import extract_task_and_time
+    from utils.profiles import get_parse_context
+
+    line_no, user, message = item
+    try:
+        data = extract_task_and_time(message, context=get_parse_context(user))
+    except Exception as e:
+        return line_no, user, None, None, f"parse error: {e}"
+
+    if not data["time"]:
+        return line_no, user, None, None, "no time detected"
+    if not data["task"] or not data["task"].strip():
+        return line_no, user, None, None, "no task detected"
+    return line_no, user, data["task"], data["time"], None
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of at most `size` items without reading ahead further."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_messages(lines: Iterable[str], default_user: str, workers: int = 1,
+                    batch_size: int = DEFAULT_BATCH_SIZE, errors_out=None) -> dict:
+    """
+    Stream messages through parsing and batched database inserts.
+
+    Lines are consumed lazily one batch at a time, so memory stays bounded
+    by `batch_size` no matter how large the input is.
+
+    Args:
+        lines: Iterable of raw input lines (file object, stdin, list)
+        default_user: User for lines without a `user<TAB>` prefix
+        workers: Number of parser processes (1 parses in-process)
+        batch_size: Lines parsed and inserted per batch
+        errors_out: Stream to report rejected lines to (optional)
+
+    Returns:
+        Dict of import statistics
+    """
+    stats = {"messages": 0, "imported": 0, "rejected": 0, "db_errors": 0}
+    started = time.perf_counter()
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for batch in _batches(read_messages(lines, default_user), batch_size):
+            if executor:
+                chunksize = max(1, len(batch) // (workers * 4))
+                parsed = executor.map(parse_message, batch, chunksize=chunksize)
+            else:
+                parsed = map(parse_message, batch)
+
+            rows = []
+            for line_no, user, task, task_time, error in parsed:
+                stats["messages"] += 1
+                if error:
+                    stats["rejected"] += 1
+                    if errors_out:
+                        print(f"line {line_no}: {error}", file=errors_out)
+                    continue
+                rows.append((user, task, task_time))
+
+            try:
+                stats["imported"] += save_tasks_bulk(rows)
+            except PartialSaveError as e:
+                # Shards commit separately: the rest of the batch was saved
+                stats["imported"] += e.saved
+                stats["db_errors"] += e.failed
+                if errors_out:
+                    print(f"❌ Database error: {e}", file=errors_out)
+            except Exception as e:
+                stats["db_errors"] += len(rows)
+                if errors_out:
+                    print(f"❌ Database error, {len(rows)} task(s) not saved: {e}", file=errors_out)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    stats["elapsed_s"] = time.perf_counter() - started
+    stats["messages_per_sec"] = stats["messages"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+    return stats
+
+
+def run_import(source: str, user: str, workers: int, batch_size: int) -> int:
+    """Import messages from a file path or '-' (stdin) and print stats."""
+    try:
+        if source == "-":
+            stats = import_messages(sys.stdin, user, workers, batch_size, errors_out=sys.stderr)
+        else:
+            with open(source, "r", encoding="utf-8") as f:
+                stats = import_messages(f, user, workers, batch_size, errors_out=sys.stderr)
+    except OSError as e:
+        print(f"❌ Could not read {source}: {e}")
+        return 1
+
+    print(f"✅ Imported {stats['imported']} of {stats['messages']} message(s) "
+          f"in {stats['elapsed_s']:.2f}s ({stats['messages_per_sec']:.1f} messages/sec)")
+    if stats["rejected"] or stats["db_errors"]:
+        print(f"❌ Rejected: {stats['rejected']}, database errors: {stats['db_errors']}")
+    return 0 if not stats["db_errors"] else 1
+
+
+def run_export(export_format: str, user: Optional[str], status: Optional[str],
+               output: Optional[str]) -> int:
+    """Stream tasks to a file or stdout in the given format."""
+    try:
+        if output:
+            with open(output, "w", encoding="utf-8", newline="") as f:
+                for chunk in iter_export(export_format, user=user, status=status):
+                    f.write(chunk)
+            print(f"✅ Exported tasks to {output}", file=sys.stderr)
+        else:
+            for chunk in iter_export(export_format, user=user, status=status):
+                sys.stdout.write(chunk)
+            sys.stdout.flush()
+    except OSError as e:
+        print(f"❌ Could not write {output}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Task Reminder Agent CLI")
+    parser.add_argument("user", nargs="?",
+                        help="Username for messages (default: local-user); filters --export")
+    parser.add_argument("--import", dest="import_source", metavar="FILE",
+                        help="Import messages from FILE ('-' for stdin), one per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Parser processes for --import (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Messages per database batch for --import (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--export", dest="export_format", choices=list(EXPORT_FORMATS),
+                        help="Stream tasks to stdout (or --output) as ndjson or csv")
+    parser.add_argument("--status", help="Only export tasks with this status")
+    parser.add_argument("--output", help="File to write --export output to")
+    args = parser.parse_args(argv)
+
+    # Initialize database
+    try:
+        init_db()
+    except Exception as e:
+        print(f"❌ Failed to initialize database: {e}")
+        return 1
+
+    if args.export_format:
+        return run_export(args.export_format, args.user, args.status, args.output)
+
+    user = args.user or "local-user"
+
+    if args.import_source:
+        return run_import(args.import_source, user, max(1, args.workers), max(1, args.batch_size))
+
+    run_interactive(user)
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
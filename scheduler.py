@@ -1,87 +1,212 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from db.database import get_due_tasks, mark_task_sent
+from db.database import claim_due_tasks, mark_task_sent, prune_task_changes, release_task_claim
 from utils.telex import send_reminder
 from utils.logger import log
-from datetime import datetime
+from utils.events import PROCESS_ID, publish_event
+from utils.metrics import DUE_TASK_BACKLOG, SCHEDULER_TICK_SECONDS
+from utils.delivery_stats import recorder
+from utils.tracing import TRACE_SCHEDULER_SAMPLE_RATE, span, tracer
+from utils.idempotency import prune_expired_keys
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+from typing import Optional
+
+# Seconds between checks for due reminders
+REMINDER_CHECK_INTERVAL = float(os.getenv("REMINDER_CHECK_INTERVAL", "30"))
+# Seconds a claimed task is reserved for this process while it is delivered
+REMINDER_CLAIM_SECONDS = float(os.getenv("REMINDER_CLAIM_SECONDS", "300"))
+# Seconds before a failed delivery may be claimed and tried again
+REMINDER_RETRY_SECONDS = float(os.getenv("REMINDER_RETRY_SECONDS", "15"))
+
+# Seconds between prunes of expired webhook idempotency keys and old change-feed rows
+PRUNE_INTERVAL = float(os.getenv("PRUNE_INTERVAL", "600"))
+# Seconds task changes are kept for clients catching up (each user's latest is always kept)
+CHANGE_FEED_RETENTION_SECONDS = float(os.getenv("CHANGE_FEED_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Seconds a shutdown waits for in-flight deliveries
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "20"))
 
 # Global scheduler instance
 scheduler = None
 
+# Set once shutdown begins: no new claims, no further sends
+_draining = threading.Event()
+# Clear while reminder_job runs
+_idle = threading.Event()
+_idle.set()
+# When expired rows were last pruned (time.monotonic)
+_last_prune: Optional[float] = None
 
+
+@SCHEDULER_TICK_SECONDS.time()
 def reminder_job():
     """
     Background job that checks for due tasks and sends reminders.
     Runs periodically to check if any tasks need reminders.
     """
-    try:
-        log("Running reminder check...", "debug")
-        
-        # Get all tasks that are due and haven't been sent
-        tasks = get_due_tasks()
-        
-        if not tasks:
-            log("No due tasks found", "debug")
-            return
-        
-        log(f"Found {len(tasks)} due task(s)", "info")
-        
-        # Send reminder for each due task
-        for task in tasks:
-            task_id, user, task_text, time_str, status, sent = task
+    # Busy before checking: a drain() that starts now waits for this run
+    _idle.clear()
+    if _draining.is_set():
+        _idle.set()
+        return
+    with tracer.start_trace("scheduler.tick", sample_rate=TRACE_SCHEDULER_SAMPLE_RATE) as tick:
+        try:
+            log("Running reminder check...", "debug")
+            
+            # Claim all tasks that are due and haven't been sent; another
+            # dispatcher process never gets the same ones
+            with span("scheduler.claim"):
+                tasks = claim_due_tasks(PROCESS_ID, REMINDER_CLAIM_SECONDS)
+            claimed_at = time.time()
+            DUE_TASK_BACKLOG.set(len(tasks))
+            tick.set("due_tasks", len(tasks))
             
-            log(f"Processing reminder for task #{task_id}: '{task_text}' for user '{user}'", "info")
+            if not tasks:
+                log("No due tasks found", "debug")
+                return
             
-            # Send the reminder
-            success = send_reminder(user, task_text, task_id)
+            log(f"Found {len(tasks)} due task(s)", "info")
             
-            if success:
-                # Mark task as sent
-                mark_task_sent(task_id)
-                log(f"✅ Reminder sent and marked: Task #{task_id}", "info")
-            else:
-                log(f"❌ Failed to send reminder for task #{task_id}", "error")
+            # Send reminder for each due task
+            for index, task in enumerate(tasks):
+                task_id, user, task_text, time_str, status, sent = task
+                
+                if _draining.is_set():
+                    # Hand the rest back so the next process sends them at once
+                    for remaining in tasks[index:]:
+                        release_task_claim(remaining[0])
+                    log(f"Shutting down: released {len(tasks) - index} unsent reminder(s)", "info")
+                    break
+                
+                log(f"Processing reminder for task #{task_id}: '{task_text}' for user '{user}'", "info")
                 
+                with span("scheduler.send", task_id=task_id):
+                    _deliver(task_id, user, task_text, time_str, claimed_at)
+                    
+        except Exception as e:
+            log(f"Error in reminder job: {e}", "error")
+        finally:
+            # One write per run for everything delivered in it
+            recorder.flush()
+            _prune_expired()
+            _idle.set()
+
+
+def _prune_expired() -> None:
+    """Drop expired idempotency keys and old task changes, at most every PRUNE_INTERVAL seconds."""
+    global _last_prune
+    now = time.monotonic()
+    if _last_prune is not None and now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    try:
+        deleted = prune_expired_keys()
+        if deleted:
+            log(f"Pruned {deleted} expired idempotency key(s)", "info")
     except Exception as e:
-        log(f"Error in reminder job: {e}", "error")
+        log(f"Failed to prune idempotency keys: {e}", "error")
+    try:
+        deleted = prune_task_changes(datetime.now() - timedelta(seconds=CHANGE_FEED_RETENTION_SECONDS))
+        if deleted:
+            log(f"Pruned {deleted} old task change(s)", "info")
+    except Exception as e:
+        log(f"Failed to prune task changes: {e}", "error")
+
+
+def _deliver(task_id: int, user: str, task_text: str, time_str: str, claimed_at: float) -> None:
+    """Send one reminder, mark it sent and notify the user's open pages."""
+    # Send the reminder
+    success = send_reminder(user, task_text, task_id)
+    recorder.record(task_id, time_str, claimed_at, time.time(), success)
+    
+    if success:
+        # Mark task as sent
+        mark_task_sent(task_id)
+        log(f"✅ Reminder sent and marked: Task #{task_id}", "info")
+        
+        # Notify the user's open WebSockets, whichever worker holds them
+        publish_event({
+            "type": "reminder",
+            "user": user,
+            "task_id": task_id,
+            "task": task_text,
+            "message": f"⏰ Reminder: {task_text}",
+            "timestamp": datetime.now().isoformat()
+        })
+    else:
+        log(f"❌ Failed to send reminder for task #{task_id}", "error")
+        release_task_claim(task_id, retry_after=REMINDER_RETRY_SECONDS)
 
 
 def start_scheduler():
     """
     Start the background scheduler for reminder checking.
-    Checks for due tasks every 30 seconds.
+    Checks for due tasks every REMINDER_CHECK_INTERVAL seconds.
     """
+    from apscheduler.schedulers.background import BackgroundScheduler
+
     global scheduler
     
     if scheduler is not None:
         log("Scheduler already running", "warning")
         return
     
+    _draining.clear()
     try:
         scheduler = BackgroundScheduler()
         
-        # Add job to check for reminders every 30 seconds
+        # Add job to check for reminders periodically
         scheduler.add_job(
             reminder_job,
             'interval',
-            seconds=30,
+            seconds=REMINDER_CHECK_INTERVAL,
             id='reminder_check',
             name='Check for due reminders',
             replace_existing=True
         )
         
         scheduler.start()
-        log("✅ Reminder scheduler started (checking every 30 seconds)", "info")
+        log(f"✅ Reminder scheduler started (checking every {REMINDER_CHECK_INTERVAL:g} seconds)", "info")
         
     except Exception as e:
         log(f"Failed to start scheduler: {e}", "error")
         raise
 
 
-def stop_scheduler():
-    """Stop the background scheduler."""
+def begin_drain() -> None:
+    """Stop claiming tasks; a running reminder_job stops after its current send."""
+    _draining.set()
+
+
+def drain(timeout: float = SHUTDOWN_TIMEOUT) -> bool:
+    """
+    Stop claiming tasks and wait for the reminder in flight, if any.
+    
+    A running reminder_job finishes the send it is in (send and mark as
+    sent together, so a restart doesn't deliver it again) and releases the
+    tasks it claimed but has not sent yet.
+    
+    Args:
+        timeout: Seconds to wait for the running job
+        
+    Returns:
+        True if no job is running any more, False on timeout
+    """
+    begin_drain()
+    if _idle.wait(timeout):
+        return True
+    log(f"Reminder delivery still running after {timeout:g}s; its claims lapse "
+        "after REMINDER_CLAIM_SECONDS", "warning")
+    return False
+
+
+def stop_scheduler(timeout: float = SHUTDOWN_TIMEOUT):
+    """Stop the background scheduler, draining in-flight deliveries first."""
     global scheduler
     
     if scheduler is not None:
-        scheduler.shutdown()
+        drain(timeout)
+        scheduler.shutdown(wait=False)
         scheduler = None
         log("Scheduler stopped", "info")
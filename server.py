@@ -1,22 +1,109 @@
-from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import Depends, FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from agents.task_agent import process_message
+from fastapi.middleware.gzip import GZipMiddleware
+from agents.task_agent import is_retryable_reply, process_message
 from db.database import (
     init_db, get_all_tasks, delete_task, 
-    update_task, snooze_task
+    update_task, snooze_task, get_user_profile,
+    add_change_listener, get_change_seq, get_changes_since, task_writer
 )
 from utils.logger import log
-from scheduler import start_scheduler, stop_scheduler
+from utils.profiles import update_user_profile
+from utils.export import EXPORT_FORMATS, iter_export
+from utils.connections import ConnectionManager
+from utils.assets import assets
+from utils.serialization import FastJSONResponse, dumps_text
+from utils.sse import sse_broker
+from utils.idempotency import idempotency_key, idempotency_store
+from utils.admission import AdmissionController, Overloaded
+from utils import metrics
+from utils import tracing
+from utils import profiler
+from utils.admin import is_admin
+from utils import delivery_stats
+from starlette.concurrency import run_in_threadpool
+from utils.events import get_event_bus, publish_event, publish_task_changes, PROCESS_ID
+from utils import profiles
+from utils import nlp
+from db.cache import task_cache
 from datetime import datetime
-from typing import List
-import uvicorn
-import atexit
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
 import os
 import json
 
+# Responses smaller than this (bytes) are not worth compressing
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1000"))
+
+# What this process does besides serving requests: "web" (always) and,
+# opted into by exactly one process, "scheduler" (send due reminders)
+SERVER_ROLES = {role.strip() for role in os.getenv("SERVER_ROLES", "web").split(",") if role.strip()}
+KNOWN_ROLES = {"web", "scheduler"}
+
+# Seconds a shutdown waits for in-flight reminder sends and requests
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "20"))
+# Range of the random reconnect delay (ms) given to clients on shutdown
+RECONNECT_MIN_MS = int(os.getenv("RECONNECT_MIN_MS", "1000"))
+RECONNECT_MAX_MS = int(os.getenv("RECONNECT_MAX_MS", "15000"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start this process's roles. Nothing runs at import time, so tests,
+    tools and forked workers only pay for what they use.
+    """
+    unknown = SERVER_ROLES - KNOWN_ROLES
+    if unknown:
+        raise ValueError(f"Unknown SERVER_ROLES: {', '.join(sorted(unknown))}")
+
+    init_db()
+    log("Database initialized successfully", "info")
+    load_assets()
+    # A previous shutdown in this process (tests) left SSE streams closing
+    sse_broker.closing = None
+
+    # Load dateparser off the event loop instead of in the first request
+    warm_up = asyncio.get_running_loop().run_in_executor(None, nlp.warm_up)
+
+    # Subscribe this process to real-time events published by any worker
+    bus = get_event_bus()
+    await bus.start(deliver_event)
+
+    scheduler = None
+    if "scheduler" in SERVER_ROLES:
+        import scheduler
+        scheduler.start_scheduler()
+    elif "SERVER_ROLES" not in os.environ:
+        # e.g. `uvicorn server:app` with nothing else configured: no
+        # process may be sending reminders at all
+        log("SERVER_ROLES is not set, so this process does not send reminders; "
+            "set SERVER_ROLES=web,scheduler on one process or run python worker.py", "warning")
+    else:
+        log("Scheduler role not enabled; reminders are sent by the process "
+            "started with SERVER_ROLES=web,scheduler", "info")
+
+    try:
+        yield
+    finally:
+        # Tell clients to come back later; normally done already by
+        # GracefulServer before uvicorn waits for open connections
+        await begin_shutdown()
+        if scheduler is not None:
+            # Finish or hand back claimed reminders; blocks, so off the loop
+            await run_in_threadpool(scheduler.stop_scheduler, SHUTDOWN_TIMEOUT)
+        # Write out what is still batched in memory
+        task_writer.close(SHUTDOWN_TIMEOUT)
+        delivery_stats.recorder.flush()
+        tracing.tracer.close()
+        await bus.stop()
+        await warm_up
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="🤖 Task Reminder Agent API",
     description="""
     An intelligent AI-powered task reminder assistant with natural language processing.
@@ -58,51 +145,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-static_dir = os.path.join(os.path.dirname(__file__), "static")
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Compress JSON responses above the threshold; precompressed assets
+# already carry Content-Encoding and are passed through untouched
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=6)
 
-# WebSocket Connection Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+# Latency and status of every request, per route
+app.add_middleware(metrics.MetricsMiddleware)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        log(f"WebSocket connected. Total connections: {len(self.active_connections)}", "info")
+# Root span of each sampled request; the trace ID is returned as X-Trace-Id
+app.add_middleware(tracing.TracingMiddleware)
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        log(f"WebSocket disconnected. Total connections: {len(self.active_connections)}", "info")
+# Admins can profile a single webhook call with the X-Profile header
+app.add_middleware(profiler.RequestProfileMiddleware, paths=("/webhook/telex", "/a2a/agent/taskAgent"))
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+# process_message runs in the threadpool; a request profile follows it there
+process_message = profiler.follow(process_message)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+# Static pages are served from memory (see load_assets)
+static_dir = os.path.join(os.path.dirname(__file__), "static")
 
+# WebSocket connections, indexed by user
 manager = ConnectionManager()
 
-# Initialize DB when server starts
-init_db()
-log("Database initialized successfully", "info")
+metrics.WEBSOCKET_CONNECTIONS.set_function(lambda: manager.active_connections)
+metrics.SSE_SUBSCRIBERS.set_function(lambda: sse_broker.subscribers)
 
-# Start the reminder scheduler
-start_scheduler()
+# Bounded concurrency for the message-processing endpoints
+admission = {
+    "telex": AdmissionController("telex"),
+    "a2a": AdmissionController("a2a"),
+}
 
-# Register cleanup handler to stop scheduler on shutdown
-atexit.register(stop_scheduler)
 
-@app.get("/", response_class=HTMLResponse)
-def home():
-    """Landing page with interactive UI"""
-    html_content = """
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Shed requests get 429 with a hint of when to try again"""
+    return FastJSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def deliver_event(event: dict):
+    """Deliver a bus event to the sockets connected to this process"""
+    user = event.get("user")
+    if event.get("type") == "task_changed" and event.get("origin") != PROCESS_ID:
+        # Written by another process: our cached copy of this user is stale
+        task_cache.invalidate(user)
+    
+    sse_broker.publish(event)
+    message = dumps_text(event)
+    if user:
+        await manager.send_to_user(user, message)
+    else:
+        await manager.broadcast(message)
+
+
+
+async def begin_shutdown():
+    """
+    Stop claiming reminders and close every WebSocket and SSE stream,
+    each client told to reconnect after its own random delay so the
+    restarted server isn't hit by all of them at once.
+    """
+    if "scheduler" in SERVER_ROLES:
+        import scheduler
+        scheduler.begin_drain()
+    await manager.close_all(RECONNECT_MIN_MS, RECONNECT_MAX_MS)
+    sse_broker.close_all(RECONNECT_MIN_MS, RECONNECT_MAX_MS)
+
+# Publish every committed task change to open dashboards
+add_change_listener(publish_task_changes)
+
+# Landing page, registered with the asset store at startup
+HOME_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -331,7 +448,31 @@ def home():
     </body>
     </html>
     """
-    return HTMLResponse(content=html_content)
+
+
+def load_assets():
+    """Load and precompress the HTML pages once, at startup"""
+    assets.load_directory(static_dir)
+    home_html = HOME_HTML
+    for name in assets.assets:
+        # Link to content-hashed URLs so browsers can cache them for good
+        home_html = home_html.replace(f'"/static/{name}"', f'"{assets.url(name)}"')
+    assets.add("home.html", home_html)
+
+
+@app.get("/", response_class=HTMLResponse)
+def home(request: Request):
+    """Landing page with interactive UI"""
+    return assets.response(request, "home.html")
+
+
+@app.get("/static/{name}")
+def static_file(request: Request, name: str):
+    """Serve a preloaded, precompressed page from the static directory"""
+    response = assets.response(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
 
 @app.get("/trigger-reminders")
 def trigger_reminders():
@@ -354,11 +495,11 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     - Task updates
     - System notifications
     """
-    await manager.connect(websocket)
+    await manager.connect(websocket, user_id)
     try:
         # Send welcome message
         await manager.send_personal_message(
-            json.dumps({
+            dumps_text({
                 "type": "connected",
                 "message": f"✅ Connected to Task Reminder Agent",
                 "user": user_id,
@@ -375,24 +516,43 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             # Handle different message types
             if message_data.get("type") == "ping":
                 await manager.send_personal_message(
-                    json.dumps({"type": "pong", "timestamp": datetime.now().isoformat()}),
+                    dumps_text({"type": "pong", "timestamp": datetime.now().isoformat()}),
                     websocket
                 )
             elif message_data.get("type") == "task_query":
-                # Send task updates
-                tasks = get_all_tasks(user=user_id)
-                await manager.send_personal_message(
-                    json.dumps({
-                        "type": "task_list",
-                        "tasks": tasks,
-                        "count": len(tasks)
-                    }),
-                    websocket
-                )
+                # Send only what changed since the client's last seen
+                # sequence number, or the full list on first load
+                since = message_data.get("since")
+                changes = None
+                if isinstance(since, int) and since >= 0:
+                    changes, seq = get_changes_since(user_id, since)
+                
+                if changes is not None:
+                    await manager.send_personal_message(
+                        dumps_text({
+                            "type": "task_changes",
+                            "changes": changes,
+                            "seq": seq
+                        }),
+                        websocket
+                    )
+                else:
+                    # Read the sequence first so no change can slip between
+                    seq = get_change_seq(user_id)
+                    tasks = get_all_tasks(user=user_id, shared=True)
+                    await manager.send_personal_message(
+                        dumps_text({
+                            "type": "task_list",
+                            "tasks": tasks,
+                            "count": len(tasks),
+                            "seq": seq
+                        }),
+                        websocket
+                    )
             else:
                 # Echo back for testing
                 await manager.send_personal_message(
-                    json.dumps({
+                    dumps_text({
                         "type": "echo",
                         "received": message_data,
                         "timestamp": datetime.now().isoformat()
@@ -408,27 +568,72 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         manager.disconnect(websocket)
 
 
-# Helper function to send WebSocket notifications (can be called from scheduler)
+@app.get("/events/{user_id}")
+async def event_stream(request: Request, user_id: str, last_event_id: int = None):
+    """
+    Server-Sent Events stream of reminders and task changes for one user.
+    
+    A lighter alternative to the WebSocket for clients that only listen.
+    Reconnecting clients send `Last-Event-ID` (browsers do this
+    automatically) to receive the events they missed; if those are no
+    longer buffered a `resync` event asks them to reload their tasks.
+    Idle streams carry a heartbeat comment every SSE_HEARTBEAT_SECONDS.
+    
+    Query Parameters:
+        - last_event_id: Resume point, for clients that cannot set headers
+    """
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            last_event_id = None
+    
+    return StreamingResponse(
+        sse_broker.subscribe(user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Helper function to send WebSocket notifications (can be called from any worker)
 async def send_websocket_reminder(user: str, task_text: str, task_id: int):
-    """Send reminder via WebSocket to connected clients"""
-    message = json.dumps({
+    """Send reminder via WebSocket to the user's connected clients on every worker"""
+    publish_event({
         "type": "reminder",
+        "user": user,
         "task_id": task_id,
         "task": task_text,
         "message": f"⏰ Reminder: {task_text}",
         "timestamp": datetime.now().isoformat()
     })
-    await manager.broadcast(message)
-    log(f"WebSocket reminder sent for task #{task_id}", "info")
+    log(f"WebSocket reminder published for task #{task_id}", "info")
     return {"status": "Reminder check executed"}
 
 
+def _tasks_etag(user: str, status: str, limit: int, seq: int) -> str:
+    """Strong ETag for a task listing, derived from the change sequence"""
+    key = f"{user}|{status}|{limit}|{seq}".encode("utf-8")
+    return '"' + hashlib.sha1(key).hexdigest()[:20] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against our ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/tasks")
 def list_tasks(request: Request, user: str = None, status: str = None, limit: int = 100):
     """
     Get all tasks with optional filtering.
     Returns HTML page for browsers, JSON for API requests.
     
+    JSON responses carry an ETag derived from the change sequence; send it
+    back in If-None-Match to get 304 Not Modified when nothing changed.
+    
     Query Parameters:
         - user: Filter by username (optional)
         - status: Filter by status (optional)
@@ -439,22 +644,62 @@ def list_tasks(request: Request, user: str = None, status: str = None, limit: in
         accept_header = request.headers.get("accept", "")
         if "text/html" in accept_header:
             # Serve the HTML page for browser requests
-            try:
-                with open("static/tasks.html", "r", encoding="utf-8") as f:
-                    html_content = f.read()
-                return HTMLResponse(content=html_content)
-            except FileNotFoundError:
-                pass  # Fall through to JSON response if file not found
+            response = assets.response(request, "tasks.html")
+            if response is not None:
+                response.headers["Vary"] = "Accept, Accept-Encoding"
+                return response
+            # Fall through to JSON response if the page is missing
+        
+        # Checked before any rows are fetched: an idle poll costs one
+        # indexed MAX(seq) lookup
+        seq = get_change_seq(user)
+        etag = _tasks_etag(user, status, limit, seq)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
         
-        # Return JSON for API requests
-        tasks = get_all_tasks(user=user, status=status, limit=limit)
+        # Return JSON for API requests; seq lets clients follow up with
+        # incremental task_query requests over the WebSocket
+        # Serialized as-is: no jsonable_encoder pass, no copies of cached rows
+        tasks = get_all_tasks(user=user, status=status, limit=limit, shared=True)
         log(f"Retrieved {len(tasks)} tasks (user={user}, status={status})", "info")
-        return {"tasks": tasks, "count": len(tasks)}
+        return FastJSONResponse(
+            content={"tasks": tasks, "count": len(tasks), "seq": seq},
+            headers=headers
+        )
     except Exception as e:
         log(f"Error retrieving tasks: {e}", "error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/tasks/export")
+def export_tasks(format: str = "ndjson", user: str = None, status: str = None):
+    """
+    Stream all matching tasks as NDJSON or CSV.
+    
+    Rows are read from the database in fixed-size chunks and sent as they
+    are encoded, so memory stays constant however many tasks match.
+    
+    Query Parameters:
+        - format: "ndjson" (default) or "csv"
+        - user: Filter by username (optional)
+        - status: Filter by status (optional)
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    
+    log(f"Exporting tasks as {format} (user={user}, status={status})", "info")
+    filename = f"tasks-{user}.{format}" if user else f"tasks.{format}"
+    return StreamingResponse(
+        iter_export(format, user=user, status=status),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @app.delete("/tasks/{task_id}")
 def delete_task_endpoint(task_id: int):
     """Delete a task by ID"""
@@ -545,8 +790,165 @@ async def snooze_task_endpoint(task_id: int, request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Metrics in the Prometheus text format"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/traces")
+def traces_endpoint(limit: int = 20, trace_id: str = None, min_ms: float = 0):
+    """
+    Recently recorded traces, newest first, with every span's own time.
+    
+    Query Parameters:
+        - limit: Most traces to return (default: 20)
+        - trace_id: Only this trace (as returned in X-Trace-Id)
+        - min_ms: Only traces at least this slow
+    """
+    return {
+        "sample_rate": tracing.tracer.sample_rate,
+        "traces": tracing.tracer.traces(limit=limit, trace_id=trace_id, min_duration_ms=min_ms)
+    }
+
+
+def require_admin(request: Request) -> None:
+    """Reject requests without a valid X-Admin-Token header"""
+    if not is_admin(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Admin token required (set ADMIN_TOKEN to enable)")
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_process(seconds: float = 10, interval_ms: float = profiler.PROFILE_INTERVAL_MS,
+                          include_idle: bool = False):
+    """
+    Sample every thread of this process (event loop, scheduler, threadpool)
+    for `seconds` and return the stacks in the collapsed flamegraph format.
+    
+    Query Parameters:
+        - seconds: How long to profile (default: 10)
+        - interval_ms: Time between samples (default: 5)
+        - include_idle: Keep stacks of threads blocked waiting (default: false)
+    """
+    if not 0 < seconds <= profiler.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {profiler.PROFILE_MAX_SECONDS:g}]")
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    if not profiler.acquire():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        log(f"Profiling process for {seconds:g}s", "info")
+        profile = profiler.SamplingProfiler(interval_ms, include_idle=include_idle).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.stop()
+    finally:
+        profiler.release()
+    return PlainTextResponse(profile.collapsed(), headers={"X-Profile-Samples": str(profile.samples)})
+
+
+@app.get("/admin/profile/requests/{profile_id}", dependencies=[Depends(require_admin)])
+def get_request_profile(profile_id: str):
+    """Collapsed stacks of a single request profiled with the X-Profile header"""
+    profile = profiler.get_request_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile.collapsed(), headers={"X-Profile-Samples": str(profile.samples)})
+
+
+@app.get("/stats/deliveries")
+def delivery_stats_endpoint(hours: float = 24, window: int = 3600):
+    """
+    Reminder lateness (send time minus due time) and throughput.
+    
+    Query Parameters:
+        - hours: How far back to look (default: 24)
+        - window: Window width in seconds (default: 3600)
+    """
+    try:
+        return delivery_stats.summarize(hours=hours, window_seconds=window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/stats/admission")
+def admission_stats():
+    """In-flight and queued requests and shed counts per endpoint"""
+    return {name: controller.stats() for name, controller in admission.items()}
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit ratio and memory use of the in-process caches"""
+    return {
+        "tasks": task_cache.stats(),
+        "parse_contexts": profiles.cache.stats(),
+        "idempotency": idempotency_store.stats()
+    }
+
+
+@app.get("/users/{user}/profile")
+def get_profile_endpoint(user: str):
+    """Get a user's parsing profile (timezone, languages, date order)"""
+    try:
+        profile = get_user_profile(user)
+    except Exception as e:
+        log(f"Error retrieving profile for {user}: {e}", "error")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@app.put("/users/{user}/profile")
+async def update_profile_endpoint(user: str, request: Request):
+    """
+    Create or replace a user's parsing profile.
+    
+    Request body can include:
+        - timezone: IANA timezone name, e.g. "Africa/Nairobi"
+        - languages: List of language codes, e.g. ["en"]
+        - date_order: Order for ambiguous dates, e.g. "DMY"
+    """
+    try:
+        data = await request.json()
+        
+        languages = data.get("languages")
+        if languages is not None and not isinstance(languages, list):
+            raise HTTPException(status_code=400, detail="Languages must be a list of language codes")
+        
+        context = update_user_profile(
+            user,
+            timezone=data.get("timezone"),
+            languages=languages,
+            date_order=data.get("date_order")
+        )
+        log(f"Profile updated for {user}", "info")
+        return {
+            "status": "updated",
+            "user": user,
+            "timezone": context.timezone,
+            "languages": context.languages or [],
+            "date_order": context.date_order
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log(f"Error updating profile for {user}: {e}", "error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _replayable(result: dict) -> bool:
+    """Failures a retry could get past (e.g. a locked database) are not replayed"""
+    return not is_retryable_reply(result.get("response", ""))
+
+
 @app.post("/webhook/telex")
-async def telex_webhook(request: Request):
+async def telex_webhook(request: Request, response: Response):
     payload = await request.json()
 
     # Extract incoming data from Telex payload
@@ -560,24 +962,38 @@ async def telex_webhook(request: Request):
         log("Empty message received", "warning")
         return {"response": "❓ No message received"}
 
-    # Process the text through your agent
-    reply = process_message(user, message)
-    log(f"Reply to {user}: {reply}", "debug")
+    key = idempotency_key("telex", request.headers, payload, user, message)
 
-    return {
-        "response": reply  # Telex displays this message
-    }
+    async def handle():
+        # Process the text through your agent (off the event loop: parsing is slow)
+        async with admission["telex"].admit(user):
+            reply = await run_in_threadpool(process_message, user, message, key)
+        log("Reply to %s: %s", "debug", user, reply)
+        return {
+            "response": reply  # Telex displays this message
+        }
+
+    if key is None:
+        return await handle()
+    result, replayed = await idempotency_store.run(key, handle, cacheable=_replayable)
+    if replayed:
+        log(f"Replayed response to retried delivery from {user}", "info")
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
 
 @app.post("/a2a/agent/taskAgent")
-async def a2a_agent(request: Request):
+async def a2a_agent(request: Request, response: Response):
     """
     A2A Protocol endpoint for Telex integration.
     This endpoint follows the Agent-to-Agent protocol specification.
+    
+    Retried deliveries (same Idempotency-Key header, or same sender,
+    message and timestamp) get the original response back.
     """
     try:
         payload = await request.json()
-        log(f"A2A Request received: {payload}", "debug")
+        log("A2A Request received: %s", "debug", payload)
         
         # Extract message from A2A protocol payload
         # A2A protocol typically sends: {"message": "...", "user": "...", "context": {...}}
@@ -591,18 +1007,32 @@ async def a2a_agent(request: Request):
                 "response": "❓ No message received"
             }
         
-        # Process through your agent
-        reply = process_message(user, message)
-        log(f"A2A Reply to {user}: {reply}", "info")
+        key = idempotency_key("a2a", request.headers, payload, user, message)
         
-        # Return A2A protocol response
-        return {
-            "success": True,
-            "response": reply,
-            "agent": "taskAgent",
-            "timestamp": datetime.now().isoformat()
-        }
+        async def handle():
+            # Process through your agent (off the event loop: parsing is slow)
+            async with admission["a2a"].admit(user):
+                reply = await run_in_threadpool(process_message, user, message, key)
+            log(f"A2A Reply to {user}: {reply}", "info")
+            
+            # Return A2A protocol response
+            return {
+                "success": True,
+                "response": reply,
+                "agent": "taskAgent",
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        if key is None:
+            return await handle()
+        result, replayed = await idempotency_store.run(key, handle, cacheable=_replayable)
+        if replayed:
+            log(f"Replayed A2A response to retried delivery from {user}", "info")
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
         
+    except Overloaded:
+        raise
     except Exception as e:
         log(f"A2A Error: {e}", "error")
         return {
@@ -613,6 +1043,21 @@ async def a2a_agent(request: Request):
 
 
 if __name__ == "__main__":
-    import os
+    import uvicorn
+    # A single process started directly does everything, reminders included
+    os.environ.setdefault("SERVER_ROLES", "web,scheduler")
+    # The app module proper, read with the roles above
+    import server
+
+    class GracefulServer(uvicorn.Server):
+        """Closes sockets and streams with a reconnect hint before uvicorn waits for them."""
+
+        async def shutdown(self, sockets=None):
+            await server.begin_shutdown()
+            await super().shutdown(sockets=sockets)
+
     port = int(os.environ.get("PORT", 9000))
-    uvicorn.run("server:app", host="0.0.0.0", port=port, reload=False)
+    GracefulServer(uvicorn.Config(
+        server.app, host="0.0.0.0", port=port,
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+    )).run()
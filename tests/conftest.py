@@ -0,0 +1,11 @@
+import pytest
+from db.cache import task_cache
+from utils import profiles
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """Tests swap in a new database file, so start every test with empty caches"""
+    profiles.cache.clear()
+    task_cache.clear()
+    yield
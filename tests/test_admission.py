@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from utils.admission import AdmissionController, Overloaded
+
+
+async def _hold(controller, sender, release):
+    """Occupy a slot until `release` is set"""
+    async with controller.admit(sender):
+        await release.wait()
+
+
+def test_requests_queue_then_run_when_slots_free():
+    """Requests beyond the in-flight limit wait for a slot, in order"""
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=5, per_sender=5)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, "a", release))
+        await asyncio.sleep(0)
+        
+        waiter = asyncio.create_task(_hold(controller, "b", asyncio.Event()))
+        await asyncio.sleep(0)
+        assert controller.in_flight == 1
+        assert controller.queued == 1
+        
+        release.set()
+        await holder
+        await asyncio.sleep(0)
+        assert controller.queued == 0
+        assert controller.in_flight == 1  # handed over to the waiter
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.in_flight == 0
+        assert controller.admitted == 2
+    
+    asyncio.run(scenario())
+
+
+def test_full_queue_and_sender_limit_are_shed():
+    """Excess requests are rejected at once with a Retry-After hint"""
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=1, per_sender=2)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(controller, "a", release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        
+        # Sender "a" already has two requests in flight or queued
+        with pytest.raises(Overloaded) as exc:
+            async with controller.admit("a"):
+                pass
+        assert exc.value.reason == "sender_limit"
+        assert exc.value.retry_after >= 1
+        
+        # One in flight and one queued: the queue is full for everyone
+        with pytest.raises(Overloaded) as exc:
+            async with controller.admit("b"):
+                pass
+        assert exc.value.reason == "queue_full"
+        
+        release.set()
+        await asyncio.gather(*tasks)
+        assert controller.shed == {"queue_full": 1, "sender_limit": 1, "deadline": 0}
+        assert controller.stats()["in_flight"] == 0
+    
+    asyncio.run(scenario())
+
+
+def test_stale_requests_are_shed_at_the_deadline():
+    """A request that waits longer than the queue deadline is dropped"""
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=5, queue_timeout=0.01)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, "a", release))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(Overloaded) as exc:
+            async with controller.admit("b"):
+                pass
+        assert exc.value.reason == "deadline"
+        assert controller.queued == 0
+        
+        release.set()
+        await holder
+        assert controller.in_flight == 0
+    
+    asyncio.run(scenario())
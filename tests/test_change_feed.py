@@ -0,0 +1,125 @@
+import pytest
+from datetime import datetime, timedelta
+from db.database import (
+    init_db, save_task, update_task, snooze_task, delete_task,
+    mark_task_sent, get_change_seq, get_changes_since, add_change_listener,
+    prune_task_changes
+)
+from db import database
+import tempfile
+import os
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Create a temporary test database"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+    
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    init_db()
+    
+    yield test_db_path
+    
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def test_every_write_advances_the_user_sequence(test_db):
+    """Insert, update, snooze, sent and delete each record a change"""
+    assert get_change_seq("alice") == 0
+    
+    task_id = save_task("alice", "call mom", datetime.now())
+    seqs = [get_change_seq("alice")]
+    
+    update_task(task_id, task_text="call dad")
+    seqs.append(get_change_seq("alice"))
+    snooze_task(task_id, 10)
+    seqs.append(get_change_seq("alice"))
+    mark_task_sent(task_id)
+    seqs.append(get_change_seq("alice"))
+    delete_task(task_id)
+    seqs.append(get_change_seq("alice"))
+    
+    assert seqs == sorted(seqs) and len(set(seqs)) == 5
+    
+    # Another user's writes do not touch alice's feed
+    save_task("bob", "other", datetime.now())
+    assert get_change_seq("alice") == seqs[-1]
+
+
+def test_changes_since_returns_only_deltas(test_db):
+    """Only changes after `since` are returned, collapsed per task"""
+    kept = save_task("carol", "kept", datetime.now())
+    removed = save_task("carol", "removed", datetime.now())
+    since = get_change_seq("carol")
+    
+    changes, seq = get_changes_since("carol", since)
+    assert changes == [] and seq == since
+    
+    update_task(kept, task_text="kept, renamed")
+    update_task(kept, status="done")
+    delete_task(removed)
+    
+    changes, seq = get_changes_since("carol", since)
+    assert seq == get_change_seq("carol")
+    by_task = {c["task_id"]: c for c in changes}
+    assert len(changes) == 2
+    assert by_task[kept]["op"] == "updated"
+    assert by_task[kept]["task"]["task"] == "kept, renamed"
+    assert by_task[kept]["task"]["status"] == "done"
+    assert by_task[removed]["op"] == "deleted"
+    assert by_task[removed]["task"] is None
+
+
+def test_too_many_changes_asks_for_full_reload(test_db):
+    """Beyond the limit, None tells the caller to resend the full list"""
+    for i in range(5):
+        save_task("dave", f"task {i}", datetime.now())
+    
+    changes, seq = get_changes_since("dave", 0, limit=3)
+    assert changes is None and seq == 0
+
+
+def test_change_listeners_receive_committed_changes(test_db, monkeypatch):
+    """Listeners get (user, task_id, op, seq) after each commit"""
+    received = []
+    monkeypatch.setattr(database, "_change_listeners", [])
+    add_change_listener(received.extend)
+    
+    task_id = save_task("erin", "task", datetime.now() - timedelta(minutes=1))
+    mark_task_sent(task_id)
+    
+    assert [(u, t, op) for u, t, op, _ in received] == [
+        ("erin", task_id, "created"),
+        ("erin", task_id, "sent"),
+    ]
+    
+    # Missing tasks record nothing
+    assert delete_task(99999) is False
+    assert len(received) == 2
+
+
+def test_old_changes_are_pruned_and_stale_cursors_reload(test_db):
+    """Pruning keeps each user's latest change; cursors from before the pruned ones reload"""
+    first = save_task("alice", "a", datetime.now())
+    _, old_cursor = get_changes_since("alice", 0)
+    update_task(first, task_text="a, renamed")
+    _, cursor = get_changes_since("alice", 0)
+    snooze_task(first, 10)
+    save_task("bob", "b", datetime.now())
+    seq = get_change_seq("alice")
+    
+    assert prune_task_changes(datetime.now() + timedelta(seconds=1)) == 2
+    
+    # Nothing old is kept but the latest, so the seq (and ETags) stay put
+    assert get_change_seq("alice") == seq
+    assert get_change_seq("bob") > 0
+    assert get_changes_since("alice", old_cursor) == (None, old_cursor)
+    # A cursor past every pruned change still catches up incrementally
+    assert [change["op"] for change in get_changes_since("alice", cursor)[0]] == ["snoozed"]
+    assert get_changes_since("alice", seq) == ([], seq)
+    
+    update_task(first, status="done")
+    changes, _ = get_changes_since("alice", seq)
+    assert [change["op"] for change in changes] == ["updated"]
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from utils.connections import ConnectionManager, RESTART_CLOSE_CODE, SLOW_CONSUMER_CLOSE_CODE
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a FastAPI WebSocket"""
+    
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.blocked = blocked
+        self._unblock = asyncio.Event()
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, message):
+        if self.blocked:
+            await self._unblock.wait()
+        self.sent.append(message)
+    
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+def test_connections_are_indexed_by_user():
+    """A user can hold several sockets and disconnect removes only one"""
+    async def scenario():
+        manager = ConnectionManager()
+        first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager.connect(first, "alice")
+        await manager.connect(second, "alice")
+        await manager.connect(other, "bob")
+        assert manager.active_connections == 3
+        
+        assert await manager.send_to_user("alice", "hi alice") == 2
+        await asyncio.sleep(0)
+        assert first.sent == ["hi alice"] and second.sent == ["hi alice"]
+        assert other.sent == []
+        
+        manager.disconnect(first)
+        manager.disconnect(first)  # idempotent
+        assert manager.active_connections == 2
+        assert list(manager.users["alice"]) == [second]
+        
+        manager.disconnect(second)
+        assert "alice" not in manager.users
+        assert await manager.send_to_user("alice", "gone") == 0
+    
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_evicted_without_stalling_others():
+    """A client whose queue overflows is closed; others keep receiving"""
+    async def scenario():
+        manager = ConnectionManager(queue_size=2)
+        slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+        await manager.connect(slow, "slow")
+        await manager.connect(fast, "fast")
+        
+        for i in range(5):
+            await manager.broadcast(f"msg {i}")
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        
+        assert fast.sent == [f"msg {i}" for i in range(5)]
+        assert slow not in manager.clients
+        assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert manager.evicted == 1
+    
+    asyncio.run(scenario())
+
+
+def test_close_all_sends_reconnect_hint():
+    """Shutdown flushes queued messages, then closes with 1012 and a jittered delay"""
+    async def scenario():
+        manager = ConnectionManager()
+        sockets = [FakeWebSocket() for _ in range(3)]
+        for i, websocket in enumerate(sockets):
+            await manager.connect(websocket, f"user-{i}")
+        await manager.send_to_user("user-0", "queued")
+        
+        assert await manager.close_all(1000, 2000) == 3
+        assert manager.active_connections == 0
+        assert sockets[0].sent[0] == "queued"
+        for websocket in sockets:
+            hint = json.loads(websocket.sent[-1])
+            assert hint["type"] == "reconnect"
+            assert 1000 <= hint["retry_after_ms"] <= 2000
+            assert websocket.closed_with == RESTART_CLOSE_CODE
+    
+    asyncio.run(scenario())
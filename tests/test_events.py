@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+import threading
+import pytest
+from utils.events import EventBus, LocalEventBus, SQLiteEventBus
+
+
+async def _wait_for(received, count, timeout=2.0):
+    """Wait until `count` events have been received"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while len(received) < count and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_local_bus_delivers_events_published_from_other_threads():
+    """Events published from a worker thread reach the loop's handler"""
+    async def scenario():
+        bus = LocalEventBus()
+        received = []
+        
+        async def handler(event):
+            received.append(event)
+        
+        await bus.start(handler)
+        thread = threading.Thread(target=bus.publish, args=({"type": "reminder", "user": "alice"},))
+        thread.start()
+        thread.join()
+        
+        await _wait_for(received, 1)
+        assert received == [{"type": "reminder", "user": "alice"}]
+        
+        await bus.stop()
+        bus.publish({"type": "ignored"})
+        await asyncio.sleep(0.05)
+        assert len(received) == 1
+    
+    asyncio.run(scenario())
+
+
+def test_sqlite_bus_fans_out_across_bus_instances():
+    """Each bus instance (one per worker) receives events from the others"""
+    path = os.path.join(tempfile.mkdtemp(), "events.db")
+    
+    async def scenario():
+        worker_a = SQLiteEventBus(path, poll_interval=0.01)
+        worker_b = SQLiteEventBus(path, poll_interval=0.01)
+        
+        # Events from before subscribing are not replayed
+        worker_a.publish({"type": "old"})
+        
+        received_a, received_b = [], []
+        
+        async def handler_a(event):
+            received_a.append(event)
+        
+        async def handler_b(event):
+            received_b.append(event)
+        
+        await worker_a.start(handler_a)
+        await worker_b.start(handler_b)
+        
+        worker_a.publish({"type": "task_changed", "user": "bob", "task_id": 1})
+        worker_b.publish({"type": "reminder", "user": "bob", "task_id": 1})
+        
+        await _wait_for(received_a, 2)
+        await _wait_for(received_b, 2)
+        await worker_a.stop()
+        await worker_b.stop()
+        
+        assert [e["type"] for e in received_a] == ["task_changed", "reminder"]
+        assert received_a == received_b
+    
+    asyncio.run(scenario())
+
+
+def test_incomplete_backend_cannot_be_created():
+    """A backend missing part of the interface fails when instantiated, not on first use"""
+    class PublishOnly(EventBus):
+        def publish(self, event):
+            pass
+    
+    with pytest.raises(TypeError):
+        PublishOnly()
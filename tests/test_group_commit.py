@@ -0,0 +1,69 @@
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from db.database import init_db, save_task, get_all_tasks, get_changes_since, task_writer
+from db.group_commit import GroupCommitQueue
+import tempfile
+import os
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Temporary database with group commit turned on"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    monkeypatch.setattr('db.database.GROUP_COMMIT_WINDOW_MS', 20)
+    monkeypatch.setattr(task_writer, 'window', 0.02)
+    init_db()
+
+    yield test_db_path
+
+    task_writer.close()
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def test_concurrent_saves_share_commits_and_get_their_own_ids(test_db):
+    """Inserts from many threads are committed together; each caller gets its task's ID"""
+    batches = task_writer.batches
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        ids = list(pool.map(lambda i: save_task(f"user-{i % 4}", f"task {i}", datetime.now()), range(40)))
+
+    assert len(set(ids)) == 40
+    assert task_writer.batches - batches < 40
+    tasks = {task["id"]: task for task in get_all_tasks(limit=100)}
+    assert [tasks[task_id]["task"] for task_id in ids] == [f"task {i}" for i in range(40)]
+    assert sum(len(get_changes_since(f"user-{i}", 0)[0]) for i in range(4)) == 40
+
+
+def test_duplicate_deliveries_in_one_batch_save_one_task(test_db):
+    """An idempotency key seen twice in the same commit still maps to a single task"""
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        ids = list(pool.map(lambda _: save_task("alice", "call mom", datetime.now(),
+                                                idempotency_key="delivery-1"), range(5)))
+
+    assert len(set(ids)) == 1
+    assert len(get_all_tasks(user="alice")) == 1
+
+
+def test_failed_item_does_not_fail_its_batch():
+    """An error returned for one item is raised to that caller only"""
+    def commit(items):
+        return [ValueError("bad") if value < 0 else value * 2 for (value,) in items]
+
+    writer = GroupCommitQueue(commit, window_ms=20)
+    start = threading.Barrier(3)
+
+    def submit(value):
+        start.wait()
+        try:
+            return writer.submit(value)
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(pool.map(submit, [1, -1, 3])) == [2, "bad", 6]
+    writer.close()
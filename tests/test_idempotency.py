@@ -0,0 +1,108 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+from db.database import init_db, save_task, get_all_tasks, get_task_by_idempotency_key
+from utils.idempotency import IdempotencyStore, idempotency_key, prune_expired_keys
+from db import database
+import agents.task_agent as task_agent
+import tempfile
+import os
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Create a temporary test database"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+    
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    init_db()
+    
+    yield test_db_path
+    
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def test_key_from_header_or_content():
+    """Header keys win; otherwise sender, message and timestamp are hashed"""
+    payload = {"message": "hi", "timestamp": "t1"}
+    assert idempotency_key("telex", {"idempotency-key": "abc"}, payload, "u", "hi") == "telex:h:abc"
+    
+    by_content = idempotency_key("telex", {}, payload, "u", "hi")
+    assert by_content == idempotency_key("telex", {}, dict(payload), "u", "hi")
+    assert by_content != idempotency_key("telex", {}, {"timestamp": "t2"}, "u", "hi")
+    assert by_content != idempotency_key("a2a", {}, payload, "u", "hi")
+    
+    # No way to tell a retry from a repeated message
+    assert idempotency_key("telex", {}, {"message": "hi"}, "u", "hi") is None
+
+
+def test_save_task_with_same_key_inserts_once(test_db):
+    """The idempotency_keys table keeps a retried delivery from inserting twice"""
+    first = save_task("alice", "call mom", datetime.now(), idempotency_key="k1")
+    second = save_task("alice", "call mom", datetime.now(), idempotency_key="k1")
+    assert second == first
+    assert len(get_all_tasks(user="alice")) == 1
+    assert get_task_by_idempotency_key("k1")["id"] == first
+    assert get_task_by_idempotency_key("unknown") is None
+
+
+def test_process_message_replay_skips_parsing(test_db, monkeypatch):
+    """A known key is answered from the database without parsing"""
+    reply = task_agent.process_message("bob", "remind me tomorrow at 5pm to study", "k2")
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("message parsed again")
+    
+    monkeypatch.setattr(task_agent, "extract_task_and_time", fail)
+    assert task_agent.process_message("bob", "remind me tomorrow at 5pm to study", "k2") == reply
+
+
+def test_store_coalesces_concurrent_retries():
+    """A retry arriving mid-processing waits for the original response"""
+    async def scenario():
+        store = IdempotencyStore()
+        calls = []
+        
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"response": "ok"}
+        
+        results = await asyncio.gather(*(store.run("k", handler) for _ in range(5)))
+        assert len(calls) == 1
+        assert [replayed for _, replayed in results].count(False) == 1
+        assert all(response == {"response": "ok"} for response, _ in results)
+        assert await store.run("k", handler) == ({"response": "ok"}, True)
+    
+    asyncio.run(scenario())
+
+
+def test_store_is_bounded_and_expires():
+    """Old keys are dropped by size and by age"""
+    store = IdempotencyStore(ttl=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        store.put(key, {"key": key})
+    assert store.get("a") is None
+    assert store.get("c") == {"key": "c"}
+    
+    store.ttl = -1
+    assert store.get("c") is None
+
+
+def test_expired_keys_are_pruned_from_the_database(test_db, monkeypatch):
+    """Stored keys older than the TTL are deleted; their tasks stay"""
+    monkeypatch.setattr("utils.idempotency.IDEMPOTENCY_TTL_SECONDS", 3600)
+    old = save_task("carol", "old task", datetime.now(), idempotency_key="old")
+    save_task("carol", "new task", datetime.now(), idempotency_key="new")
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE idempotency_keys SET created_at = ? WHERE key = 'old'",
+                     ((datetime.now() - timedelta(hours=2)).isoformat(),))
+        conn.commit()
+    
+    assert prune_expired_keys() == 1
+    assert get_task_by_idempotency_key("old") is None
+    assert get_task_by_idempotency_key("new")["task"] == "new task"
+    assert [task["id"] for task in get_all_tasks(user="carol") if task["task"] == "old task"] == [old]
+    assert prune_expired_keys() == 0
@@ -1,9 +1,12 @@
 import pytest
 from fastapi.testclient import TestClient
 from server import app
-from db.database import init_db, save_task
+from db.database import init_db, save_task, shard_for_user
 from datetime import datetime, timedelta
 import tempfile
+import json
+import csv
+import io
 import os
 
 
@@ -20,10 +23,9 @@ def client(monkeypatch):
     # Initialize database
     init_db()
     
-    # Create test client
-    client = TestClient(app)
-    
-    yield client
+    # Create test client; entering it runs the app's startup
+    with TestClient(app) as client:
+        yield client
     
     # Cleanup
     if os.path.exists(test_db_path):
@@ -210,3 +212,319 @@ def test_trigger_reminders_endpoint(client):
     response = client.get("/trigger-reminders")
     assert response.status_code == 200
     assert response.json()["status"] == "Reminder check executed"
+
+
+def test_export_tasks_ndjson(client):
+    """Test streaming export as NDJSON"""
+    save_task("alice", "task 1", datetime.now())
+    save_task("alice", "task 2", datetime.now())
+    save_task("bob", "task 3", datetime.now())
+    
+    response = client.get("/tasks/export?format=ndjson&user=alice")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["task"] for line in lines] == ["task 1", "task 2"]
+
+
+def test_export_tasks_csv(client):
+    """Test streaming export as CSV with a header row"""
+    save_task("carol", "write, with comma", datetime.now())
+    
+    response = client.get("/tasks/export?format=csv")
+    assert response.status_code == 200
+    
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0][:3] == ["id", "user", "task"]
+    assert rows[1][1:3] == ["carol", "write, with comma"]
+
+
+def test_export_tasks_csv_without_matches_has_header(client):
+    """An export matching no tasks is still a valid CSV with its header row"""
+    response = client.get("/tasks/export?format=csv&user=nobody")
+    assert response.status_code == 200
+    
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0][:3] == ["id", "user", "task"]
+    
+    assert client.get("/tasks/export?format=ndjson&user=nobody").text == ""
+
+
+def test_export_tasks_invalid_format(client):
+    """Test export with an unsupported format"""
+    response = client.get("/tasks/export?format=xml")
+    assert response.status_code == 400
+
+
+def test_websocket_task_query_sends_deltas(client):
+    """task_query with `since` returns only the changes after it"""
+    save_task("ivy", "first", datetime.now())
+    
+    with client.websocket_connect("/ws/ivy") as ws:
+        assert ws.receive_json()["type"] == "connected"
+        
+        ws.send_json({"type": "task_query"})
+        full = ws.receive_json()
+        assert full["type"] == "task_list"
+        assert full["count"] == 1
+        
+        ws.send_json({"type": "task_query", "since": full["seq"]})
+        idle = ws.receive_json()
+        assert idle == {"type": "task_changes", "changes": [], "seq": full["seq"]}
+        
+        task_id = save_task("ivy", "second", datetime.now())
+        ws.send_json({"type": "task_query", "since": full["seq"]})
+        delta = ws.receive_json()
+        while delta["type"] == "task_changed":
+            # Live push from the event bus, sent before the query's answer
+            delta = ws.receive_json()
+        assert [c["task_id"] for c in delta["changes"]] == [task_id]
+        assert delta["seq"] > full["seq"]
+
+
+def test_list_tasks_conditional_get(client):
+    """Unchanged listings answer If-None-Match with 304 Not Modified"""
+    save_task("jack", "first", datetime.now())
+    
+    response = client.get("/tasks?user=jack")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+    
+    cached = client.get("/tasks?user=jack", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    
+    # Other filters get their own validator
+    assert client.get("/tasks?user=jack&limit=5").headers["etag"] != etag
+    
+    # Any write to the user's tasks changes the ETag
+    save_task("jack", "second", datetime.now())
+    changed = client.get("/tasks?user=jack", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["count"] == 2
+    assert changed.headers["etag"] != etag
+
+
+def test_unfiltered_listing_etag_covers_every_shard(client, monkeypatch):
+    """A write to a lower shard after a higher one still changes the /tasks ETag"""
+    monkeypatch.setattr('db.database.DB_SHARDS', 3)
+    init_db()
+    users = {shard_for_user(f"user-{i}"): f"user-{i}" for i in range(50)}
+    
+    save_task(users[2], "in shard 2", datetime.now())
+    response = client.get("/tasks")
+    etag = response.headers["etag"]
+    assert response.json()["count"] == 1
+    
+    save_task(users[0], "in shard 0", datetime.now())
+    changed = client.get("/tasks", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["count"] == 2
+    assert changed.headers["etag"] != etag
+
+
+def test_static_pages_precompressed_and_cached(client):
+    """Pages come precompressed from memory with hash-based validators"""
+    response = client.get("/static/dashboard.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert "<html" in response.text
+    
+    etag = response.headers["etag"]
+    cached = client.get("/static/dashboard.html", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    
+    version = etag.strip('"')
+    versioned = client.get(f"/static/dashboard.html?v={version}")
+    assert "immutable" in versioned.headers["cache-control"]
+    
+    assert client.get("/static/missing.html").status_code == 404
+
+
+def test_home_links_to_versioned_pages(client):
+    """The landing page links to content-hashed static URLs"""
+    response = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert "/static/login.html?v=" in response.text
+
+
+def test_large_json_responses_compressed(client):
+    """JSON above the size threshold is gzip-compressed"""
+    for i in range(50):
+        save_task("kim", f"task number {i}", datetime.now())
+    
+    response = client.get("/tasks?user=kim", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["count"] == 50
+    
+    small = client.get("/tasks?user=nobody", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_webhook_retry_after_database_error_is_processed_again(client, monkeypatch):
+    """A transient save failure is not replayed: the retry saves the task"""
+    import agents.task_agent as task_agent
+    import sqlite3
+    real_save_task = task_agent.save_task
+    calls = []
+    
+    def flaky_save_task(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return real_save_task(*args, **kwargs)
+    
+    monkeypatch.setattr(task_agent, "save_task", flaky_save_task)
+    payload = {"sender": "mia", "message": "remind me tomorrow at 5pm to call mom"}
+    headers = {"Idempotency-Key": "delivery-7"}
+    
+    first = client.post("/webhook/telex", json=payload, headers=headers)
+    assert first.json()["response"] == task_agent.DATABASE_ERROR_REPLY
+    
+    retry = client.post("/webhook/telex", json=payload, headers=headers)
+    assert "idempotent-replayed" not in retry.headers
+    assert retry.json()["response"].startswith("✅ Saved task")
+    assert len(calls) == 2
+    
+    # Once it has succeeded, further retries are replayed
+    again = client.post("/webhook/telex", json=payload, headers=headers)
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json() == retry.json()
+
+
+def test_webhook_retries_are_replayed(client):
+    """A retried delivery returns the original reply and saves one task"""
+    payload = {
+        "sender": "liam",
+        "message": "remind me tomorrow at 5pm to call mom",
+        "timestamp": "2025-11-03T09:00:00Z"
+    }
+    
+    first = client.post("/webhook/telex", json=payload)
+    retry = client.post("/webhook/telex", json=payload)
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    
+    # An explicit key works the same way on the A2A endpoint
+    a2a = {"user": "liam", "message": "remind me at 6pm to study"}
+    headers = {"Idempotency-Key": "delivery-42"}
+    first = client.post("/a2a/agent/taskAgent", json=a2a, headers=headers)
+    retry = client.post("/a2a/agent/taskAgent", json=a2a, headers=headers)
+    assert retry.json() == first.json()
+    
+    assert client.get("/tasks?user=liam").json()["count"] == 2
+
+
+def test_webhook_sheds_load_with_429(client, monkeypatch):
+    """Requests beyond the admission limits get 429 with Retry-After"""
+    import server
+    from utils.admission import AdmissionController
+    monkeypatch.setitem(server.admission, "telex", AdmissionController("telex", max_in_flight=0, max_queue=0))
+    
+    response = client.post("/webhook/telex", json={"sender": "mia", "message": "remind me at 5pm to run"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.json()["reason"] == "queue_full"
+    
+    stats = client.get("/stats/admission").json()
+    assert stats["telex"]["shed"]["queue_full"] == 1
+
+
+def test_metrics_endpoint(client):
+    """/metrics exposes per-route latency and query timings"""
+    save_task("noah", "task", datetime.now())
+    client.get("/tasks?user=noah")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/tasks"}' in response.text
+    assert 'db_query_seconds_count{function="save_task"}' in response.text
+    assert "websocket_connections 0" in response.text
+
+
+def test_delivery_stats_endpoint(client):
+    """/stats/deliveries returns windows and rejects too many of them"""
+    data = client.get("/stats/deliveries?hours=2&window=3600").json()
+    assert len(data["windows"]) == 2
+    assert data["overall"]["sent"] == 0
+    
+    assert client.get("/stats/deliveries?hours=24&window=1").status_code == 400
+
+
+def test_webhook_trace_covers_agent_nlp_and_db(client):
+    """A sampled webhook request records spans down to the database"""
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    response = client.post(
+        "/webhook/telex",
+        json={"message": "remind me tomorrow at 5pm to call mom", "sender": "tracer"},
+        headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"] == trace_id
+    
+    [trace] = client.get(f"/traces?trace_id={trace_id}").json()["traces"]
+    names = {span["name"] for span in trace["spans"]}
+    assert trace["name"] == "http POST /webhook/telex"
+    assert {"agent.process_message", "nlp.extract_task_and_time", "nlp.search_dates", "db.save_task"} <= names
+
+
+def test_profiling_requires_admin_token(client, monkeypatch):
+    """Profiling endpoints are refused without the admin token"""
+    monkeypatch.setattr("utils.admin.ADMIN_TOKEN", "")
+    assert client.get("/admin/profile?seconds=0.1").status_code == 403
+    monkeypatch.setattr("utils.admin.ADMIN_TOKEN", "secret")
+    assert client.get("/admin/profile?seconds=0.1", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    
+    response = client.get("/admin/profile?seconds=0.1&interval_ms=1", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["x-profile-samples"]) > 0
+
+
+def test_webhook_request_profile(client, monkeypatch):
+    """X-Profile attaches a retrievable profile to a single webhook call"""
+    monkeypatch.setattr("utils.admin.ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+    
+    plain = client.post("/webhook/telex", json={"message": "remind me at 5pm to stretch", "sender": "p"})
+    assert "x-profile-id" not in plain.headers
+    
+    response = client.post(
+        "/webhook/telex",
+        json={"message": "remind me tomorrow at 6pm to call mom", "sender": "profiled"},
+        headers={"X-Profile": "1", **admin}
+    )
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    
+    profile = client.get(f"/admin/profile/requests/{profile_id}", headers=admin)
+    assert profile.status_code == 200
+    assert client.get("/admin/profile/requests/missing", headers=admin).status_code == 404
+
+
+def test_startup_warns_when_no_process_is_told_to_send_reminders(client, monkeypatch):
+    """Without SERVER_ROLES (plain `uvicorn server:app`) startup warns that reminders may not go out"""
+    logged = []
+    
+    def record(message, level="info", *args, **kwargs):
+        logged.append((level, message))
+    
+    monkeypatch.setattr("server.log", record)
+    
+    monkeypatch.delenv("SERVER_ROLES", raising=False)
+    with TestClient(app):
+        pass
+    assert any(level == "warning" and "SERVER_ROLES" in message for level, message in logged)
+    
+    logged.clear()
+    monkeypatch.setenv("SERVER_ROLES", "web")
+    with TestClient(app):
+        pass
+    assert not any(level == "warning" for level, message in logged)
@@ -0,0 +1,85 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+from utils import logger as app_logger
+from utils.logger import DroppingQueueHandler, JsonFormatter, log
+
+
+class _Counting:
+    """Counts how often it is formatted"""
+    def __init__(self):
+        self.calls = 0
+    
+    def __str__(self):
+        self.calls += 1
+        return "payload"
+
+
+def test_disabled_levels_skip_formatting(monkeypatch):
+    """Arguments are not formatted when the level is disabled"""
+    app_logger.logger.setLevel(logging.INFO)
+    value = _Counting()
+    log("Payload: %s", "debug", value)
+    app_logger.logger.setLevel(logging.NOTSET)
+    assert value.calls == 0
+
+
+def test_log_returns_without_writing(monkeypatch):
+    """log() only enqueues; handlers run on the listener thread"""
+    captured = queue.Queue()
+    handler = DroppingQueueHandler(captured)
+    monkeypatch.setattr(app_logger.logger, "handlers", [handler])
+    monkeypatch.setattr(app_logger.logger, "propagate", False)
+    app_logger.logger.setLevel(logging.INFO)
+    
+    log("Saved %d task(s)", "info", 3)
+    app_logger.logger.setLevel(logging.NOTSET)
+    record = captured.get_nowait()
+    assert record.getMessage() == "Saved 3 task(s)"
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """A full queue drops records rather than stalling the caller"""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("test_full_queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    
+    logger.warning("first")
+    logger.warning("second")
+    assert handler.dropped == 1
+
+
+def test_json_formatter():
+    """JSON output has one object per record"""
+    record = logging.LogRecord("app", logging.ERROR, __file__, 1, "Failed %s", ("send",), None)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR"
+    assert entry["message"] == "Failed send"
+    assert entry["logger"] == "app"
+
+
+def test_exception_traceback_survives_the_queue():
+    """The listener's formatter gets the traceback of a logged exception"""
+    handler = DroppingQueueHandler(queue.Queue())
+    output = io.StringIO()
+    writer = logging.StreamHandler(output)
+    writer.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(handler.queue, writer)
+    logger = logging.getLogger("test_exception_traceback")
+    logger.addHandler(handler)
+    logger.propagate = False
+    
+    listener.start()
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        logger.error("Failed %s", "send", exc_info=True)
+    listener.stop()
+    
+    entry = json.loads(output.getvalue())
+    assert entry["message"] == "Failed send"
+    assert "Traceback" in entry["exc"]
+    assert "ValueError: bad payload" in entry["exc"]
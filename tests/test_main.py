@@ -0,0 +1,73 @@
+import pytest
+from db.database import init_db, get_all_tasks, shard_for_user, shard_path
+from main import import_messages, read_messages
+import io
+import sqlite3
+import tempfile
+import os
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Create a temporary test database"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+    
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    init_db()
+    
+    yield test_db_path
+    
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def test_read_messages_parses_user_prefix_and_skips_blanks():
+    """Lines may carry a `user<TAB>` prefix; blanks and comments are skipped"""
+    lines = ["call mom tomorrow\n", "\n", "# comment\n", "bob\tpay rent in 2 days\n"]
+    
+    items = list(read_messages(lines, "alice"))
+    assert items == [
+        (1, "alice", "call mom tomorrow"),
+        (4, "bob", "pay rent in 2 days"),
+    ]
+
+
+def test_import_messages_batches_and_reports_stats(test_db):
+    """Imported messages are saved in batches and rejected lines are counted"""
+    lines = io.StringIO(
+        "call mom tomorrow\n"
+        "bob\tsubmit the report in 2 hours\n"
+        "\n"
+        "xyz\n"
+        "water the plants in 30 minutes\n"
+    )
+    errors = io.StringIO()
+    
+    stats = import_messages(lines, "alice", workers=1, batch_size=2, errors_out=errors)
+    
+    assert stats["messages"] == 4
+    assert stats["imported"] == 3
+    assert stats["rejected"] == 1
+    assert "line 4: no time detected" in errors.getvalue()
+    
+    assert len(get_all_tasks(user="alice")) == 2
+    assert get_all_tasks(user="bob")[0]["task"] == "submit the report"
+
+
+def test_import_messages_counts_only_the_failed_shard_as_errors(test_db, monkeypatch):
+    """With sharding, a shard that fails doesn't turn the rest of the batch into errors"""
+    monkeypatch.setattr('db.database.DB_SHARDS', 2)
+    init_db()
+    users = [f"user-{i}" for i in range(6)]
+    with sqlite3.connect(shard_path(1)) as conn:
+        conn.execute("DROP TABLE task_changes")
+    lines = [f"{user}\tcall mom tomorrow\n" for user in users]
+    failing = sum(shard_for_user(user) == 1 for user in users)
+    errors = io.StringIO()
+    
+    stats = import_messages(lines, "alice", workers=1, batch_size=10, errors_out=errors)
+    
+    assert stats["imported"] == len(users) - failing
+    assert stats["db_errors"] == failing
+    assert f"{failing} task(s) not saved" in errors.getvalue()
@@ -0,0 +1,64 @@
+import pytest
+from utils.metrics import Counter, Gauge, Histogram, Registry, _Metric
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Observations land in `le` buckets, rendered cumulatively"""
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    child = histogram.labels("/tasks")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+    
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/tasks",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/tasks",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/tasks",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/tasks"} 4' in lines
+    assert 'latency_seconds_sum{route="/tasks"} 3.65' in lines
+
+
+def test_timing_decorator_records_calls_and_errors():
+    """Decorated functions are timed even when they raise"""
+    histogram = Histogram("call_seconds", "Calls.")
+    
+    @histogram.time()
+    def work(fail=False):
+        if fail:
+            raise ValueError("boom")
+        return 42
+    
+    assert work() == 42
+    assert work.__name__ == "work"
+    try:
+        work(fail=True)
+    except ValueError:
+        pass
+    assert "call_seconds_count 2" in histogram.render()
+
+
+def test_registry_renders_counters_and_gauges():
+    """Counters accumulate; gauges may read their value at scrape time"""
+    registry = Registry()
+    failures = registry.register(Counter("failures_total", "Failures."))
+    backlog = registry.register(Gauge("backlog", "Backlog."))
+    connections = registry.register(Gauge("connections", "Connections."))
+    
+    failures.inc()
+    failures.inc(2)
+    backlog.set(7)
+    connections.set_function(lambda: 3)
+    
+    text = registry.render()
+    assert "# TYPE failures_total counter\nfailures_total 3\n" in text
+    assert "backlog 7\n" in text
+    assert "connections 3\n" in text
+
+
+def test_incomplete_metric_type_cannot_be_created():
+    """A metric type missing _render_child fails when created, not at scrape time"""
+    class Untyped(_Metric):
+        def _new_child(self):
+            return None
+    
+    with pytest.raises(TypeError):
+        Untyped("app_untyped", "Never rendered")
@@ -15,3 +15,23 @@ def test_preserves_casing_and_removes_keyword():
     # task should preserve the words and not include the keyword 'tomorrow'
     assert "tomorrow" not in res["task"].lower()
     assert res["task"].lower().startswith("call alice")
+
+
+def test_relative_base_freezes_clock():
+    base = datetime.datetime(2025, 11, 3, 9, 0)
+    res = extract_task_and_time("submit the report in 2 hours", relative_base=base)
+    assert res["time"] == datetime.datetime(2025, 11, 3, 11, 0)
+    assert res["task"] == "submit the report"
+
+
+def test_benchmark_corpus_is_frozen_and_well_formed():
+    from benchmarks.nlp_corpus import CORPUS_VERSION, generate_corpus, load_corpus
+
+    corpus = load_corpus()
+    assert corpus["version"] == CORPUS_VERSION
+    assert len(corpus["cases"]) >= 1000
+    # The frozen file must match the generator for its version
+    assert corpus["cases"] == generate_corpus()
+    for case in corpus["cases"][:50]:
+        assert case["text"] and case["task"]
+        datetime.datetime.fromisoformat(case["time"])
@@ -0,0 +1,71 @@
+import threading
+import time
+from utils.profiler import SamplingProfiler, follow, _request_profile
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_collapsed_stacks_of_a_busy_thread():
+    """A working thread shows up as thread;outer;...;inner count lines"""
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy-worker")
+    worker.start()
+    profile = SamplingProfiler(interval_ms=1).start()
+    time.sleep(0.1)
+    profile.stop()
+    stop.set()
+    worker.join()
+    
+    lines = profile.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy-worker;")]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "_busy (tests/test_profiler.py:" in stack
+    assert profile.samples > 0
+
+
+def test_idle_threads_are_skipped_by_default():
+    """Threads blocked waiting are left out unless asked for"""
+    stop = threading.Event()
+    waiter = threading.Thread(target=stop.wait, name="idle-waiter")
+    waiter.start()
+    quiet = SamplingProfiler(interval_ms=1).start()
+    time.sleep(0.05)
+    quiet.stop()
+    noisy = SamplingProfiler(interval_ms=1, include_idle=True).start()
+    time.sleep(0.05)
+    noisy.stop()
+    stop.set()
+    waiter.join()
+    
+    assert "idle-waiter;" not in quiet.collapsed()
+    assert "idle-waiter;" in noisy.collapsed()
+
+
+def test_no_thread_runs_while_idle():
+    """A profiler that is not started or has stopped leaves nothing running"""
+    before = {thread.name for thread in threading.enumerate()}
+    profile = SamplingProfiler(interval_ms=1)
+    assert "profiler" not in before
+    profile.start().stop()
+    assert "profiler" not in {thread.name for thread in threading.enumerate()}
+
+
+def test_follow_adds_the_calling_thread_to_the_request_profile():
+    """Work wrapped with follow() is sampled only while it runs"""
+    profile = SamplingProfiler(threads=set())
+    seen = []
+    wrapped = follow(lambda: seen.append(set(profile.threads)))
+    
+    token = _request_profile.set(profile)
+    try:
+        wrapped()
+    finally:
+        _request_profile.reset(token)
+    
+    assert seen == [{threading.get_ident()}]
+    assert profile.threads == set()
@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from db.database import init_db, get_user_profile
+from utils.nlp import ParseContext, extract_task_and_time
+from utils import profiles
+import tempfile
+import os
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Create a temporary test database"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+    
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    init_db()
+    profiles.cache.clear()
+    
+    yield test_db_path
+    
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def test_user_without_profile_gets_default_context(test_db):
+    """Users with no stored profile share the default context"""
+    assert profiles.get_parse_context("alice") is profiles.DEFAULT_CONTEXT
+
+
+def test_context_is_cached_until_invalidated(test_db):
+    """A profile is loaded once and reused until it is updated"""
+    profiles.update_user_profile("bob", timezone="Africa/Nairobi", languages=["en"])
+    
+    first = profiles.get_parse_context("bob")
+    second = profiles.get_parse_context("bob")
+    assert first is second
+    assert first.languages == ["en"]
+    
+    profiles.update_user_profile("bob", timezone="UTC", languages=["en"], date_order="DMY")
+    updated = profiles.get_parse_context("bob")
+    assert updated is not first
+    assert updated.timezone == "UTC"
+    assert updated.date_order == "DMY"
+    assert get_user_profile("bob")["languages"] == ["en"]
+
+
+def test_invalid_profile_is_rejected(test_db):
+    """Unknown timezones, languages and date orders raise ValueError"""
+    with pytest.raises(ValueError):
+        profiles.update_user_profile("carol", timezone="Mars/Olympus")
+    with pytest.raises(ValueError):
+        profiles.update_user_profile("carol", languages=["xx"])
+    with pytest.raises(ValueError):
+        profiles.update_user_profile("carol", date_order="QQQ")
+    assert get_user_profile("carol") is None
+
+
+def test_times_are_interpreted_in_user_timezone():
+    """'at 5pm' in the user's timezone is converted to naive server-local time"""
+    context = ParseContext(timezone="Asia/Tokyo", languages=["en"])
+    res = extract_task_and_time("remind me at 5pm to study", context=context)
+    
+    assert res["task"] == "study"
+    assert res["time"].tzinfo is None
+    tokyo = res["time"].astimezone().astimezone(ZoneInfo("Asia/Tokyo"))
+    assert (tokyo.hour, tokyo.minute) == (17, 0)
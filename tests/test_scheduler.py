@@ -1,7 +1,12 @@
 import pytest
 from datetime import datetime, timedelta
 from scheduler import reminder_job
-from db.database import init_db, save_task, get_due_tasks, mark_task_sent
+from db.database import (
+    init_db, save_task, get_due_tasks, mark_task_sent,
+    save_delivery_stats, get_delivery_stats,
+    claim_due_tasks, release_task_claim
+)
+from utils import delivery_stats
 import tempfile
 import os
 
@@ -108,3 +113,107 @@ def test_task_not_sent_twice(test_db):
     # Second check - should not be due
     due_tasks_2 = get_due_tasks()
     assert len(due_tasks_2) == 0
+
+
+def test_reminder_job_records_delivery_lateness(test_db, monkeypatch):
+    """Each delivery attempt is saved with its due, claim and send times"""
+    monkeypatch.setattr("scheduler.send_reminder", lambda user, text, task_id: task_id % 2 == 1)
+    save_task("frank", "late task", datetime.now() - timedelta(minutes=10))
+    save_task("frank", "failing task", datetime.now() - timedelta(minutes=5))
+    
+    reminder_job()
+    
+    rows = get_delivery_stats(0)
+    assert len(rows) == 2
+    (due_at, claimed_at, sent_at, ok), failed = rows
+    assert ok == 1 and failed[3] == 0
+    assert 595 < sent_at - due_at < 660
+    assert due_at < claimed_at <= sent_at
+
+
+def test_summarize_lateness_per_window(test_db):
+    """Lateness percentiles and throughput are reported per window"""
+    now = 1_000_000.0
+    rows = [(i, now - 3000 + i, now - 3000 + i + 1, now - 3000 + i + lateness, True)
+            for i, lateness in enumerate([1, 2, 3, 4, 100])]
+    rows.append((99, now - 600, now - 590, now - 500, False))
+    save_delivery_stats(rows)
+    
+    summary = delivery_stats.summarize(hours=1, window_seconds=1800, now=now)
+    overall = summary["overall"]
+    assert overall["sent"] == 5
+    assert overall["failed"] == 1
+    assert overall["lateness_seconds"]["p50"] == 3
+    assert overall["lateness_seconds"]["p99"] == 100
+    
+    first, second = summary["windows"]
+    assert first["sent"] == 5 and first["failed"] == 0
+    assert first["throughput_per_minute"] == pytest.approx(5 / 30)
+    assert second["sent"] == 0 and second["lateness_seconds"]["p50"] is None
+    
+    with pytest.raises(ValueError):
+        delivery_stats.summarize(hours=24, window_seconds=1)
+
+
+def test_claimed_tasks_go_to_one_dispatcher(test_db):
+    """A due task claimed by one dispatcher is not handed to another"""
+    task_id = save_task("gina", "claimed task", datetime.now() - timedelta(minutes=1))
+    
+    assert [task[0] for task in claim_due_tasks("worker-a", 60)] == [task_id]
+    assert claim_due_tasks("worker-b", 60) == []
+    
+    # A failed delivery is released for a retry
+    release_task_claim(task_id)
+    assert [task[0] for task in claim_due_tasks("worker-b", 60)] == [task_id]
+    
+    # Sent tasks are never claimed again
+    mark_task_sent(task_id)
+    release_task_claim(task_id)
+    assert claim_due_tasks("worker-a", 60) == []
+
+
+def test_draining_sends_in_flight_reminder_and_releases_the_rest(test_db, monkeypatch):
+    """Once shutdown begins, the send in progress completes and unsent claims are handed back"""
+    import scheduler
+    sent = []
+    
+    def send(user, text, task_id):
+        sent.append(task_id)
+        scheduler.begin_drain()  # Shutdown arrives mid-run
+        return True
+    
+    monkeypatch.setattr("scheduler.send_reminder", send)
+    first = save_task("hank", "first", datetime.now() - timedelta(minutes=3))
+    second = save_task("hank", "second", datetime.now() - timedelta(minutes=2))
+    try:
+        reminder_job()
+        assert sent == [first]
+        assert scheduler.drain(timeout=1)
+        
+        # No new claims while draining; the released task is free for the next process
+        reminder_job()
+        assert sent == [first]
+        assert [task[0] for task in claim_due_tasks("next-process", 60)] == [second]
+    finally:
+        scheduler._draining.clear()
+
+
+def test_drain_starting_as_a_run_begins_waits_for_it(test_db, monkeypatch):
+    """A drain() that lands just as reminder_job starts waits for it, and the run claims nothing"""
+    import scheduler
+    drained = []
+    
+    class DrainOnCheck(type(scheduler._draining)):
+        def is_set(self):
+            # Shutdown arrives right before the run looks at the flag
+            if not drained:
+                self.set()
+                drained.append(scheduler._idle.is_set())
+            return super().is_set()
+    
+    monkeypatch.setattr("scheduler._draining", DrainOnCheck())
+    monkeypatch.setattr("scheduler.claim_due_tasks", lambda *args: pytest.fail("claimed while draining"))
+    
+    reminder_job()
+    assert drained == [False]  # drain() would have waited
+    assert scheduler._idle.is_set()
@@ -0,0 +1,47 @@
+import pytest
+import json
+from datetime import datetime
+from utils import serialization
+from utils.serialization import FastJSONResponse, SERIALIZERS, dumps, dumps_text, set_serializer
+
+
+@pytest.fixture(params=sorted(SERIALIZERS))
+def serializer(request):
+    """Run a test once per available backend"""
+    set_serializer(request.param)
+    yield request.param
+    set_serializer(serialization.JSON_SERIALIZER)
+
+
+def test_dumps_compact_utf8(serializer):
+    """Output is compact JSON with non-ASCII kept as UTF-8"""
+    data = {"task": "call mom 📞", "id": 1, "sent": 0}
+    assert dumps(data) == json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert json.loads(dumps_text(data)) == data
+
+
+def test_dumps_datetimes(serializer):
+    """datetime values are written in ISO format"""
+    when = datetime(2025, 11, 3, 15, 0)
+    assert json.loads(dumps({"time": when})) == {"time": "2025-11-03T15:00:00"}
+
+
+def test_dumps_large_integers(serializer):
+    """Integers beyond 64 bits (e.g. echoed client input) still serialize"""
+    assert json.loads(dumps({"n": 2 ** 70})) == {"n": 2 ** 70}
+
+
+def test_fast_json_response(serializer):
+    """FastJSONResponse renders with the selected serializer"""
+    response = FastJSONResponse({"tasks": [], "count": 0})
+    assert response.body == b'{"tasks":[],"count":0}'
+    assert response.media_type == "application/json"
+
+
+def test_unknown_serializer_falls_back():
+    """Unavailable backends fall back to the stdlib encoder"""
+    try:
+        assert set_serializer("nope") == "json"
+        assert dumps([1]) == b"[1]"
+    finally:
+        set_serializer(serialization.JSON_SERIALIZER)
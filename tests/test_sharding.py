@@ -0,0 +1,110 @@
+import pytest
+import sqlite3
+from datetime import datetime, timedelta
+from db import database
+from db.database import (
+    init_db, save_task, get_all_tasks, get_due_tasks, claim_due_tasks,
+    delete_task, snooze_task, get_changes_since, get_task_by_idempotency_key,
+    save_tasks_bulk, shard_for_user, shard_path, PartialSaveError, SHARD_ID_BITS
+)
+from db import rebalance
+import tempfile
+import os
+
+USERS = [f"user-{i}" for i in range(12)]
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Temporary database split over three task shards"""
+    temp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr('db.database.DB_NAME', os.path.join(temp_dir, "test_tasks.db"))
+    monkeypatch.setattr('db.database.DB_SHARDS', 3)
+    init_db()
+    yield temp_dir
+
+
+def _users_in(index):
+    with sqlite3.connect(shard_path(index)) as conn:
+        return {row[0] for row in conn.execute("SELECT DISTINCT user FROM tasks")}
+
+
+def test_tasks_are_stored_in_their_users_shard(test_db):
+    """Each user's tasks go to one shard, with IDs from that shard's range"""
+    base = datetime(2025, 11, 3, 9, 0)
+    ids = {user: save_task(user, "call mom", base + timedelta(minutes=i)) for i, user in enumerate(USERS)}
+
+    for index in range(3):
+        assert _users_in(index) == {user for user in USERS if shard_for_user(user) == index}
+    assert {ids[user] >> SHARD_ID_BITS for user in USERS} == {shard_for_user(user) for user in USERS}
+    assert len(set(ids.values())) == len(USERS)
+
+    # ID-addressed writes find the right shard
+    user = USERS[5]
+    assert snooze_task(ids[user], 10)
+    assert get_all_tasks(user=user)[0]["time"] == (base + timedelta(minutes=15)).isoformat()
+    assert delete_task(ids[user])
+    assert get_all_tasks(user=user) == []
+
+    # Unfiltered listings merge the shards newest first
+    newest = get_all_tasks(limit=3)
+    assert [task["user"] for task in newest] == ["user-11", "user-10", "user-9"]
+
+
+def test_due_tasks_are_merged_across_shards_in_due_order(test_db):
+    """Due and claimed tasks come back earliest first, whichever shard holds them"""
+    now = datetime.now()
+    for i, user in enumerate(USERS):
+        save_task(user, f"task {i}", now - timedelta(minutes=len(USERS) - i))
+    save_task(USERS[0], "later", now + timedelta(hours=1))
+
+    due = get_due_tasks()
+    assert [task[2] for task in due] == [f"task {i}" for i in range(len(USERS))]
+
+    claimed = claim_due_tasks("worker-a", 60)
+    assert [task[0] for task in claimed] == [task[0] for task in due]
+    assert claim_due_tasks("worker-b", 60) == []
+
+
+def test_bulk_save_keeps_other_shards_when_one_fails(test_db):
+    """A failed shard's tasks are reported as not saved; the other shards' tasks are committed"""
+    with sqlite3.connect(shard_path(1)) as conn:
+        conn.execute("CREATE TRIGGER fail_inserts BEFORE INSERT ON tasks BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    rows = [(user, "call mom", datetime(2025, 11, 3, 9, 0)) for user in USERS]
+    failing = sum(shard_for_user(user) == 1 for user in USERS)
+
+    with pytest.raises(PartialSaveError) as excinfo:
+        save_tasks_bulk(rows)
+
+    assert (excinfo.value.saved, excinfo.value.failed) == (len(USERS) - failing, failing)
+    for user in USERS:
+        assert len(get_all_tasks(user=user)) == (0 if shard_for_user(user) == 1 else 1)
+
+
+def test_rebalance_moves_users_to_their_new_shard(test_db, monkeypatch):
+    """Going from one file to three shards keeps every task, key and open page in sync"""
+    monkeypatch.setattr('db.database.DB_SHARDS', 1)
+    for i, user in enumerate(USERS):
+        save_task(user, f"task {i}", datetime(2025, 11, 3, 9, i), idempotency_key=f"delivery-{i}")
+    moving = next(user for user in USERS if shard_for_user(user, 3) != 0)
+    old_task = get_all_tasks(user=moving)[0]
+    _, cursor = get_changes_since(moving, 0)
+
+    summary = rebalance.rebalance(3)
+    assert database.DB_SHARDS == 1
+    monkeypatch.setattr('db.database.DB_SHARDS', 3)
+
+    assert sum(summary["users"].values()) == sum(shard_for_user(user, 3) != 0 for user in USERS)
+    for index in range(3):
+        assert _users_in(index) == {user for user in USERS if shard_for_user(user, 3) == index}
+    new_task = get_all_tasks(user=moving)[0]
+    assert new_task["task"] == old_task["task"]
+    assert new_task["id"] >> SHARD_ID_BITS == shard_for_user(moving, 3)
+    assert get_task_by_idempotency_key(f"delivery-{USERS.index(moving)}", moving)["id"] == new_task["id"]
+
+    # A page that was following the old shard's feed swaps IDs
+    changes, _ = get_changes_since(moving, cursor)
+    assert {(change["op"], change["task_id"]) for change in changes} == {
+        ("deleted", old_task["id"]), ("created", new_task["id"])
+    }
+    assert rebalance.rebalance(3)["users"] == {}
@@ -0,0 +1,131 @@
+import asyncio
+from utils.sse import SSEBroker, HEARTBEAT
+
+
+async def _next(stream, timeout=1.0):
+    """Read the next chunk of an SSE stream"""
+    return await asyncio.wait_for(stream.__anext__(), timeout)
+
+
+def test_stream_delivers_user_events_and_broadcasts():
+    """Subscribers get their own events and broadcasts, not other users'"""
+    async def scenario():
+        broker = SSEBroker()
+        stream = broker.subscribe("alice")
+        assert (await _next(stream)).startswith("retry:")
+        
+        broker.publish({"type": "reminder", "user": "bob", "task_id": 1})
+        broker.publish({"type": "reminder", "user": "alice", "task_id": 2})
+        broker.publish({"type": "pong"})  # Not an SSE event type
+        broker.publish({"type": "task_changed", "task_id": 3})
+        
+        first = await _next(stream)
+        assert first.startswith("id: 1\nevent: reminder\n")
+        assert '"task_id":2' in first
+        assert (await _next(stream)).startswith("id: 2\nevent: task_changed\n")
+        await stream.aclose()
+        assert broker.subscribers == 0
+    
+    asyncio.run(scenario())
+
+
+def test_resume_replays_missed_events():
+    """Reconnecting with Last-Event-ID replays only what was missed"""
+    async def scenario():
+        broker = SSEBroker()
+        stream = broker.subscribe("alice")
+        await _next(stream)
+        broker.publish({"type": "reminder", "user": "alice", "n": 1})
+        assert (await _next(stream)).startswith("id: 1\n")
+        await stream.aclose()
+        
+        # Published while disconnected
+        broker.publish({"type": "reminder", "user": "alice", "n": 2})
+        broker.publish({"type": "reminder", "user": "alice", "n": 3})
+        
+        resumed = broker.subscribe("alice", last_event_id=1)
+        await _next(resumed)
+        assert (await _next(resumed)).startswith("id: 2\n")
+        assert (await _next(resumed)).startswith("id: 3\n")
+        await resumed.aclose()
+    
+    asyncio.run(scenario())
+
+
+def test_resume_beyond_buffer_sends_resync():
+    """A resume point older than the buffer (or unknown) asks for a reload"""
+    async def scenario():
+        broker = SSEBroker(replay_size=2)
+        stream = broker.subscribe("alice")
+        await _next(stream)
+        await stream.aclose()
+        for n in range(5):
+            broker.publish({"type": "reminder", "user": "alice", "n": n})
+        
+        for last_event_id in (1, 99):
+            resumed = broker.subscribe("alice", last_event_id=last_event_id)
+            await _next(resumed)
+            assert "event: resync\n" in await _next(resumed)
+            await resumed.aclose()
+    
+    asyncio.run(scenario())
+
+
+def test_idle_stream_sends_heartbeats():
+    """Idle streams carry heartbeat comments"""
+    async def scenario():
+        broker = SSEBroker(heartbeat=0.01)
+        stream = broker.subscribe("alice")
+        await _next(stream)
+        assert await _next(stream) == HEARTBEAT
+        await stream.aclose()
+    
+    asyncio.run(scenario())
+
+
+def test_many_idle_subscribers_share_one_buffer():
+    """Thousands of idle streams are woken by a single publish"""
+    async def scenario():
+        broker = SSEBroker()
+        streams = [broker.subscribe(f"user-{i % 100}") for i in range(5000)]
+        for stream in streams:
+            await _next(stream)
+        assert len(broker.streams) == 100
+        
+        pending = [asyncio.ensure_future(_next(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        broker.publish({"type": "task_changed", "seq": 1})
+        chunks = await asyncio.gather(*pending)
+        assert all(chunk.startswith("id: 1\n") for chunk in chunks)
+        
+        for stream in streams:
+            await stream.aclose()
+        assert broker.subscribers == 0
+    
+    asyncio.run(scenario())
+
+
+def test_close_all_ends_streams_with_retry_hint():
+    """Shutdown ends open streams, each told when to reconnect"""
+    async def scenario():
+        broker = SSEBroker()
+        streams = [broker.subscribe(f"user-{i}") for i in range(3)]
+        for stream in streams:
+            await _next(stream)
+        pending = [asyncio.ensure_future(_next(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        
+        assert broker.close_all(1000, 2000) == 3
+        for chunk in await asyncio.gather(*pending):
+            assert chunk.startswith("retry: ")
+            assert 1000 <= int(chunk.split()[1]) <= 2000
+        for stream in streams:
+            try:
+                await _next(stream)
+            except StopAsyncIteration:
+                pass
+            else:
+                raise AssertionError("stream still open")
+        assert broker.subscribers == 0
+    
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold `import server` takes about 0.5s, nearly all of it FastAPI; the
+# budget leaves room for slow machines but catches dateparser (+0.45s) or
+# similar creeping back in. Override with IMPORT_BUDGET_SECONDS.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0"))
+
+# Modules only needed once a message is parsed or a reminder is sent
+LAZY_MODULES = ("dateparser", "apscheduler", "requests", "uvicorn", "scheduler")
+
+
+def _run(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+
+
+def test_import_server_has_no_side_effects():
+    """Importing the app loads no heavy modules and starts no scheduler"""
+    code = (
+        "import json, sys, threading, server\n"
+        f"print(json.dumps({{'modules': [m for m in {LAZY_MODULES!r} if m in sys.modules],"
+        " 'threads': [t.name for t in threading.enumerate()]}))"
+    )
+    result = _run(code)
+    assert result.returncode == 0, result.stderr
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    assert loaded["modules"] == []
+    assert not any("APScheduler" in name for name in loaded["threads"])
+
+
+def test_import_server_within_budget():
+    """Cold import of `server` stays within the startup budget"""
+    timings = []
+    for _ in range(3):
+        result = _run("import server", "-X", "importtime")
+        assert result.returncode == 0, result.stderr
+        line = next(line for line in result.stderr.splitlines() if line.rstrip().endswith("| server"))
+        timings.append(int(line.split("|")[1]) / 1e6)
+    if min(timings) > IMPORT_BUDGET_SECONDS:
+        pytest.fail(f"import server took {min(timings):.2f}s, budget {IMPORT_BUDGET_SECONDS:.2f}s")
@@ -0,0 +1,135 @@
+import pytest
+from datetime import datetime, timedelta
+from db.database import (
+    init_db, save_task, get_all_tasks, update_task, snooze_task,
+    delete_task, mark_task_sent
+)
+from db.cache import task_cache, TaskCache
+import subprocess
+import sys
+import tempfile
+import os
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Create a temporary test database with an empty cache"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+    
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    init_db()
+    task_cache.clear()
+    
+    yield test_db_path
+    
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def _uncached(user, **kwargs):
+    """Read straight from the database"""
+    task_cache.invalidate(user)
+    tasks = get_all_tasks(user=user, **kwargs)
+    task_cache.invalidate(user)
+    return tasks
+
+
+def test_repeated_reads_are_served_from_memory(test_db):
+    """The second read of a user's tasks is a cache hit"""
+    save_task("alice", "call mom", datetime.now())
+    hits = task_cache.hits
+    
+    first = get_all_tasks(user="alice")
+    second = get_all_tasks(user="alice")
+    
+    assert first == second
+    assert task_cache.hits == hits + 1
+
+
+def test_writes_update_the_cache_through(test_db):
+    """Every write keeps the cached listing equal to the database"""
+    now = datetime.now()
+    a = save_task("bob", "a", now - timedelta(hours=1))
+    b = save_task("bob", "b", now + timedelta(hours=1))
+    get_all_tasks(user="bob")  # warm
+    
+    c = save_task("bob", "c", now)
+    update_task(a, task_text="a, renamed")
+    snooze_task(b, 30)
+    mark_task_sent(c)
+    delete_task(a)
+    
+    hits = task_cache.hits
+    cached = get_all_tasks(user="bob")
+    assert task_cache.hits == hits + 1
+    assert cached == _uncached("bob")
+    
+    # Status filters are answered from complete entries too
+    get_all_tasks(user="bob")
+    assert get_all_tasks(user="bob", status="sent") == _uncached("bob", status="sent")
+
+
+def _save_from_another_process(db_path, user, task):
+    """Save a task the way a second worker or `main.py --import` would"""
+    script = (
+        "import sys, datetime; from db import database; database.DB_NAME = sys.argv[1]; "
+        "database.save_task(sys.argv[2], sys.argv[3], datetime.datetime.now())"
+    )
+    subprocess.run([sys.executable, "-c", script, db_path, user, task], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_writes_from_another_process_are_not_hidden(test_db):
+    """A cached listing is not served once the user's change seq has moved elsewhere"""
+    now = datetime.now()
+    save_task("alice", "first", now)
+    get_all_tasks(user="alice")  # warm
+    
+    _save_from_another_process(test_db, "alice", "second")
+    assert {t["task"] for t in get_all_tasks(user="alice")} == {"first", "second"}
+    
+    # A local write on top of an entry that missed a foreign write drops it
+    get_all_tasks(user="alice")  # warm
+    _save_from_another_process(test_db, "alice", "third")
+    save_task("alice", "fourth", now)
+    assert get_all_tasks(user="alice") == _uncached("alice")
+    assert len(get_all_tasks(user="alice")) == 4
+
+
+def test_cache_is_bounded(test_db, monkeypatch):
+    """Users are evicted LRU and per-user lists are truncated"""
+    small = TaskCache(max_users=2, per_user=3)
+    monkeypatch.setattr('db.database.task_cache', small)
+    
+    now = datetime.now()
+    for i in range(5):
+        save_task("carol", f"task {i}", now + timedelta(minutes=i))
+    save_task("dave", "d", now)
+    save_task("erin", "e", now)
+    
+    assert len(get_all_tasks(user="carol", limit=2)) == 2
+    assert small.stats()["tasks"] == 2
+    
+    # A limit larger than the cached prefix must go to the database
+    assert len(get_all_tasks(user="carol", limit=5)) == 5
+    assert small.stats()["tasks"] == 3
+    
+    get_all_tasks(user="dave")
+    get_all_tasks(user="erin")
+    stats = small.stats()
+    assert stats["users"] == 2
+    assert stats["approx_memory_bytes"] > 0
+
+
+def test_shared_reads_survive_later_writes(test_db):
+    """Cached dicts handed out with shared=True are never mutated by writes"""
+    task_id = save_task("uma", "first", datetime.now())
+    get_all_tasks(user="uma")
+    
+    shared = get_all_tasks(user="uma", shared=True)
+    assert shared[0]["task"] == "first"
+    
+    update_task(task_id, task_text="renamed")
+    assert shared[0]["task"] == "first"
+    assert get_all_tasks(user="uma")[0]["task"] == "renamed"
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+import tempfile
+from starlette.concurrency import run_in_threadpool
+from utils.tracing import Tracer, current_span, parse_traceparent
+
+
+def test_parse_traceparent():
+    """Valid W3C headers give trace ID, parent and sampled flag"""
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent(header) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00")[2] is False
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+
+
+def test_spans_form_a_tree_with_self_time():
+    """Child spans share the trace ID and are subtracted from their parent's own time"""
+    tracer = Tracer(sample_rate=1.0)
+    traced_work = tracer.traced("work")(lambda: None)
+    
+    with tracer.start_trace("root") as root:
+        with tracer.span("child", step=1) as child:
+            traced_work()
+    
+    [trace] = tracer.traces()
+    assert trace["trace_id"] == root.trace_id
+    assert trace["name"] == "root"
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert spans["child"]["parent_id"] == root.span_id
+    assert spans["work"]["parent_id"] == child.span_id
+    assert spans["child"]["attributes"] == {"step": 1}
+    assert spans["root"]["self_ms"] <= spans["root"]["duration_ms"] - spans["child"]["duration_ms"] + 1e-6
+
+
+def test_unsampled_traces_record_nothing():
+    """Spans inside an unsampled trace, or outside any trace, are no-ops"""
+    tracer = Tracer(sample_rate=0.0)
+    with tracer.span("orphan") as orphan:
+        assert orphan is None
+    with tracer.start_trace("root"):
+        with tracer.span("child") as child:
+            assert child is None
+    assert tracer.traces() == []
+
+
+def test_incoming_trace_id_and_threadpool_propagation():
+    """An incoming sampled header is honoured and the span follows work into threads"""
+    tracer = Tracer(sample_rate=0.0)
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    
+    async def scenario():
+        with tracer.start_trace("request", header):
+            return await run_in_threadpool(tracer.traced("in_thread")(current_span))
+    
+    span = asyncio.run(scenario())
+    assert span.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert span.name == "in_thread"
+    [trace] = tracer.traces(trace_id="4bf92f3577b34da6a3ce929d0e0e4736")
+    assert len(trace["spans"]) == 2
+
+
+def test_file_exporter_writes_json_lines():
+    """Finished spans are appended to the export file"""
+    path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    tracer = Tracer(sample_rate=1.0, export_path=path)
+    with tracer.start_trace("root"):
+        with tracer.span("child"):
+            pass
+    
+    with open(path, encoding="utf-8") as f:
+        names = [json.loads(line)["name"] for line in f]
+    assert names == ["child", "root"]
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+import worker
+from db.database import claim_due_tasks, get_all_tasks, init_db, save_task
+from utils.events import get_event_bus
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Create a temporary test database"""
+    temp_dir = tempfile.mkdtemp()
+    test_db_path = os.path.join(temp_dir, "test_tasks.db")
+    monkeypatch.setattr('db.database.DB_NAME', test_db_path)
+    init_db()
+    yield test_db_path
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+
+
+def test_next_check_waits_for_the_earliest_unclaimed_task(test_db):
+    """The dispatcher sleeps until the next due task, at most one interval"""
+    assert worker.seconds_until_next_check(30) == 30
+    
+    save_task("hal", "soon", datetime.now() + timedelta(seconds=10))
+    assert 8 < worker.seconds_until_next_check(30) <= 10
+    assert worker.seconds_until_next_check(5) == 5
+    
+    # Overdue tasks held by another dispatcher are not waited for
+    save_task("hal", "overdue", datetime.now() - timedelta(minutes=1))
+    assert worker.seconds_until_next_check(30) == worker.MIN_WAIT_SECONDS
+    claim_due_tasks("other-worker", 60)
+    assert 8 < worker.seconds_until_next_check(30) <= 10
+
+
+def test_dispatcher_wakes_on_task_changes_from_web(test_db, monkeypatch):
+    """A task_changed event from another process triggers a delivery pass"""
+    sent = []
+    monkeypatch.setattr("scheduler.send_reminder", lambda user, text, task_id: sent.append(task_id) or True)
+    
+    async def scenario():
+        dispatcher = worker.Dispatcher(interval=60)
+        runner = asyncio.create_task(dispatcher.run())
+        while dispatcher.passes < 1:
+            await asyncio.sleep(0.01)
+        
+        # Saved by a web process, which publishes the change on the bus
+        task_id = save_task("ivan", "call back", datetime.now() - timedelta(seconds=1))
+        get_event_bus().publish({"type": "task_changed", "op": "created", "user": "ivan",
+                                 "task_id": task_id, "seq": 1, "origin": "web-process"})
+        for _ in range(200):
+            if sent:
+                break
+            await asyncio.sleep(0.01)
+        
+        dispatcher.stop()
+        await asyncio.wait_for(runner, 5)
+        return task_id
+    
+    task_id = asyncio.run(scenario())
+    assert sent == [task_id]
+    assert get_all_tasks(user="ivan")[0]["sent"] == 1
@@ -0,0 +1,19 @@
+"""
+Access to the admin endpoints (/admin/...).
+
+Admin endpoints are off unless ADMIN_TOKEN is set; requests then have to
+carry it in the X-Admin-Token header.
+"""
+import hmac
+import os
+from typing import Optional
+
+# Shared secret for the admin endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Whether `token` (the X-Admin-Token header value) grants admin access."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
@@ -0,0 +1,153 @@
+"""
+Admission control for the webhook endpoints.
+
+Parsing and saving a message is CPU- and I/O-heavy, so accepting every
+request of a burst only makes all of them slow until Telex times out and
+retries. Each endpoint gets an `AdmissionController` that bounds the work
+in flight, the number of requests waiting for a slot, and how much of
+both a single sender may use. A request that cannot be admitted, or that
+waited longer than the queue deadline (its answer would arrive too late to
+matter), is shed with `Overloaded`, which the API turns into a 429 with a
+Retry-After estimate.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+from utils.logger import log
+
+# Requests processed concurrently per endpoint
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+# Requests waiting for a slot per endpoint
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+# Requests in flight or waiting per sender and endpoint
+ADMISSION_PER_SENDER = int(os.getenv("ADMISSION_PER_SENDER", "4"))
+# Seconds a request may wait for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+SHED_REASONS = ("queue_full", "sender_limit", "deadline")
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries a Retry-After hint in seconds."""
+
+    def __init__(self, endpoint: str, reason: str, retry_after: int):
+        super().__init__(f"{endpoint} overloaded ({reason}), retry in {retry_after}s")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+                 max_queue: int = ADMISSION_MAX_QUEUE, per_sender: int = ADMISSION_PER_SENDER,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.per_sender = per_sender
+        self.queue_timeout = queue_timeout
+        # Requests waiting for a slot, oldest first; a released slot is
+        # handed to the next waiter directly
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._senders: Dict[str, int] = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {reason: 0 for reason in SHED_REASONS}
+        # Moving average of the time a request holds a slot
+        self.avg_service_seconds = 0.5
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is likely drained."""
+        backlog = (self.queued + self.in_flight) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(backlog * self.avg_service_seconds))
+
+    def _shed(self, reason: str) -> Overloaded:
+        self.shed[reason] += 1
+        retry_after = self.retry_after()
+        log(f"Shedding {self.name} request ({reason}), retry in {retry_after}s", "warning")
+        return Overloaded(self.name, reason, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, sender: str) -> AsyncIterator[None]:
+        """
+        Hold a processing slot for one request.
+
+        Raises:
+            Overloaded: If the request is shed instead
+        """
+        if self._senders.get(sender, 0) >= self.per_sender:
+            raise self._shed("sender_limit")
+        full = self.in_flight >= self.max_in_flight
+        if full and self.queued >= self.max_queue:
+            raise self._shed("queue_full")
+
+        self._senders[sender] = self._senders.get(sender, 0) + 1
+        try:
+            if full:
+                await self._wait_for_slot()
+            else:
+                self.in_flight += 1
+
+            self.admitted += 1
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                self._release()
+                elapsed = time.monotonic() - started
+                self.avg_service_seconds += 0.1 * (elapsed - self.avg_service_seconds)
+        finally:
+            remaining = self._senders[sender] - 1
+            if remaining:
+                self._senders[sender] = remaining
+            else:
+                del self._senders[sender]
+
+    async def _wait_for_slot(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self._release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("deadline") from None
+            raise
+        finally:
+            self.queued -= 1
+
+    def _release(self) -> None:
+        """Hand the slot to the oldest waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "per_sender": self.per_sender,
+            "queue_timeout_seconds": self.queue_timeout,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "avg_service_seconds": self.avg_service_seconds,
+        }
@@ -0,0 +1,147 @@
+"""
+In-memory store for the HTML pages served by the API.
+
+Pages are read once at startup and compressed ahead of time (gzip, and
+brotli when the optional `brotli` package is installed), so a request only
+picks the right pre-built body. Each asset carries a content hash used as
+its ETag and as the `?v=` version in links: versioned URLs are cached for
+a year, plain URLs are revalidated (cheaply, via 304) on every use.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from utils.logger import log
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+# Cache-Control for URLs carrying the asset's content hash
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Cache-Control for plain URLs: keep a copy but check the ETag first
+REVALIDATE_CACHE = "public, no-cache"
+
+
+class StaticAsset:
+    """One page, with its precompressed variants and content hash."""
+
+    __slots__ = ("name", "media_type", "body", "encoded", "hash", "etag")
+
+    def __init__(self, name: str, body: bytes, media_type: Optional[str] = None):
+        self.name = name
+        self.media_type = media_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.body = body
+        self.hash = hashlib.sha256(body).hexdigest()[:12]
+        self.etag = f'"{self.hash}"'
+        self.encoded: Dict[str, bytes] = {}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.encoded["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.encoded["br"] = compressed
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """
+        Pick the best precompressed variant the client accepts.
+
+        Args:
+            accept_encoding: Value of the Accept-Encoding request header
+
+        Returns:
+            "br", "gzip", or None for the uncompressed body
+        """
+        accepted = set()
+        for part in accept_encoding.lower().split(","):
+            coding, _, params = part.strip().partition(";")
+            if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip())
+        for coding in ("br", "gzip"):
+            if coding in self.encoded and (coding in accepted or "*" in accepted):
+                return coding
+        return None
+
+
+class AssetStore:
+    """Named assets, loaded once and served with cache validators."""
+
+    def __init__(self):
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def add(self, name: str, content, media_type: Optional[str] = None) -> StaticAsset:
+        """Register an asset from a string or bytes."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        asset = StaticAsset(name, content, media_type)
+        self.assets[name] = asset
+        return asset
+
+    def load_directory(self, directory: str) -> int:
+        """
+        Load every file of a directory (non-recursive).
+
+        Returns:
+            Number of assets loaded
+        """
+        count = 0
+        if not os.path.isdir(directory):
+            return count
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    self.add(name, f.read())
+                count += 1
+        log(f"Loaded {count} static assets from {directory}", "info")
+        return count
+
+    def get(self, name: str) -> Optional[StaticAsset]:
+        return self.assets.get(name)
+
+    def url(self, name: str, prefix: str = "/static/") -> str:
+        """Versioned URL for an asset, safe to cache forever."""
+        asset = self.assets.get(name)
+        if asset is None:
+            return prefix + name
+        return f"{prefix}{name}?v={asset.hash}"
+
+    def response(self, request: Request, name: str) -> Optional[Response]:
+        """
+        Build the response for an asset, honouring If-None-Match.
+
+        Returns:
+            The response, or None if no such asset exists
+        """
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        versioned = request.query_params.get("v") == asset.hash
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": IMMUTABLE_CACHE if versioned else REVALIDATE_CACHE,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if asset.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        coding = asset.negotiate(request.headers.get("accept-encoding", ""))
+        if coding is None:
+            body = asset.body
+        else:
+            body = asset.encoded[coding]
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+assets = AssetStore()
@@ -0,0 +1,183 @@
+"""
+WebSocket connection registry with per-socket outbound queues.
+
+Connections are indexed by user (a user may have several sockets open) and
+by socket, so connect and disconnect are O(1). Sending never awaits the
+network directly: messages are put on a bounded per-socket queue that a
+dedicated writer task drains. A client that stops reading fills its queue
+and is evicted instead of stalling delivery to everyone else.
+"""
+import asyncio
+import json
+import os
+import random
+from typing import Dict, Optional
+
+from fastapi import WebSocket
+
+from utils.logger import log
+
+# Messages buffered per socket before the client is considered too slow
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+
+# Close code sent to evicted slow consumers ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Close code sent when the server shuts down ("Service Restart")
+RESTART_CLOSE_CODE = 1012
+
+
+class Client:
+    """One connected socket, its owner and its outbound queue."""
+
+    __slots__ = ("websocket", "user_id", "queue", "writer")
+
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+
+
+class ConnectionManager:
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.users: Dict[str, Dict[WebSocket, Client]] = {}
+        self.clients: Dict[WebSocket, Client] = {}
+        self.evicted = 0
+
+    @property
+    def active_connections(self) -> int:
+        return len(self.clients)
+
+    async def connect(self, websocket: WebSocket, user_id: str):
+        await websocket.accept()
+        self.register(websocket, user_id)
+        log(f"WebSocket connected. Total connections: {len(self.clients)}", "info")
+
+    def register(self, websocket: WebSocket, user_id: str) -> Client:
+        """Add an already-accepted socket and start its writer task."""
+        client = Client(websocket, user_id, self.queue_size)
+        client.writer = asyncio.create_task(self._writer(client))
+        self.clients[websocket] = client
+        self.users.setdefault(user_id, {})[websocket] = client
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        """Remove a socket. Safe to call more than once."""
+        client = self._remove(websocket)
+        if client is not None:
+            log(f"WebSocket disconnected. Total connections: {len(self.clients)}", "info")
+
+    def _remove(self, websocket: WebSocket) -> Optional[Client]:
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return None
+
+        user_clients = self.users.get(client.user_id)
+        if user_clients is not None:
+            user_clients.pop(websocket, None)
+            if not user_clients:
+                del self.users[client.user_id]
+
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        return client
+
+    def _enqueue(self, client: Client, message: str) -> bool:
+        """Queue a message for one client, evicting it if its queue is full."""
+        try:
+            client.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self._evict(client)
+            return False
+
+    def _evict(self, client: Client):
+        """Drop a slow consumer and close its socket in the background."""
+        if self._remove(client.websocket) is None:
+            return
+        self.evicted += 1
+        log(f"Evicted slow WebSocket consumer for user {client.user_id}", "warning")
+        asyncio.create_task(self._close(client.websocket, SLOW_CONSUMER_CLOSE_CODE))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int, reason: str = ""):
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    async def _writer(self, client: Client):
+        """Drain one client's queue onto its socket, in order."""
+        try:
+            while True:
+                message = await client.queue.get()
+                await client.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed: the socket is gone
+            self._remove(client.websocket)
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        client = self.clients.get(websocket)
+        if client is not None:
+            self._enqueue(client, message)
+
+    async def send_to_user(self, user_id: str, message: str) -> int:
+        """
+        Queue a message for every socket of one user.
+
+        Returns:
+            Number of sockets the message was queued for
+        """
+        user_clients = self.users.get(user_id)
+        if not user_clients:
+            return 0
+        return sum(self._enqueue(client, message) for client in list(user_clients.values()))
+
+    async def broadcast(self, message: str) -> int:
+        """
+        Queue a message for every connected socket.
+
+        Returns:
+            Number of sockets the message was queued for
+        """
+        return sum(self._enqueue(client, message) for client in list(self.clients.values()))
+
+    async def close_all(self, min_delay_ms: int, max_delay_ms: int, timeout: float = 2.0) -> int:
+        """
+        Close every socket for a shutdown.
+
+        Each client gets what is still queued for it, then a
+        `{"type": "reconnect", "retry_after_ms": ...}` message and a 1012
+        close carrying the same delay, drawn at random per client so they
+        don't all reconnect at once.
+
+        Args:
+            min_delay_ms: Shortest reconnect delay suggested
+            max_delay_ms: Longest reconnect delay suggested
+            timeout: Seconds to spend flushing and closing
+
+        Returns:
+            Number of sockets closed
+        """
+        clients = [self._remove(websocket) for websocket in list(self.clients)]
+
+        async def close(client: Client):
+            delay = random.randint(min_delay_ms, max_delay_ms)
+            try:
+                while not client.queue.empty():
+                    await client.websocket.send_text(client.queue.get_nowait())
+                await client.websocket.send_text(json.dumps({"type": "reconnect", "retry_after_ms": delay}))
+            except Exception:
+                pass
+            await self._close(client.websocket, RESTART_CLOSE_CODE, f"retry_after_ms={delay}")
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*(close(client) for client in clients)), timeout)
+        except asyncio.TimeoutError:
+            log(f"Timed out closing {len(clients)} WebSocket(s)", "warning")
+        if clients:
+            log(f"Closed {len(clients)} WebSocket(s) for shutdown", "info")
+        return len(clients)
@@ -0,0 +1,156 @@
+"""
+Reminder delivery lateness.
+
+The scheduler records, for every delivery attempt, when the task was due,
+when the scheduler picked it up (claimed it) and when the send finished.
+Records are buffered in memory and written to the `delivery_stats` table
+in batches (at the end of each scheduler run, or sooner if the buffer
+fills). `summarize` turns a time range of records into per-window
+lateness percentiles and throughput, served at GET /stats/deliveries.
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from db.database import get_delivery_stats, save_delivery_stats
+from utils.logger import log
+
+# Records buffered before a write is forced mid-run
+DELIVERY_STATS_BATCH = int(os.getenv("DELIVERY_STATS_BATCH", "100"))
+# Days of records kept in the database
+DELIVERY_STATS_RETENTION_DAYS = float(os.getenv("DELIVERY_STATS_RETENTION_DAYS", "7"))
+# Most windows a single summary may be split into
+MAX_WINDOWS = 1000
+
+
+def _timestamp(time_str: str) -> float:
+    """Epoch seconds of a stored task time (naive times are local)."""
+    return datetime.fromisoformat(time_str).timestamp()
+
+
+class DeliveryRecorder:
+    """Buffer of delivery records, flushed to the database in batches."""
+
+    def __init__(self, batch_size: int = DELIVERY_STATS_BATCH,
+                 retention_days: float = DELIVERY_STATS_RETENTION_DAYS):
+        self.batch_size = batch_size
+        self.retention_seconds = retention_days * 86400
+        self._buffer: List[Tuple[int, float, float, float, bool]] = []
+        self._lock = threading.Lock()
+
+    def record(self, task_id: int, due_time: str, claimed_at: float,
+               sent_at: float, ok: bool) -> None:
+        """
+        Buffer one delivery attempt.
+
+        Args:
+            task_id: Task that was delivered
+            due_time: The task's stored due time (ISO format)
+            claimed_at: When the scheduler picked the task up (epoch seconds)
+            sent_at: When the send finished (epoch seconds)
+            ok: Whether the send succeeded
+        """
+        try:
+            due_at = _timestamp(due_time)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._buffer.append((task_id, due_at, claimed_at, sent_at, ok))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write buffered records and prune expired ones.
+
+        Returns:
+            Number of records written
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            return save_delivery_stats(rows, prune_before=time.time() - self.retention_seconds)
+        except Exception as e:
+            log(f"Failed to save {len(rows)} delivery stats: {e}", "error")
+            return 0
+
+
+def _percentile(sorted_values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _summarize_rows(rows: Sequence[Tuple], seconds: float) -> Dict[str, object]:
+    lateness = sorted(sent - due for due, claimed, sent, ok in rows if ok)
+    claim_delay = sorted(claimed - due for due, claimed, sent, ok in rows if ok)
+    sent = len(lateness)
+    return {
+        "sent": sent,
+        "failed": len(rows) - sent,
+        "throughput_per_minute": sent / seconds * 60 if seconds > 0 else 0.0,
+        "lateness_seconds": {
+            "p50": _percentile(lateness, 50),
+            "p95": _percentile(lateness, 95),
+            "p99": _percentile(lateness, 99),
+            "max": lateness[-1] if lateness else None,
+        },
+        # Part of the lateness spent waiting for a scheduler run
+        "claim_delay_seconds": {
+            "p50": _percentile(claim_delay, 50),
+            "p99": _percentile(claim_delay, 99),
+        },
+    }
+
+
+def summarize(hours: float = 24, window_seconds: int = 3600,
+              now: Optional[float] = None) -> Dict[str, object]:
+    """
+    Lateness percentiles and throughput over the last `hours`, per window.
+
+    Args:
+        hours: How far back to look
+        window_seconds: Width of each window
+        now: End of the range, epoch seconds (default: current time)
+
+    Returns:
+        Overall summary plus one summary per window, oldest first
+    """
+    if hours <= 0 or window_seconds <= 0:
+        raise ValueError("hours and window_seconds must be positive")
+    if hours * 3600 / window_seconds > MAX_WINDOWS:
+        raise ValueError(f"At most {MAX_WINDOWS} windows; use a wider window")
+    now = time.time() if now is None else now
+    since = now - hours * 3600
+    rows = get_delivery_stats(since, now)
+
+    windows = []
+    start = since
+    index = 0
+    while start < now:
+        end = min(start + window_seconds, now)
+        window_rows = []
+        while index < len(rows) and rows[index][2] < end:
+            window_rows.append(rows[index])
+            index += 1
+        summary = _summarize_rows(window_rows, end - start)
+        summary["start"] = datetime.fromtimestamp(start).isoformat()
+        summary["end"] = datetime.fromtimestamp(end).isoformat()
+        windows.append(summary)
+        start = end
+
+    overall = _summarize_rows(rows, now - since)
+    overall["hours"] = hours
+    overall["window_seconds"] = window_seconds
+    return {"overall": overall, "windows": windows}
+
+
+recorder = DeliveryRecorder()
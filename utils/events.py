@@ -0,0 +1,232 @@
+"""
+Pluggable pub/sub for real-time events (reminders, task changes).
+
+Every server process subscribes to the bus and delivers events to the
+sockets it holds itself, so an event produced in one worker reaches users
+connected to any other worker. Two backends are available, selected with
+the EVENT_BUS environment variable:
+
+- "local" (default): in-process only, for a single worker
+- "sqlite": a shared SQLite event log polled by every worker; needs no
+  external broker, only a file all workers can reach (EVENTS_DB)
+
+Events are plain JSON-serializable dicts with at least a "type" key, and
+a "user" key when they are meant for one user.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from utils.logger import log
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+EVENT_BUS = os.getenv("EVENT_BUS", "local").lower()
+EVENTS_DB = os.getenv(
+    "EVENTS_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "events.db")
+)
+# Identifies events published by this process (e.g. to skip own writes)
+PROCESS_ID = uuid.uuid4().hex[:12]
+
+# How often SQLite subscribers look for new events
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.1"))
+# How long events are kept in the SQLite log before being pruned
+EVENT_RETENTION_SECONDS = float(os.getenv("EVENT_RETENTION_SECONDS", "300"))
+
+
+class EventBus(ABC):
+    """Interface shared by all event bus backends."""
+
+    @abstractmethod
+    def publish(self, event: dict) -> None:
+        """Publish an event. Thread-safe and never raises."""
+
+    @abstractmethod
+    async def start(self, handler: EventHandler) -> None:
+        """Start delivering events to `handler` on the running event loop."""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Stop delivering events."""
+
+
+async def _call_handler(handler: EventHandler, event: dict) -> None:
+    try:
+        await handler(event)
+    except Exception as e:
+        log(f"Error handling {event.get('type')} event: {e}", "error")
+
+
+class LocalEventBus(EventBus):
+    """In-process bus; events only reach subscribers in this process."""
+
+    def __init__(self):
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, EventHandler]] = []
+        self._lock = threading.Lock()
+
+    def publish(self, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, handler in subscribers:
+            coro = _call_handler(handler, event)
+            try:
+                # Publishers may run in scheduler or thread-pool threads
+                loop.call_soon_threadsafe(loop.create_task, coro)
+            except RuntimeError:
+                # Loop already closed
+                coro.close()
+
+    async def start(self, handler: EventHandler) -> None:
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), handler))
+
+    async def stop(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers = [(l, h) for l, h in self._subscribers if l is not loop]
+
+
+class SQLiteEventBus(EventBus):
+    """
+    Cross-process bus backed by an append-only SQLite event log.
+
+    Publishers append rows; each subscribing process polls for rows newer
+    than the last one it delivered. Old rows are pruned periodically.
+    """
+
+    def __init__(self, path: str = EVENTS_DB, poll_interval: float = EVENT_POLL_INTERVAL,
+                 retention: float = EVENT_RETENTION_SECONDS):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._task: Optional[asyncio.Task] = None
+        self._published = 0
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def publish(self, event: dict) -> None:
+        try:
+            conn = self._connect()
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO events (payload, created_at) VALUES (?, ?)",
+                    (json.dumps(event), now)
+                )
+                self._published += 1
+                if self._published % 500 == 0:
+                    conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention,))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            log(f"Failed to publish {event.get('type')} event: {e}", "error")
+
+    async def start(self, handler: EventHandler) -> None:
+        if self._task is not None:
+            return
+        # Only deliver events published from now on
+        conn = self._connect()
+        try:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        finally:
+            conn.close()
+        self._task = asyncio.create_task(self._poll(last_id, handler))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _fetch(self, last_id: int) -> list:
+        # A connection per poll: the thread may outlive a cancelled poller
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT id, payload FROM events WHERE id > ? ORDER BY id LIMIT 1000",
+                (last_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    async def _poll(self, last_id: int, handler: EventHandler) -> None:
+        while True:
+            try:
+                rows = await asyncio.to_thread(self._fetch, last_id)
+            except sqlite3.Error as e:
+                log(f"Event log poll failed: {e}", "error")
+                rows = []
+
+            for event_id, payload in rows:
+                last_id = event_id
+                await _call_handler(handler, json.loads(payload))
+
+            if not rows:
+                await asyncio.sleep(self.poll_interval)
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus, creating it from EVENT_BUS on first use."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                if EVENT_BUS == "sqlite":
+                    _bus = SQLiteEventBus()
+                else:
+                    if EVENT_BUS != "local":
+                        log(f"Unknown EVENT_BUS '{EVENT_BUS}', using local", "warning")
+                    _bus = LocalEventBus()
+    return _bus
+
+
+def publish_event(event: dict) -> None:
+    """Publish an event on the process-wide bus."""
+    get_event_bus().publish(event)
+
+
+def publish_task_changes(changes: list) -> None:
+    """
+    Publish committed task changes as task_changed events.
+
+    Registered with `db.database.add_change_listener` so every write,
+    whichever code path makes it, reaches the user's open dashboards.
+    """
+    bus = get_event_bus()
+    for user, task_id, op, seq in changes:
+        bus.publish({
+            "type": "task_changed", "op": op, "user": user,
+            "task_id": task_id, "seq": seq, "origin": PROCESS_ID
+        })
@@ -0,0 +1,60 @@
+"""
+Streaming task export as NDJSON or CSV.
+
+Tasks are read chunk by chunk from a single database cursor and each chunk
+is encoded as soon as it arrives, so memory use does not grow with the
+number of tasks and consumers can start reading immediately.
+"""
+import csv
+import io
+import json
+from typing import Iterator, Optional
+
+from db.database import EXPORT_CHUNK_SIZE, iter_task_chunks
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_ndjson(user: Optional[str] = None, status: Optional[str] = None,
+                chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield NDJSON text, one string per chunk of tasks."""
+    for columns, rows in iter_task_chunks(user=user, status=status, chunk_size=chunk_size):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def iter_csv(user: Optional[str] = None, status: Optional[str] = None,
+             chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield CSV text with a header row, one string per chunk of tasks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    for columns, rows in iter_task_chunks(user=user, status=status, chunk_size=chunk_size):
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iter_export(export_format: str, user: Optional[str] = None,
+                status: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream tasks in the given format.
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if export_format == "ndjson":
+        return iter_ndjson(user=user, status=status)
+    if export_format == "csv":
+        return iter_csv(user=user, status=status)
+    raise ValueError(f"Unsupported export format: {export_format}. Use one of: {', '.join(EXPORT_FORMATS)}")
@@ -0,0 +1,145 @@
+"""
+Idempotent handling of webhook deliveries.
+
+Telex retries deliveries when we answer slowly. Each delivery gets a key,
+either from an `Idempotency-Key` header or a hash of sender, message and
+the payload's timestamp. Responses are remembered per key in a bounded TTL
+store, so a retry is answered from memory; a retry that arrives while the
+original is still being processed waits for it instead of starting over.
+Across processes and restarts, the `idempotency_keys` table (see
+`db.database.save_task`) keeps a task from being inserted twice; the
+scheduler prunes its rows once they are older than the TTL.
+
+Payloads with neither a header nor a timestamp get no key: without one a
+retry cannot be told apart from the user sending the same text again.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from db.database import prune_idempotency_keys
+
+# How long responses are remembered, in seconds
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+# Responses remembered at most (oldest dropped first)
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+KEY_HEADERS = ("idempotency-key", "x-idempotency-key")
+TIMESTAMP_FIELDS = ("timestamp", "created_at", "sent_at")
+
+
+def idempotency_key(namespace: str, headers, payload: dict, user: str, message: str) -> Optional[str]:
+    """
+    Derive the idempotency key of a delivery.
+
+    Args:
+        namespace: Endpoint name, so each endpoint replays its own responses
+        headers: Request headers
+        payload: Parsed JSON body
+        user: Sender of the message
+        message: Message text
+
+    Returns:
+        The key, or None if the delivery cannot be identified
+    """
+    for header in KEY_HEADERS:
+        value = headers.get(header)
+        if value:
+            return f"{namespace}:h:{value}"
+
+    timestamp = next((payload[f] for f in TIMESTAMP_FIELDS if payload.get(f)), None)
+    if timestamp is None:
+        return None
+    digest = hashlib.sha256(f"{user}\0{message}\0{timestamp}".encode("utf-8")).hexdigest()
+    return f"{namespace}:c:{digest}"
+
+
+class IdempotencyStore:
+    """Bounded TTL map of key -> response, with in-flight deduplication."""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._responses: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.replays = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._responses[key]
+            return None
+        return response
+
+    def put(self, key: str, response: dict) -> None:
+        self._responses[key] = (time.monotonic(), response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_keys:
+            self._responses.popitem(last=False)
+
+    async def run(self, key: str, handler: Callable[[], Awaitable[dict]],
+                  cacheable: Callable[[dict], bool] = lambda response: True) -> Tuple[dict, bool]:
+        """
+        Answer a delivery once per key.
+
+        Args:
+            key: Idempotency key of the delivery
+            handler: Produces the response for a first delivery
+            cacheable: Whether a response may be replayed (e.g. not errors)
+
+        Returns:
+            (response, replayed) where replayed is True for a retry
+        """
+        response = self.get(key)
+        if response is not None:
+            self.replays += 1
+            return response, True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.replays += 1
+            return await asyncio.shield(in_flight), True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await handler()
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            if cacheable(response):
+                self.put(key, response)
+            return response, False
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "keys": len(self._responses),
+            "max_keys": self.max_keys,
+            "in_flight": len(self._in_flight),
+            "replays": self.replays,
+            "misses": self.misses,
+        }
+
+
+def prune_expired_keys(now: Optional[datetime] = None) -> int:
+    """Delete stored idempotency keys older than IDEMPOTENCY_TTL_SECONDS."""
+    now = now or datetime.now()
+    return prune_idempotency_keys(now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS))
+
+
+idempotency_store = IdempotencyStore()
@@ -1,34 +1,57 @@
+"""
+Application logging.
+
+`log()` never touches the disk or the console on the calling thread: records
+go through a bounded queue to a background listener thread that writes them
+to a size-rotated log file and the console. Messages may use %-style
+arguments (`log("Got %s", "debug", payload)`), which are only formatted if
+the level is enabled. Set LOG_FORMAT=json for one JSON object per line.
+"""
+import atexit
+import copy
+import json
 import logging
-from datetime import datetime
+import logging.handlers
+import os
+import queue
 from pathlib import Path
 import sys
 
 # Create logs directory if it doesn't exist
 log_dir = Path(__file__).parent.parent / "logs"
-log_dir.mkdir(exist_ok=True)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = Path(os.getenv("LOG_FILE", str(log_dir / "app.log")))
+# "text" or "json"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Rotate the log file at this size, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 # Check if running on Windows with limited encoding
 WINDOWS_ENCODING_FIX = sys.platform == 'win32' and sys.stdout.encoding.lower() in ['cp1252', 'windows-1252']
 
-# Configure logging with UTF-8 encoding for Windows compatibility
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.FileHandler(log_dir / 'app.log', encoding='utf-8'),  # Log to file with UTF-8
-        logging.StreamHandler()                                       # Console logging
-    ]
-)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-logger = logging.getLogger(__name__)
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
 
 
 def _clean_emoji(message: str) -> str:
     """Remove or replace emojis for Windows console compatibility."""
     if not WINDOWS_ENCODING_FIX:
         return message
-    
+
     # Replace common emojis with ASCII equivalents
     replacements = {
         '✅': '[OK]',
@@ -40,38 +63,131 @@ def _clean_emoji(message: str) -> str:
         '💾': '[SAVE]',
         '🚀': '[LAUNCH]',
     }
-    
+
     for emoji, replacement in replacements.items():
         message = message.replace(emoji, replacement)
-    
+
     return message
 
 
-def log(message: str, level: str = "info") -> None:
+class ConsoleFormatter(logging.Formatter):
+    """Text formatter that also makes emojis safe for legacy Windows consoles."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return _clean_emoji(super().format(record))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the message arguments, leaving the rest to the listener.
+
+        The stock prepare() formats the whole record on the calling thread
+        and drops exc_info, so the listener's formatters (the JSON one's
+        "exc" field) never saw the traceback. Arguments are still merged
+        here, as they may change once log() returns.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is at the time of the write."""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def _build_handlers():
+    """File and console handlers, run on the listener thread."""
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    console_handler = ConsoleHandler()
+    if LOG_FORMAT == "json":
+        file_handler.setFormatter(JsonFormatter())
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+        console_handler.setFormatter(ConsoleFormatter(TEXT_FORMAT, DATE_FORMAT))
+    return file_handler, console_handler
+
+
+# Records (and their tracebacks) are formatted on the listener thread, by its handlers
+queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+listener = logging.handlers.QueueListener(
+    queue_handler.queue, *_build_handlers(), respect_handler_level=True
+)
+
+# Every logger (ours, uvicorn's, apscheduler's) writes through the queue
+root_logger = logging.getLogger()
+root_logger.setLevel(LEVELS.get(LOG_LEVEL.lower(), logging.INFO))
+root_logger.addHandler(queue_handler)
+listener.start()
+# Flush what is still queued when the process exits
+atexit.register(listener.stop)
+
+logger = logging.getLogger(__name__)
+
+
+def log(message: str, level: str = "info", *args, exc_info: bool = False) -> None:
     """
     Simple logging function with multiple log levels.
-    
+
+    Returns immediately: formatting of `args` is skipped if the level is
+    disabled, and writing happens on a background thread.
+
     Args:
-        message: The message to log
+        message: The message to log, optionally with %-style placeholders
         level: Log level - "info", "warning", "error", "debug" (default: "info")
-    
+        *args: Values for the placeholders in `message`
+        exc_info: Attach the exception being handled
+
     Examples:
         log("Server started")
         log("Missing required field", "warning")
         log("Database connection failed", "error")
+        log("Payload received: %s", "debug", payload)
     """
-    # Clean emojis for Windows console if needed
-    clean_message = _clean_emoji(message)
-    
-    level = level.lower()
-    
-    if level == "info":
-        logger.info(clean_message)
-    elif level == "warning":
-        logger.warning(clean_message)
-    elif level == "error":
-        logger.error(clean_message)
-    elif level == "debug":
-        logger.debug(clean_message)
-    else:
-        logger.info(clean_message)  # Default to info
+    levelno = LEVELS.get(level.lower(), logging.INFO)  # Default to info
+    if logger.isEnabledFor(levelno):
+        logger.log(levelno, message, *args, exc_info=exc_info)
@@ -1,15 +1,163 @@
 import re
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-import dateparser
-from dateparser.search import search_dates
+from utils.metrics import NLP_PARSE_SECONDS
+from utils.tracing import span, traced
 
+# Settings applied to every parse; relative expressions prefer the future
+BASE_SETTINGS = {"PREFER_DATES_FROM": "future"}
 
-def extract_task_and_time(text: str) -> Dict[str, Any]:
+
+@lru_cache(maxsize=None)
+def _dateparser() -> SimpleNamespace:
+    """
+    The parts of dateparser used here, imported on first use.
+
+    Importing dateparser takes about half a second, which every process
+    importing the API (tests, tools, forked workers) would otherwise pay
+    whether it parses anything or not.
+    """
+    from dateparser.conf import settings
+    from dateparser.data.languages_info import language_order
+    from dateparser.parser import date_order_chart
+    from dateparser.search import search_dates
+
+    return SimpleNamespace(
+        default_settings=settings,
+        search_dates=search_dates,
+        languages=frozenset(language_order),
+        date_orders=frozenset(date_order_chart),
+    )
+
+
+def warm_up() -> None:
+    """Load dateparser and its English data ahead of the first message."""
+    extract_task_and_time("remind me tomorrow at 5pm to warm up")
+
+
+class ParseContext:
+    """
+    Prebuilt dateparser configuration for one user.
+
+    Building dateparser settings and detecting the message language are a
+    large share of each parse, so a context is built once per user profile
+    and reused for every message from that user.
+    """
+
+    __slots__ = ("timezone", "languages", "date_order", "_settings")
+
+    def __init__(self, timezone: Optional[str] = None,
+                 languages: Optional[List[str]] = None,
+                 date_order: Optional[str] = None):
+        """
+        Args:
+            timezone: IANA timezone the user writes times in (default: server local)
+            languages: Language codes to parse with; skips language detection (optional)
+            date_order: Order for ambiguous numeric dates, e.g. "DMY" (optional)
+
+        Raises:
+            ValueError: If any of the values is not supported
+        """
+        if timezone:
+            try:
+                ZoneInfo(timezone)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timezone: {timezone}")
+        if languages:
+            unknown = [lang for lang in languages if lang not in _dateparser().languages]
+            if unknown:
+                raise ValueError(f"Unsupported language(s): {', '.join(unknown)}")
+        if date_order and date_order not in _dateparser().date_orders:
+            raise ValueError(f"Unsupported date order: {date_order}")
+
+        self.timezone = timezone or None
+        self.languages = list(languages) if languages else None
+        self.date_order = date_order or None
+        self._settings = None
+
+    @property
+    def settings(self):
+        """dateparser settings for this context, built on first use."""
+        if self._settings is None:
+            mod_settings = dict(BASE_SETTINGS)
+            if self.timezone:
+                mod_settings["TIMEZONE"] = self.timezone
+                mod_settings["RETURN_AS_TIMEZONE_AWARE"] = True
+            if self.date_order:
+                mod_settings["DATE_ORDER"] = self.date_order
+            self._settings = _dateparser().default_settings.replace(mod_settings=mod_settings, **mod_settings)
+        return self._settings
+
+    def settings_for(self, relative_base: Optional[datetime] = None):
+        """Settings for one parse, pinning "now" when `relative_base` is given."""
+        if relative_base is None:
+            return self.settings
+        return self.settings.replace(RELATIVE_BASE=relative_base)
+
+    def to_local(self, time: Optional[datetime]) -> Optional[datetime]:
+        """Convert a parsed time to naive server-local time, as tasks are stored."""
+        if time is None or time.tzinfo is None:
+            return time
+        return time.astimezone().replace(tzinfo=None)
+
+
+# Common reminder words/phrases, matched as whole words to avoid substring damage
+_KEYWORD_PATTERN = r"\b(?:remind me to|remind me|to|at|in|on|tomorrow|today)\b"
+_KEYWORD_RE = re.compile(_KEYWORD_PATTERN, re.IGNORECASE)
+
+# Runs of whitespace and separator punctuation collapse to a single space
+_SEPARATOR_RE = re.compile(r"[\s,:;\-]+")
+
+
+def _clean_task(text: str, matched_texts: List[str]) -> str:
+    """
+    Strip matched date phrases and reminder keywords from `text`.
+
+    Date phrases and keywords are combined into a single alternation so the
+    text is scanned once and the matched spans are cut out by offset, instead
+    of one `re.sub` pass (and string copy) per phrase and keyword.
+    """
+    if matched_texts:
+        # Longest phrases first so a phrase wins over any phrase it contains
+        phrases = sorted(set(matched_texts), key=len, reverse=True)
+        pattern = re.compile(
+            "|".join(map(re.escape, phrases)) + "|" + _KEYWORD_PATTERN,
+            re.IGNORECASE
+        )
+    else:
+        pattern = _KEYWORD_RE
+
+    pieces = []
+    last = 0
+    for match in pattern.finditer(text):
+        pieces.append(text[last:match.start()])
+        last = match.end()
+    pieces.append(text[last:])
+
+    # Collapse whitespace and strip surrounding punctuation
+    cleaned = _SEPARATOR_RE.sub(" ", "".join(pieces))
+    cleaned = cleaned.strip(" -:;,.!? \n\r\t")
+
+    return cleaned.lower()
+
+
+@NLP_PARSE_SECONDS.time()
+@traced("nlp.extract_task_and_time")
+def extract_task_and_time(text: str, relative_base: Optional[datetime] = None,
+                          context: Optional[ParseContext] = None) -> Dict[str, Any]:
     """
     Extract a task description and a datetime from `text`.
 
+    `relative_base` pins "now" for relative expressions like 'in 2 hours'
+    (defaults to the current time); benchmarks and tests use it to freeze the clock.
+    `context` carries the sender's prebuilt parse configuration (timezone,
+    languages, date order); without it the text is parsed in server-local
+    time with language detection.
+
     Returns a dict with keys:
       - "task": cleaned task string (lowercased)
       - "time": a `datetime.datetime` object parsed from the text, or `None` if not found
@@ -23,36 +171,23 @@ def extract_task_and_time(text: str) -> Dict[str, Any]:
 
     # Find date/time expressions in the text (case-insensitive)
     # Prefer future dates for relative expressions like 'tomorrow'
-    results = search_dates(text, settings={"PREFER_DATES_FROM": "future"})
+    if context is not None:
+        languages, settings = context.languages, context.settings_for(relative_base)
+    else:
+        languages, settings = None, dict(BASE_SETTINGS)
+        if relative_base is not None:
+            settings["RELATIVE_BASE"] = relative_base
+    with span("nlp.search_dates"):
+        results = _dateparser().search_dates(text, languages=languages, settings=settings)
     time: Optional[datetime] = None
     matched_texts = []
     if results:
         # search_dates returns a list of (matched_text, datetime)
         matched_texts = [m[0] for m in results if m and m[0]]
         time = results[0][1]
+        if context is not None:
+            time = context.to_local(time)
 
-    cleaned = text
-
-    # Remove the matched date phrases (safe, case-insensitive)
-    for mt in matched_texts:
-        try:
-            cleaned = re.sub(re.escape(mt), "", cleaned, flags=re.IGNORECASE)
-        except re.error:
-            # fallback: simple replace
-            cleaned = cleaned.replace(mt, "")
-
-    # Remove common reminder words/phrases while avoiding substring damage
-    keyword_patterns = [r"\bremind me to\b", r"\bremind me\b", r"\bto\b",
-                        r"\bat\b", r"\bin\b", r"\bon\b",
-                        r"\btomorrow\b", r"\btoday\b"]
-    for pat in keyword_patterns:
-        cleaned = re.sub(pat, "", cleaned, flags=re.IGNORECASE)
-
-    # Collapse whitespace and strip surrounding punctuation
-    cleaned = re.sub(r"[,:;\-]+", " ", cleaned)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    cleaned = cleaned.strip(" -:;,.!? \n\r\t")
-
-    task = cleaned.lower()
+    task = _clean_task(text, matched_texts)
 
     return {"task": task, "time": time}
@@ -0,0 +1,228 @@
+"""
+On-demand sampling profiler.
+
+`SamplingProfiler` runs a thread that every few milliseconds reads the
+stack of every other thread (`sys._current_frames()`) and counts each
+distinct stack. The result is in the collapsed format understood by
+flamegraph.pl, speedscope and inferno: one `thread;outer;...;inner count`
+line per stack. Nothing is installed in the profiled code, so the running
+app is never slowed down by hooks, and nothing at all runs while no
+profile is being taken.
+
+Two modes are served by the API: a time-bounded profile of the whole
+process (event loop, scheduler and threadpool threads), and a profile of a
+single webhook request, asked for with the X-Profile header and kept for
+retrieval by the ID returned in X-Profile-Id.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional, Set
+
+from utils.admin import is_admin
+from utils.logger import log
+
+# Milliseconds between samples of a whole-process profile
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Milliseconds between samples of a single-request profile
+PROFILE_REQUEST_INTERVAL_MS = float(os.getenv("PROFILE_REQUEST_INTERVAL_MS", "1"))
+# Longest whole-process profile that may be requested
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+# Single-request profiles kept for retrieval
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# Innermost frames of a thread that is waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(_repo_root):
+        return filename[len(_repo_root):]
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS,
+                 threads: Optional[Set[int]] = None, include_idle: bool = False):
+        """
+        Args:
+            interval_ms: Time between samples
+            threads: Thread idents to sample (default: every thread but the sampler)
+            include_idle: Keep samples of threads that are blocked waiting
+        """
+        self.interval = interval_ms / 1000
+        self.threads = threads
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started: Optional[float] = None
+        self.duration = 0.0
+        self._labels: Dict[object, str] = {}
+        self._names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = (
+                f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            )
+        return label
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _sample(self, own: int) -> None:
+        self.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.threads is not None and ident not in self.threads):
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(self._thread_name(ident))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Counted stacks in the collapsed (folded) flamegraph format."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+_lock = threading.Lock()
+
+
+def acquire() -> bool:
+    """Reserve the profiler; only one profile runs at a time."""
+    return _lock.acquire(blocking=False)
+
+
+def release() -> None:
+    _lock.release()
+
+
+# Profile of the request being handled, if it asked for one
+_request_profile: ContextVar[Optional[SamplingProfiler]] = ContextVar("request_profile", default=None)
+_request_profiles: "OrderedDict[str, SamplingProfiler]" = OrderedDict()
+
+
+def follow(fn):
+    """Let the current request's profile, if any, sample the thread running `fn`."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _request_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        ident = threading.get_ident()
+        profile.threads.add(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.threads.discard(ident)
+    return wrapper
+
+
+def get_request_profile(profile_id: str) -> Optional[SamplingProfiler]:
+    return _request_profiles.get(profile_id)
+
+
+class RequestProfileMiddleware:
+    """
+    ASGI middleware profiling single requests to `paths` on demand.
+
+    A request carrying `X-Profile: 1` and a valid X-Admin-Token is sampled
+    on the event loop thread and on any thread running a `follow`-wrapped
+    function for it; the response carries X-Profile-Id.
+    """
+
+    def __init__(self, app, paths=()):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", ()))
+        if b"x-profile" not in headers or not is_admin(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+        if not acquire():
+            log("Profile requested while another one is running; skipping", "warning")
+            await self.app(scope, receive, send)
+            return
+
+        profile = SamplingProfiler(PROFILE_REQUEST_INTERVAL_MS, threads={threading.get_ident()})
+        profile_id = os.urandom(8).hex()
+        token = _request_profile.set(profile)
+        profile.start()
+
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            profile.stop()
+            release()
+            _request_profiles[profile_id] = profile
+            while len(_request_profiles) > PROFILE_KEEP:
+                _request_profiles.popitem(last=False)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # The handler has returned by the time its response starts
+                finish()
+                message = {**message, "headers": [
+                    *message.get("headers", ()), (b"x-profile-id", profile_id.encode())
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _request_profile.reset(token)
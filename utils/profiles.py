@@ -0,0 +1,130 @@
+"""
+Per-user parse context cache.
+
+Each user's profile (timezone, preferred languages, date order) is loaded
+from the database once and turned into a prebuilt `ParseContext` that is
+reused for all of that user's messages. Updating a profile through
+`update_user_profile` invalidates the cached entry.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from db import database
+from utils.logger import log
+from utils.nlp import ParseContext
+
+# Maximum number of users whose parse context is kept in memory
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+
+# Shared context for users without a profile
+DEFAULT_CONTEXT = ParseContext()
+
+
+class ParseContextCache:
+    """Thread-safe LRU cache of `ParseContext` objects keyed by user."""
+
+    def __init__(self, max_size: int = PROFILE_CACHE_SIZE):
+        self.max_size = max_size
+        self._contexts: "OrderedDict[str, ParseContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on invalidation so a load racing an update is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user: str) -> ParseContext:
+        """Return the user's parse context, loading the profile on a miss."""
+        with self._lock:
+            context = self._contexts.get(user)
+            if context is not None:
+                self._contexts.move_to_end(user)
+                self.hits += 1
+                return context
+            self.misses += 1
+            generation = self._generation
+
+        context = _load_context(user)
+
+        with self._lock:
+            if generation != self._generation:
+                return context
+            self._contexts[user] = context
+            self._contexts.move_to_end(user)
+            while len(self._contexts) > self.max_size:
+                self._contexts.popitem(last=False)
+        return context
+
+    def invalidate(self, user: str) -> None:
+        """Drop a user's cached context so the next message reloads it."""
+        with self._lock:
+            self._contexts.pop(user, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._contexts.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._contexts),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _load_context(user: str) -> ParseContext:
+    """Build a parse context from the stored profile, falling back to defaults."""
+    try:
+        profile = database.get_user_profile(user)
+    except Exception as e:
+        log(f"Could not load profile for {user}: {e}", "warning")
+        return DEFAULT_CONTEXT
+
+    if not profile:
+        return DEFAULT_CONTEXT
+
+    try:
+        return ParseContext(
+            timezone=profile["timezone"],
+            languages=profile["languages"],
+            date_order=profile["date_order"],
+        )
+    except ValueError as e:
+        log(f"Ignoring invalid profile for {user}: {e}", "warning")
+        return DEFAULT_CONTEXT
+
+
+cache = ParseContextCache()
+
+
+def get_parse_context(user: str) -> ParseContext:
+    """Get the cached parse context for `user`."""
+    return cache.get(user)
+
+
+def update_user_profile(user: str, timezone: Optional[str] = None,
+                        languages: Optional[List[str]] = None,
+                        date_order: Optional[str] = None) -> ParseContext:
+    """
+    Validate and store a user's profile, then invalidate their cached context.
+
+    Returns:
+        The new parse context
+
+    Raises:
+        ValueError: If the profile values are invalid
+        sqlite3.Error: If database operation fails
+    """
+    context = ParseContext(timezone=timezone, languages=languages, date_order=date_order)
+    database.save_user_profile(user, timezone=context.timezone,
+                               languages=context.languages,
+                               date_order=context.date_order)
+    cache.invalidate(user)
+    return context
@@ -0,0 +1,86 @@
+"""
+Pluggable JSON serializer for API responses and WebSocket frames.
+
+orjson is used when installed (several times faster than the stdlib on task
+listings and serializes the task dicts as they are, without FastAPI's
+`jsonable_encoder` copy); otherwise, or with JSON_SERIALIZER=json, the
+stdlib encoder is used. Both produce compact UTF-8 JSON.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Callable, Dict
+
+from fastapi.responses import JSONResponse
+
+from utils.logger import log
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # e.g. integers beyond 64 bits echoed back from a client
+        return _json_dumps(obj)
+
+
+SERIALIZERS: Dict[str, Callable[[Any], bytes]] = {"json": _json_dumps}
+if orjson is not None:
+    SERIALIZERS["orjson"] = _orjson_dumps
+
+JSON_SERIALIZER = os.getenv("JSON_SERIALIZER", "orjson" if orjson is not None else "json").lower()
+
+_dumps: Callable[[Any], bytes] = _json_dumps
+
+
+def set_serializer(name: str) -> str:
+    """
+    Select the serializer used by `dumps`.
+
+    Args:
+        name: A key of SERIALIZERS ("orjson" or "json")
+
+    Returns:
+        The name actually in use (falls back to "json" if unavailable)
+    """
+    global _dumps
+    if name not in SERIALIZERS:
+        log(f"JSON serializer '{name}' unavailable, using json", "warning")
+        name = "json"
+    _dumps = SERIALIZERS[name]
+    return name
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    return _dumps(obj)
+
+
+def dumps_text(obj: Any) -> str:
+    """Serialize to a JSON string, e.g. for a WebSocket text frame."""
+    return _dumps(obj).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the selected serializer."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+set_serializer(JSON_SERIALIZER)
@@ -0,0 +1,201 @@
+"""
+Server-Sent Events streams for one-way real-time updates.
+
+An alternative to the WebSocket for clients that only listen: reminders
+and task-change events are delivered as `text/event-stream`. Events are
+kept in a small per-user replay buffer, so a client reconnecting with
+`Last-Event-ID` receives what it missed. If the buffer no longer reaches
+back that far (or the ID came from another process), a `resync` event
+tells the client to reload its task list instead.
+
+Subscribers hold no queue of their own: they keep the ID of the last event
+they sent and wait on a future shared by all streams of the same user, so
+an idle connection costs little more than its suspended generator.
+"""
+import asyncio
+import itertools
+import os
+import random
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Optional, Tuple
+
+from utils.logger import log
+from utils.serialization import dumps_text
+
+# Events kept per user for Last-Event-ID replay
+SSE_REPLAY_SIZE = int(os.getenv("SSE_REPLAY_SIZE", "100"))
+# Users whose replay buffers are kept once they have no open stream
+SSE_MAX_IDLE_USERS = int(os.getenv("SSE_MAX_IDLE_USERS", "10000"))
+# Seconds between heartbeat comments on an idle stream
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# Reconnect delay suggested to clients, in milliseconds
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+# Event types forwarded to SSE subscribers
+SSE_EVENT_TYPES = ("reminder", "task_changed")
+
+HEARTBEAT = ": ping\n\n"
+
+
+def format_event(event_id: int, event_type: str, data: str) -> str:
+    """Encode one event in the text/event-stream format."""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class _UserStream:
+    """Replay buffer and wake-up future shared by one user's subscribers."""
+
+    __slots__ = ("events", "floor", "waiter", "subscribers")
+
+    def __init__(self, size: int, floor: int):
+        self.events: Deque[Tuple[int, str]] = deque(maxlen=size)
+        # Events up to this ID are not in the buffer (never added or dropped)
+        self.floor = floor
+        self.waiter: Optional[asyncio.Future] = None
+        self.subscribers = 0
+
+    def append(self, event_id: int, frame: str) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.floor = self.events[0][0]
+        self.events.append((event_id, frame))
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+        self.waiter = None
+
+    def wait(self) -> asyncio.Future:
+        if self.waiter is None:
+            self.waiter = asyncio.get_running_loop().create_future()
+        return self.waiter
+
+
+class SSEBroker:
+    """
+    Per-process fan-out of bus events to SSE subscribers.
+
+    Must be used from the event loop thread (events arrive there through
+    the event bus handler).
+    """
+
+    def __init__(self, replay_size: int = SSE_REPLAY_SIZE,
+                 max_idle_users: int = SSE_MAX_IDLE_USERS,
+                 heartbeat: float = SSE_HEARTBEAT_SECONDS):
+        self.replay_size = replay_size
+        self.max_idle_users = max_idle_users
+        self.heartbeat = heartbeat
+        self.streams: "OrderedDict[str, _UserStream]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self.last_id = 0
+        self.subscribers = 0
+        # (min, max) reconnect delay in ms once streams are being closed
+        self.closing: Optional[Tuple[int, int]] = None
+
+    def publish(self, event: dict) -> int:
+        """
+        Append an event to the replay buffer of its user (or of every user
+        for broadcasts) and wake their subscribers.
+
+        Returns:
+            Number of user streams the event was added to
+        """
+        event_type = event.get("type")
+        if event_type not in SSE_EVENT_TYPES:
+            return 0
+
+        user = event.get("user")
+        if user:
+            stream = self.streams.get(user)
+            # Nobody listens and nobody can resume: nothing to keep
+            if stream is None:
+                return 0
+            targets = [stream]
+        else:
+            targets = list(self.streams.values())
+
+        self.last_id = next(self._ids)
+        frame = format_event(self.last_id, event_type, dumps_text(event))
+        for stream in targets:
+            stream.append(self.last_id, frame)
+        return len(targets)
+
+    def _open(self, user: str) -> _UserStream:
+        stream = self.streams.get(user)
+        if stream is None:
+            stream = self.streams[user] = _UserStream(self.replay_size, self.last_id)
+        self.streams.move_to_end(user)
+        stream.subscribers += 1
+        self.subscribers += 1
+        return stream
+
+    def _close(self, user: str, stream: _UserStream) -> None:
+        stream.subscribers -= 1
+        self.subscribers -= 1
+        # Keep the buffer for reconnects, but bound how many idle users we keep
+        idle = len(self.streams) - self.max_idle_users
+        if idle <= 0:
+            return
+        for name in list(self.streams):
+            if idle <= 0:
+                break
+            if self.streams[name].subscribers == 0:
+                del self.streams[name]
+                idle -= 1
+
+    def _is_lost(self, stream: _UserStream, last_event_id: int) -> bool:
+        """Whether events after `last_event_id` may be missing from the buffer."""
+        # IDs above ours were issued by another process or before a restart
+        return last_event_id < stream.floor or last_event_id > self.last_id
+
+    async def subscribe(self, user: str, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Stream events for one user as text/event-stream chunks.
+
+        Args:
+            user: User whose events to deliver
+            last_event_id: ID of the last event the client received, to resume
+        """
+        stream = self._open(user)
+        log("SSE stream opened for %s. Open streams: %d", "debug", user, self.subscribers)
+        try:
+            # Position the cursor before the first yield so nothing published
+            # while the client reads the preamble is skipped
+            lost = last_event_id is not None and self._is_lost(stream, last_event_id)
+            cursor = self.last_id if last_event_id is None or lost else last_event_id
+
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if lost:
+                yield format_event(cursor, "resync", dumps_text({"type": "resync", "user": user}))
+
+            while self.closing is None:
+                if stream.events and stream.events[-1][0] > cursor:
+                    for event_id, frame in list(stream.events):
+                        if event_id > cursor:
+                            yield frame
+                            cursor = event_id
+                    continue
+                try:
+                    await asyncio.wait_for(asyncio.shield(stream.wait()), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+
+            # Shutting down: come back after a per-client random delay
+            yield f"retry: {random.randint(*self.closing)}\n\n"
+        finally:
+            self._close(user, stream)
+
+    def close_all(self, min_delay_ms: int, max_delay_ms: int) -> int:
+        """
+        End every stream for a shutdown, telling each client to reconnect
+        after a random delay between `min_delay_ms` and `max_delay_ms`.
+
+        Returns:
+            Number of streams ended
+        """
+        self.closing = (min_delay_ms, max_delay_ms)
+        for stream in self.streams.values():
+            if stream.waiter is not None and not stream.waiter.done():
+                stream.waiter.set_result(None)
+            stream.waiter = None
+        return self.subscribers
+
+
+sse_broker = SSEBroker()
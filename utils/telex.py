@@ -1,12 +1,16 @@
 import requests
 import os
 from utils.logger import log
+from utils.metrics import TELEX_SEND_FAILURES, TELEX_SEND_SECONDS
+from utils.tracing import current_span, traced
 from typing import Optional
 
 # Telex webhook URL (can be configured via environment variable)
 TELEX_WEBHOOK_URL = os.getenv("TELEX_WEBHOOK_URL", "http://localhost:9000/webhook/telex")
 
 
+@TELEX_SEND_SECONDS.time()
+@traced("telex.send")
 def send_telex_message(user: str, text: str) -> bool:
     """
     Send a message back to the user via Telex webhook.
@@ -25,9 +29,14 @@ def send_telex_message(user: str, text: str) -> bool:
             "type": "reminder"  # Mark as system-generated reminder
         }
         
+        # Let Telex join its side of the delivery to our trace
+        span = current_span()
+        headers = {"traceparent": span.traceparent} if span is not None else None
+        
         response = requests.post(
             TELEX_WEBHOOK_URL,
             json=payload,
+            headers=headers,
             timeout=5
         )
         
@@ -36,10 +45,12 @@ def send_telex_message(user: str, text: str) -> bool:
             return True
         else:
             log(f"Failed to send reminder to {user}. Status: {response.status_code}", "error")
+            TELEX_SEND_FAILURES.inc()
             return False
             
     except requests.RequestException as e:
         log(f"Error sending reminder to {user}: {e}", "error")
+        TELEX_SEND_FAILURES.inc()
         return False
 
 
@@ -0,0 +1,308 @@
+"""
+Lightweight request tracing.
+
+A trace is a tree of timed spans sharing one trace ID: the HTTP request
+(or scheduler run) at the root, then the agent, NLP parsing, each database
+call and each Telex send below it. The current span lives in a context
+variable, so it follows the request into the threadpool, and the trace ID
+is taken from an incoming W3C `traceparent` header and passed on to Telex.
+
+Whether a trace is recorded is decided once, at its root, with
+TRACE_SAMPLE_RATE (TRACE_SCHEDULER_SAMPLE_RATE for scheduler runs). Inside
+an unsampled trace a span costs one context variable lookup. Finished
+spans go to an in-process ring buffer, served at GET /traces, and, if
+TRACE_FILE is set, are appended to it as one JSON object per line.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import log
+
+# Fraction of requests whose trace is recorded (0 disables tracing)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Fraction of scheduler runs whose trace is recorded
+TRACE_SCHEDULER_SAMPLE_RATE = float(os.getenv("TRACE_SCHEDULER_SAMPLE_RATE", str(TRACE_SAMPLE_RATE)))
+# Finished spans kept in memory for GET /traces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+# Optional file that finished spans are appended to (JSON lines)
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "duration",
+                 "attributes", "error", "sampled", "_started")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, object] = {}
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self.duration = 0.0
+        self._started = time.perf_counter()
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context header for outgoing requests."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration * 1000,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a W3C `traceparent` header.
+
+    Returns:
+        (trace_id, parent_span_id, sampled), or None if the header is invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE,
+                 buffer_size: int = TRACE_BUFFER_SIZE, export_path: str = TRACE_FILE):
+        self.sample_rate = sample_rate
+        self._spans: Deque[Span] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._export_path = export_path
+        self._export_file = None
+
+    @contextmanager
+    def start_trace(self, name: str, traceparent: Optional[str] = None,
+                    sample_rate: Optional[float] = None) -> Iterator[Span]:
+        """
+        Open the root span of a trace.
+
+        Args:
+            name: Span name
+            traceparent: Incoming W3C header; its trace ID and sampling
+                decision are kept
+            sample_rate: Overrides the tracer's sample rate for this trace
+        """
+        incoming = parse_traceparent(traceparent)
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            rate = self.sample_rate if sample_rate is None else sample_rate
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = rate > 0 and random.random() < rate
+        span = Span(name, trace_id, parent_id, sampled)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span, root=True)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Open a child of the current span; a no-op outside a sampled trace."""
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            yield None
+            return
+        span = Span(name, parent.trace_id, parent.span_id, True)
+        span.attributes.update(attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span)
+
+    def traced(self, name: str):
+        """Decorator running each call of a function in its own span."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                parent = _current.get()
+                if parent is None or not parent.sampled:
+                    return fn(*args, **kwargs)
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span, root: bool = False) -> None:
+        span.duration = time.perf_counter() - span._started
+        if not span.sampled:
+            return
+        with self._lock:
+            self._spans.append(span)
+            if self._export_path:
+                self._export(span, root)
+
+    def _export(self, span: Span, flush: bool) -> None:
+        try:
+            if self._export_file is None:
+                self._export_file = open(self._export_path, "a", encoding="utf-8")
+            self._export_file.write(json.dumps(span.to_dict(), default=str) + "\n")
+            if flush:
+                # Write each trace out once its root finishes
+                self._export_file.flush()
+        except OSError as e:
+            log(f"Trace export to {self._export_path} failed, disabling it: {e}", "error")
+            self._export_path = ""
+
+    def traces(self, limit: int = 20, trace_id: Optional[str] = None,
+               min_duration_ms: float = 0) -> List[Dict[str, object]]:
+        """
+        Recently finished traces from the ring buffer, newest first.
+
+        Each span carries `self_ms`, its duration minus that of its
+        children: time spent in the span's own code or waiting (e.g. for
+        the event loop or a threadpool slot).
+
+        Args:
+            limit: Most traces to return
+            trace_id: Only this trace
+            min_duration_ms: Skip traces whose root is faster than this
+        """
+        with self._lock:
+            spans = list(self._spans)
+
+        grouped: Dict[str, List[Span]] = {}
+        for span in spans:
+            if trace_id is None or span.trace_id == trace_id:
+                grouped.setdefault(span.trace_id, []).append(span)
+
+        result = []
+        for tid, members in grouped.items():
+            ids = {span.span_id for span in members}
+            roots = [span for span in members if span.parent_id not in ids]
+            root = max(roots, key=lambda span: span.duration)
+            if root.duration * 1000 < min_duration_ms:
+                continue
+            children: Dict[str, float] = {}
+            for span in members:
+                if span.parent_id in ids:
+                    children[span.parent_id] = children.get(span.parent_id, 0.0) + span.duration
+            entries = []
+            for span in sorted(members, key=lambda span: span.start):
+                entry = span.to_dict()
+                entry["self_ms"] = max(span.duration - children.get(span.span_id, 0.0), 0.0) * 1000
+                entries.append(entry)
+            result.append({
+                "trace_id": tid,
+                "name": root.name,
+                "start": root.start,
+                "duration_ms": root.duration * 1000,
+                "spans": entries,
+            })
+        result.sort(key=lambda trace: trace["start"], reverse=True)
+        return result[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def close(self) -> None:
+        """Flush and close the export file; it is reopened by the next span."""
+        with self._lock:
+            if self._export_file is not None:
+                try:
+                    self._export_file.close()
+                except OSError as e:
+                    log(f"Closing trace export {self._export_path} failed: {e}", "error")
+                self._export_file = None
+
+
+def current_span() -> Optional[Span]:
+    """The span the caller is running in, if any."""
+    return _current.get()
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+def traced_query(fn):
+    """Trace a db.database function under its own name."""
+    return traced(f"db.{fn.__name__}")(fn)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with tracer.start_trace(f"http {scope['method']}", traceparent) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set("status", message["status"])
+                    headers = list(message.get("headers", ()))
+                    for name, value in headers:
+                        # Event streams stay open for as long as the client
+                        # listens; their duration says nothing
+                        if name == b"content-type" and value.startswith(b"text/event-stream"):
+                            span.sampled = False
+                    headers.append((b"x-trace-id", span.trace_id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name by route template (/tasks/{task_id}), never by raw path
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                span.name = f"http {scope['method']} {route}"
@@ -0,0 +1,130 @@
+"""
+Reminder dispatcher worker.
+
+Runs the reminder dispatch loop (`scheduler.reminder_job`) without the
+HTTP API, so the web tier (SERVER_ROLES=web, which never starts a
+scheduler) and the dispatchers can be scaled to their own load:
+
+    web: SERVER_ROLES=web python server.py
+    worker: python worker.py
+
+Instead of checking on a fixed clock only, the dispatcher sleeps until
+the next task is due (at most --interval seconds) and is woken early by
+the task_changed events web processes publish for every write, so a task
+created or snoozed to fire sooner is not delivered late. Tasks are
+claimed in the database before they are sent, so several dispatchers
+never deliver the same reminder.
+
+Web and worker processes talk through the event bus, which has to be
+shared between them (EVENT_BUS=sqlite); it also carries reminder events
+back to the web processes holding the users' sockets.
+
+Usage:
+    python worker.py
+    python worker.py --interval 10
+    python worker.py --once
+"""
+import argparse
+import asyncio
+import signal
+from datetime import datetime
+from typing import List, Optional
+
+from db.database import add_change_listener, get_next_due_time, init_db
+import scheduler
+from scheduler import REMINDER_CHECK_INTERVAL, reminder_job
+from utils.events import EVENT_BUS, PROCESS_ID, get_event_bus, publish_task_changes
+from utils.logger import log
+
+# Task changes that can bring the next reminder forward
+WAKE_OPS = {"created", "updated", "snoozed"}
+# Shortest pause between two passes, so a pass that keeps failing doesn't spin
+MIN_WAIT_SECONDS = 0.5
+
+
+def seconds_until_next_check(interval: float) -> float:
+    """Time until the earliest unclaimed task is due, capped at `interval`."""
+    next_due = get_next_due_time()
+    if next_due is None:
+        return interval
+    wait = (next_due - datetime.now()).total_seconds()
+    return min(max(wait, MIN_WAIT_SECONDS), interval)
+
+
+class Dispatcher:
+    """Delivers due reminders, sleeping until the next one is due."""
+
+    def __init__(self, interval: float = REMINDER_CHECK_INTERVAL):
+        self.interval = interval
+        self.passes = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def _on_event(self, event: dict) -> None:
+        if (event.get("type") == "task_changed" and event.get("op") in WAKE_OPS
+                and event.get("origin") != PROCESS_ID):
+            self._wake.set()
+
+    def stop(self) -> None:
+        """Finish the send in flight, release the rest and return from `run`."""
+        self._stopping = True
+        scheduler.begin_drain()
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run(self) -> None:
+        self._wake = asyncio.Event()
+        bus = get_event_bus()
+        await bus.start(self._on_event)
+        log(f"🚀 Reminder dispatcher started (checking at least every {self.interval:g} seconds)", "info")
+        try:
+            while not self._stopping:
+                self._wake.clear()
+                await asyncio.to_thread(reminder_job)
+                self.passes += 1
+                if self._stopping:
+                    break
+                wait = await asyncio.to_thread(seconds_until_next_check, self.interval)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await bus.stop()
+            log("Reminder dispatcher stopped", "info")
+
+
+async def _serve(dispatcher: Dispatcher) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, dispatcher.stop)
+        except NotImplementedError:
+            # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    await dispatcher.run()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the reminder dispatcher without the web API")
+    parser.add_argument("--interval", type=float, default=REMINDER_CHECK_INTERVAL,
+                        help="Longest pause between checks for due reminders (seconds)")
+    parser.add_argument("--once", action="store_true", help="Deliver what is due now and exit")
+    args = parser.parse_args(argv)
+
+    init_db()
+    # Let open dashboards see reminders being marked sent
+    add_change_listener(publish_task_changes)
+
+    if args.once:
+        reminder_job()
+        return
+
+    if EVENT_BUS == "local":
+        log("EVENT_BUS=local: web processes can't wake this dispatcher or relay its "
+            "reminders to open pages; set EVENT_BUS=sqlite for both", "warning")
+    asyncio.run(_serve(Dispatcher(args.interval)))
+
+
+if __name__ == "__main__":
+    main()